@@ -6,10 +6,9 @@ from getpass import getpass
 from pathlib import Path
 from typing import Optional
 
-from rich.console import Console
 from rich.text import Text
 
-console = Console()
+from .render import get_console
 
 @dataclass
 class AuthStatus:
@@ -97,7 +96,7 @@ def get_status() -> AuthStatus:
     )
 
 def prompt_and_store_key() -> Path:
-    console.print(Text("OpenAI API key will be stored in your user config (600 permissions).", style="bold"))
+    get_console().print(Text("OpenAI API key will be stored in your user config (600 permissions).", style="bold"))
     key = getpass("OPENAI_API_KEY (don't worry it is invisible): ").strip()
     if not key:
         raise SystemExit(1)
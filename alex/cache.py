@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    # age (seconds) of the last cached answer served, None if last lookup missed
+    last_hit_age: Optional[float] = None
+
+
+stats = CacheStats()
+
+
+def cache_dir() -> Path:
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg) if xdg else (Path.home() / ".cache")
+    return base / "alex"
+
+
+def _responses_dir() -> Path:
+    return cache_dir() / "responses"
+
+
+def _stats_path() -> Path:
+    return cache_dir() / "stats.json"
+
+
+def make_key(**parts: Any) -> str:
+    """
+    Stable key over everything that shapes the model answer
+    (model, schema name, developer instructions, system info, prompt...).
+    """
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def get(key: str, ttl: int) -> Optional[Dict[str, Any]]:
+    """Entry {"data": ..., "response_id": ..., "created": ...} or None."""
+    p = _responses_dir() / f"{key}.json"
+    try:
+        entry = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        _record(hit=False)
+        return None
+
+    age = time.time() - float(entry.get("created", 0))
+    if ttl > 0 and age > ttl:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+        _record(hit=False)
+        return None
+
+    # LRU: mtime = last access
+    try:
+        os.utime(p, None)
+    except OSError:
+        pass
+
+    _record(hit=True, age=age)
+    return entry
+
+
+def put(key: str, data: Dict[str, Any], max_entries: int, response_id: Optional[str] = None) -> None:
+    d = _responses_dir()
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+        tmp = d / f".{key}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps({"created": time.time(), "data": data, "response_id": response_id}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, d / f"{key}.json")
+    except OSError:
+        # cache je jen optimalizace, nikdy kvůli ní nepadat
+        return
+    _evict(max_entries)
+
+
+def _entries() -> List[Path]:
+    try:
+        return [p for p in _responses_dir().iterdir() if p.suffix == ".json"]
+    except OSError:
+        return []
+
+
+def _evict(max_entries: int) -> None:
+    if max_entries <= 0:
+        return
+    entries = _entries()
+    if len(entries) <= max_entries:
+        return
+
+    def _mtime(p: Path) -> float:
+        try:
+            return p.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    entries.sort(key=_mtime)
+    for p in entries[: len(entries) - max_entries]:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+def clear() -> int:
+    removed = 0
+    for p in _entries():
+        try:
+            p.unlink()
+            removed += 1
+        except OSError:
+            pass
+    try:
+        _stats_path().unlink()
+    except OSError:
+        pass
+    return removed
+
+
+def _load_totals() -> Dict[str, int]:
+    try:
+        data = json.loads(_stats_path().read_text(encoding="utf-8"))
+        return {"hits": int(data.get("hits", 0)), "misses": int(data.get("misses", 0))}
+    except Exception:
+        return {"hits": 0, "misses": 0}
+
+
+def _record(hit: bool, age: Optional[float] = None) -> None:
+    if hit:
+        stats.hits += 1
+        stats.last_hit_age = age
+    else:
+        stats.misses += 1
+        stats.last_hit_age = None
+
+    # read-modify-write under a lock (batch threads, the daemon and direct runs
+    # all count), then write aside and rename so a reader never sees half a file
+    path = _stats_path()
+    try:
+        cache_dir().mkdir(parents=True, exist_ok=True)
+        with open(path.with_name("stats.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            totals = _load_totals()
+            totals["hits" if hit else "misses"] += 1
+            tmp = path.with_name(f".stats.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(totals), encoding="utf-8")
+            os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def summary() -> Dict[str, Any]:
+    entries = _entries()
+    size = 0
+    for p in entries:
+        try:
+            size += p.stat().st_size
+        except OSError:
+            pass
+    totals = _load_totals()
+    return {
+        "path": str(_responses_dir()),
+        "entries": len(entries),
+        "bytes": size,
+        "hits": totals["hits"],
+        "misses": totals["misses"],
+    }
+
+
+def format_age(seconds: float) -> str:
+    s = int(seconds)
+    if s < 60:
+        return f"{s}s"
+    if s < 3600:
+        return f"{s // 60}m {s % 60}s"
+    return f"{s // 3600}h {(s % 3600) // 60}m"
@@ -1,29 +1,21 @@
 import sys
 import typer
 from typing import List, Optional
-from rich.prompt import Confirm
-from rich.console import Console
-from rich.table import Table
 from rich.text import Text
 
-from .render import print_box, render_structured
-from .openai_client import call_responses_structured
-from .errors import read_error_log_blocks, filter_error_blocks
-from .executor import run_command, classify_blacklist, clean_stderr
-from .config import ALEX_ERR_FILE_DEFAULT
+# Keep this import block light: heavy modules (openai SDK via openai_client,
+# service_diag, doctor, rich tables/prompts) are imported inside the commands
+# that need them, so local-only commands like "error --show" start fast.
+from .render import print_box, print_cache_note, print_call_timing, print_route_note, get_console, ask, emit, machine_output
+from . import cache as response_cache
+from . import metrics
+from .errors import read_error_log_blocks, iter_error_blocks, clear_error_log
+from .config import default_error_file
 from .utils import ensure_key
 from .auth import prompt_and_store_key, delete_key_file, get_status, load_key_into_env_if_missing
-from .doctor import run_doctor
-from .user_config import ensure_config_file, open_in_editor, config_path, load_config
-from .service_diag import service_diagnose
-from .auth import prompt_and_store_key, delete_key_file, get_status, load_key_into_env_if_missing
-from .doctor import run_doctor
-from .service_resolve import resolve_service_name
-
-
+from .user_config import ensure_config_file, open_in_editor, load_config
 
 
-console = Console()
 app = typer.Typer(
     add_completion=False,
     context_settings={"help_option_names": ["-h", "--help"]},
@@ -36,15 +28,29 @@ def run(
     apply: bool = typer.Option(False, "--apply", "-a", help="Execute suggested commands"),
     yes: bool = typer.Option(False, "--yes", "-y", help="Auto-confirm low/medium/high (still asks for super_high/blacklist)"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Show full stdout/stderr even on success"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Do not read or store cached answers"),
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore cached answer and ask the model again"),
+    stream: Optional[bool] = typer.Option(None, "--stream/--no-stream", help="Render the answer while it is generated (default: config)"),
+    strong: bool = typer.Option(False, "--strong", help="Ask the strong model tier right away (model_strong)"),
 ):
     """Ask Alex a question and get shell commands as response."""
-    
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .render import render_structured, render_structured_live
+    from .openai_client import call_responses_structured, last_route, last_timing
+    from .executor import run_command, classify_blacklist
+    from .planner import PLAN_MAX_WORKERS, plan
+
+    console = get_console()
     ensure_key()
     cfg = load_config()
     if not verbose and cfg.verbose:
         verbose = True
     if not yes and cfg.auto_yes:
         yes = True
+    if stream is None:
+        stream = bool(cfg.stream)
 
     # UX: if user says "-y/--yes", they clearly want to run it
     if yes and not apply:
@@ -54,8 +60,20 @@ def run(
     if not q:
         raise SystemExit(1)
 
-    data = call_responses_structured(q, intent="general")
-    render_structured(data)
+    tier = "strong" if strong else None
+    if stream:
+        data = render_structured_live(
+            lambda on_partial: call_responses_structured(
+                q, intent="general", use_cache=not no_cache, refresh=refresh, on_partial=on_partial, tier=tier
+            )
+        )
+    else:
+        data = call_responses_structured(q, intent="general", use_cache=not no_cache, refresh=refresh, tier=tier)
+        render_structured(data)
+    print_cache_note()
+    print_route_note(last_route(), verbose)
+    if verbose:
+        print_call_timing(last_timing())
 
     if not apply:
         return
@@ -66,131 +84,257 @@ def run(
         print_box("No commands to run.", title="Alex")
         return
 
-    console.print()
-    console.print(f"[bold]Execution[/bold]  ({total} commands)")
-    console.print()
-
-    for i, c in enumerate(cmds, start=1):
-        cmd = (c.get("cmd") or "").strip()
-        risk = c.get("risk", "low")
+    steps = plan(cmds, classify_blacklist)
+    if not machine_output():
+        console.print()
+        console.print(f"[bold]Execution[/bold]  ({total} commands, {len(steps)} steps)")
+    _print_plan(steps)
+    if not machine_output():
+        console.print()
+
+    # one approval for the whole plan; SUPER_HIGH commands, and HIGH ones that change
+    # the system, still ask on their own
+    planned = [pc for step in steps for pc in step.commands]
+    if not yes and not ask(f"Run this plan ({len(planned)} commands, {len(steps)} steps)?", default=True):
+        if machine_output():
+            for pc in planned:
+                _print_skipped(pc, total)
+        else:
+            print_box("Plan not confirmed, nothing was run.", title="Alex")
+        return
 
-        if not cmd:
-            print_box(f"[{i}/{total}] ⏭ Skipped\nEmpty command.", title="Alex")
+    t0 = time.monotonic()
+    ran: List[float] = []
+    for step in steps:
+        batch = step.commands
+
+        if step.parallel:
+            with console.status(f"Running {len(batch)} checks…"):
+                with ThreadPoolExecutor(max_workers=min(PLAN_MAX_WORKERS, len(batch))) as pool:
+                    results = list(pool.map(lambda pc: run_command(pc.cmd), batch))
+            for pc, result in zip(batch, results):
+                ran.append(result.duration)
+                _print_result(pc, total, result, cfg, verbose, parallel=True)
             continue
 
-        bl_reason = classify_blacklist(cmd)
-        if bl_reason:
-            risk = "super_high"
-
-        if risk == "super_high":
-            msg = f"[{i}/{total}] Run SUPER_HIGH risk command?\n{cmd}"
-            if bl_reason:
-                msg += f"\nReason: {bl_reason}"
-            if not Confirm.ask(msg, default=False):
-                print_box(f"[{i}/{total}] ⏭ Skipped\n{cmd}", title="Alex")
+        pc = batch[0]
+        if pc.risk == "super_high":
+            msg = f"[{pc.index}/{total}] Run SUPER_HIGH risk command?\n{pc.cmd}"
+            if pc.reason:
+                msg += f"\nReason: {pc.reason}"
+            if not ask(msg, default=False):
+                _print_skipped(pc, total)
+                continue
+        elif pc.risk == "high" and not pc.read_only and not yes:
+            if not ask(f"[{pc.index}/{total}] Run HIGH risk command?\n{pc.cmd}", default=True):
+                _print_skipped(pc, total)
                 continue
+
+        result = run_command(pc.cmd, interactive=True)
+        ran.append(result.duration)
+        _print_result(pc, total, result, cfg, verbose)
+
+    if ran:
+        wall = time.monotonic() - t0
+        if machine_output():
+            emit("summary", commands=len(ran), wall=round(wall, 3), run_time=round(sum(ran), 3))
         else:
-            if not yes:
-                if not Confirm.ask(f"[{i}/{total}] Run command?\n{cmd}", default=True):
-                    print_box(f"[{i}/{total}] ⏭ Skipped\n{cmd}", title="Alex")
-                    continue
-
-        result = run_command(cmd)
-        out = (result.stdout or "").strip()
-        err = clean_stderr(result.stderr or "")
-
-        ok = (result.returncode == 0)
-        status = "✅ SUCCESS" if ok else "❌ FAILED"
-        status_style = "green" if ok else "bold red"
-
-        body = Table.grid(padding=(0, 1))
-        body.add_row(Text(f"[{i}/{total}] {status}", style=status_style))
-        body.add_row(Text(cmd, style="bold"))
-        body.add_row(Text(f"Exit code: {result.returncode}"))
-
-        always_show_stdout = False
-        always_show_stderr = False
-
-        status_like_prefixes = (
-            "systemctl status ",
-            "systemctl is-active ",
-            "systemctl is-enabled ",
-            "systemctl list-units",
-            "systemctl list-unit-files",
-            "journalctl ",
-            "ss ",
-            "ip ",
-            "ufw status",
-            "firewall-cmd ",
-            "docker ps",
-            "podman ps",
-        )
+            console.print(f"[dim]⏱ {len(ran)} command(s) in {wall:.2f}s ({sum(ran):.2f}s of command run time)[/dim]")
+
+
+def _print_skipped(pc, total) -> None:
+    if machine_output():
+        reason = "super_high risk, needs confirmation" if pc.risk == "super_high" else "not confirmed"
+        emit("skipped", index=pc.index, total=total, cmd=pc.cmd, reason=reason)
+        return
+    print_box(f"[{pc.index}/{total}] ⏭ Skipped\n{pc.cmd}", title="Alex")
 
-        cmd_l = cmd.lower().strip()
 
-        if any(cmd_l.startswith(p) for p in status_like_prefixes):
-            always_show_stdout = True
+def _print_plan(steps) -> None:
+    from rich.table import Table
 
-        if ("--version" in cmd_l) or cmd_l.endswith(" -v") or cmd_l.endswith(" -version") or (" version" in cmd_l):
-            always_show_stdout = True
-            always_show_stderr = True
+    if machine_output():
+        emit("plan", commands=[
+            {"index": pc.index, "step": n, "parallel": step.parallel, "cmd": pc.cmd,
+             "read_only": pc.read_only, "risk": pc.risk, "reason": pc.reason}
+            for n, step in enumerate(steps, start=1) for pc in step.commands
+        ])
+        return
+
+    table = Table(show_header=True, header_style="bold", box=None, padding=(0, 1))
+    table.add_column("#", justify="right")
+    table.add_column("Step", justify="right")
+    table.add_column("Command", overflow="fold")
+    table.add_column("Access")
+    table.add_column("Risk")
+    for n, step in enumerate(steps, start=1):
+        for pc in step.commands:
+            table.add_row(
+                str(pc.index),
+                f"{n} ∥" if step.parallel else str(n),
+                pc.cmd,
+                Text("read-only", style="green") if pc.read_only else Text("changes", style="yellow"),
+                Text(pc.risk, style=_RISK_STYLE.get(pc.risk, "white")),
+            )
+    get_console().print(table)
+
+
+_RISK_STYLE = {"low": "green", "medium": "yellow", "high": "red", "super_high": "bold red"}
+
+_STATUS_LIKE_PREFIXES = (
+    "systemctl status ",
+    "systemctl is-active ",
+    "systemctl is-enabled ",
+    "systemctl list-units",
+    "systemctl list-unit-files",
+    "journalctl ",
+    "ss ",
+    "ip ",
+    "ufw status",
+    "firewall-cmd ",
+    "docker ps",
+    "podman ps",
+)
 
-        show_stdout = (not ok) or verbose or always_show_stdout
-        show_stderr = (not ok) or verbose or always_show_stderr or bool(err)
 
-        if ok and out:
-            show_stdout = True
+def _print_result(pc, total, result, cfg, verbose, parallel=False) -> None:
+    from rich.table import Table
+
+    from .executor import clean_stderr
+
+    i, cmd = pc.index, pc.cmd
+    err = clean_stderr(result.stderr or "")
+    if machine_output():
+        # everything captured, no show/hide heuristics: the consumer decides
+        emit("result", index=i, total=total, cmd=cmd, exit=result.returncode, duration=round(result.duration, 3),
+             parallel=parallel, timed_out=result.timed_out, truncated=result.truncated,
+             stdout=result.stdout or "", stderr=err)
+        return
+    out = (result.stdout or "").strip()
 
-        if ok and err and always_show_stderr:
-            show_stderr = True
+    ok = (result.returncode == 0)
+    status = "✅ SUCCESS" if ok else "❌ FAILED"
+    status_style = "green" if ok else "bold red"
 
+    body = Table.grid(padding=(0, 1))
+    body.add_row(Text(f"[{i}/{total}] {status}", style=status_style))
+    body.add_row(Text(cmd, style="bold"))
+    body.add_row(Text(f"Exit code: {result.returncode} · {result.duration:.2f}s" + (" (parallel)" if parallel else "")))
+    if result.timed_out:
+        body.add_row(Text(f"Timed out after {cfg.command_timeout}s, process killed.", style="bold red"))
+    if result.truncated:
+        body.add_row(Text(
+            f"Output truncated (stdout {result.stdout_bytes} B, stderr {result.stderr_bytes} B total).",
+            style="yellow",
+        ))
 
-        if show_stdout and out:
-            body.add_row(Text(""))
-            body.add_row(Text("STDOUT", style="bold"))
-            limit = cfg.max_output_chars if cfg.max_output_chars else 4000
-            body.add_row(Text(out[-limit:]))
+    always_show_stdout = False
+    always_show_stderr = False
 
-        if show_stderr and err:
-            body.add_row(Text(""))
-            body.add_row(Text("STDERR", style="bold red" if not ok else "bold yellow"))
-            limit = cfg.max_output_chars if cfg.max_output_chars else 4000
-            body.add_row(Text(err[-limit:]))
+    cmd_l = cmd.lower().strip()
 
+    if any(cmd_l.startswith(p) for p in _STATUS_LIKE_PREFIXES):
+        always_show_stdout = True
 
-        print_box(body, title="Alex")
+    if ("--version" in cmd_l) or cmd_l.endswith(" -v") or cmd_l.endswith(" -version") or (" version" in cmd_l):
+        always_show_stdout = True
+        always_show_stderr = True
+
+    show_stdout = (not ok) or verbose or always_show_stdout
+    show_stderr = (not ok) or verbose or always_show_stderr or bool(err)
+
+    if ok and out:
+        show_stdout = True
+
+    if ok and err and always_show_stderr:
+        show_stderr = True
+
+
+    if show_stdout and out:
+        body.add_row(Text(""))
+        body.add_row(Text("STDOUT", style="bold"))
+        limit = cfg.max_output_chars if cfg.max_output_chars else 4000
+        body.add_row(Text(out[-limit:]))
+
+    if show_stderr and err:
+        body.add_row(Text(""))
+        body.add_row(Text("STDERR", style="bold red" if not ok else "bold yellow"))
+        limit = cfg.max_output_chars if cfg.max_output_chars else 4000
+        body.add_row(Text(err[-limit:]))
+
+
+    print_box(body, title="Alex")
+
+
+def _select_error_blocks(path, last, since, grep, regex, exit_code, cmd_grep) -> List[str]:
+    """Last N blocks of the error log after filters."""
+    from collections import deque
+
+    n = max(1, last)
+    content_filters = bool(grep or regex or exit_code is not None or cmd_grep)
+    # with content filters we cannot know how far back matches are, read everything (since permitting)
+    try:
+        blocks = read_error_log_blocks(path, last=None if content_filters else n, since=since)
+        matches = iter_error_blocks(blocks, since, grep, regex=regex, exit_code=exit_code, command=cmd_grep)
+        return list(deque(matches, maxlen=n))
+    except ValueError as e:
+        print_box(str(e), title="Alex")
+        raise SystemExit(2)
 
 
 @app.command()
 def error(
     text: List[str] = typer.Argument(None),
     cmd: Optional[str] = typer.Option(None, "--cmd", "-C", help="Original command you ran"),
-    fallback: str = typer.Option(ALEX_ERR_FILE_DEFAULT, "--fallback", "-f", help="Fallback error file"),
+    fallback: Optional[str] = typer.Option(None, "--fallback", "-f", help="Fallback error file (default: the per-user log)"),
     last: int = typer.Option(1, "--last", "-n", help="How many last errors to include"),
     show: bool = typer.Option(False, "--show", "-s", help="Only show the selected error block(s) without analysis"),
-    grep: Optional[str] = typer.Option(None, "--grep", "-g", help="Filter errors containing this text (case-insensitive)"),
+    grep: Optional[List[str]] = typer.Option(None, "--grep", "-g", help="Filter errors containing this text (case-insensitive, repeatable: all must match)"),
+    regex: Optional[str] = typer.Option(None, "--regex", "-E", help="Filter errors matching this regular expression"),
+    exit_code: Optional[int] = typer.Option(None, "--exit-code", "-x", help="Only errors with this exit code"),
+    cmd_grep: Optional[str] = typer.Option(None, "--cmd-grep", help="Only errors whose failed command contains this text"),
     since: Optional[str] = typer.Option(None, "--since", "-S", help="Only errors since date/time (YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS])"),
     clear: bool = typer.Option(False, "--clear", "-c", help="Clear the error log and exit"),
+    batch: bool = typer.Option(False, "--batch", "-b", help="Group the selected errors (-n/--since/filters) and analyse each distinct one separately"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Do not read or store cached answers"),
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore cached answer and ask the model again"),
+    stream: Optional[bool] = typer.Option(None, "--stream/--no-stream", help="Render the answer while it is generated (default: config)"),
+    strong: bool = typer.Option(False, "--strong", help="Ask the strong model tier right away (model_strong)"),
 ):
     """Analyze an error log with OpenAI to get suggestions."""
+    fallback = fallback or default_error_file()
 
     if clear:
-        open(fallback, "w").close()
+        clear_error_log(fallback)
         print_box("Error log cleared.", title="Alex")
         raise SystemExit(0)
 
     if show:
-        blocks = read_error_log_blocks(fallback)
-        blocks = filter_error_blocks(blocks, since, grep)
+        blocks = _select_error_blocks(fallback, last, since, grep, regex, exit_code, cmd_grep)
 
         if not blocks:
             print_box("No error log found (after filters).", title="Alex")
             raise SystemExit(1)
 
-        selected = "\n\n".join(blocks[-max(1, last):])
+        selected = "\n\n".join(blocks)
         print_box(Text(selected), title="Last error log(s)")
         raise SystemExit(0)
 
+    if batch:
+        blocks = _select_error_blocks(fallback, last, since, grep, regex, exit_code, cmd_grep)
+        if not blocks:
+            print_box("No error log found (after filters).", title="Alex")
+            raise SystemExit(1)
+
+        from .error_batch import analyse_error_batch
+
+        ensure_key()
+        failed = analyse_error_batch(
+            blocks, cmd=cmd, use_cache=not no_cache, refresh=refresh, tier="strong" if strong else "fast",
+            max_workers=int(load_config().max_concurrent_requests or 1),
+        )
+        raise SystemExit(1 if failed else 0)
+
     err = None
     if not sys.stdin.isatty():
         err = sys.stdin.read().strip()
@@ -199,28 +343,37 @@ def error(
         err = " ".join(text).strip()
 
     if not err:
-        blocks = read_error_log_blocks(fallback)
-        blocks = filter_error_blocks(blocks, since, grep)
+        blocks = _select_error_blocks(fallback, last, since, grep, regex, exit_code, cmd_grep)
         if blocks:
-            err = "\n\n".join(blocks[-max(1, last):])
+            err = "\n\n".join(blocks)
 
     if not err:
         print_box(
             "No error text found.\n\nTry:\n"
             "  alex error\n"
             "  alex error -n 3 --show\n"
+            "  alex error -n 50 --batch\n"
             "  alex error --show --grep ssh --since 2026-01-03\n"
             "  alex error --clear\n",
             title="Alex",
         )
         raise SystemExit(1)
 
+    from .render import render_structured, render_structured_live
+    from .openai_client import call_responses_structured, last_route
+
     ensure_key()
     filters = []
     if since:
         filters.append(f"since={since}")
-    if grep:
-        filters.append(f"grep={grep}")
+    for g in grep or []:
+        filters.append(f"grep={g}")
+    if regex:
+        filters.append(f"regex={regex}")
+    if exit_code is not None:
+        filters.append(f"exit_code={exit_code}")
+    if cmd_grep:
+        filters.append(f"command~{cmd_grep}")
     finfo = f"Filters: {', '.join(filters)}\n\n" if filters else ""
 
     prompt = (
@@ -228,17 +381,49 @@ def error(
         f"{finfo}"
         f"Error log:\n{err}\n"
     )
-    data = call_responses_structured(prompt, intent="error_analysis")
-    render_structured(data)
+    cfg = load_config()
+    if stream is None:
+        stream = bool(cfg.stream)
+    # first pass on the fast tier, escalated when the answer is weak
+    tier = "strong" if strong else "fast"
+    if stream:
+        data = render_structured_live(
+            lambda on_partial: call_responses_structured(
+                prompt, intent="error_analysis", use_cache=not no_cache, refresh=refresh, on_partial=on_partial, tier=tier
+            )
+        )
+    else:
+        data = call_responses_structured(prompt, intent="error_analysis", use_cache=not no_cache, refresh=refresh, tier=tier)
+        render_structured(data)
+    print_cache_note()
+    print_route_note(last_route(), bool(cfg.verbose))
 
 @app.command()
 def service(
-    name: str = typer.Argument(..., help="systemd unit name (e.g. ssh, ssh.service, nginx)"),
+    names: Optional[List[str]] = typer.Argument(None, help="systemd unit name(s) (e.g. ssh, ssh.service, nginx)"),
+    failed: bool = typer.Option(False, "--failed", help="Diagnose all units systemd reports as failed"),
     apply: bool = typer.Option(False, "--apply", help="Run diagnostic commands (safe, read-only)"),
     yes: bool = typer.Option(False, "--yes", "-y", help="Auto-confirm diagnostics"),
     rounds: int = typer.Option(3, "--rounds", help="How many diagnostic rounds max"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show per-probe timings"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Do not read or store cached answers"),
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore cached answers and ask the model again"),
+    stream: Optional[bool] = typer.Option(None, "--stream/--no-stream", help="Render the answer while it is generated (default: config)"),
+    strong: bool = typer.Option(False, "--strong", help="Ask the strong model tier right away (model_strong)"),
 ):
-    """Diagnose a systemd service (exists? running? why failing?)."""
+    """Diagnose systemd service(s) (exists? running? why failing?)."""
+    from .service_resolve import resolve_service_name
+    from .service_diag import service_diagnose
+
+    names = list(names or [])
+    if not names and not failed:
+        print_box("Give a unit name (alex service nginx), several (alex service nginx php-fpm) or --failed.", title="Alex")
+        raise SystemExit(2)
+    cfg = load_config()
+    if len(names) > 1 or failed:
+        _service_many(names, failed, apply, no_cache, refresh, verbose or bool(cfg.verbose), strong, cfg)
+        return
+    name = names[0]
 
     chosen, suggestions = resolve_service_name(name)
 
@@ -251,7 +436,7 @@ def service(
         )
 
         if False:
-            if not Confirm.ask(f"Continue with {chosen}?", default=True):
+            if not ask(f"Continue with {chosen}?", default=True):
                 # když user nechce, tak alespoň vypiš návrhy
                 lines = "\n".join(f"• {s}" for s in suggestions[:5])
                 print_box(f"Did you mean:\n{lines}", title="Alex")
@@ -260,9 +445,55 @@ def service(
         name = chosen
 
 
-    service_diagnose(name, apply=apply, yes=yes, max_rounds=rounds)
+    if stream is None:
+        stream = bool(cfg.stream)
+    if not verbose and cfg.verbose:
+        verbose = True
+
+    service_diagnose(
+        name,
+        apply=apply,
+        yes=yes,
+        max_rounds=rounds,
+        use_cache=not no_cache,
+        refresh=refresh,
+        stream=stream,
+        verbose=verbose,
+        strong=strong,
+    )
+
+
+
+def _service_many(names, failed, apply, no_cache, refresh, verbose, strong, cfg) -> None:
+    from .service_resolve import resolve_service_name
+    from .service_diag import failed_units, service_diagnose_many
 
+    units: List[str] = []
+    for n in names:
+        chosen, suggestions = resolve_service_name(n)
+        if suggestions and chosen != (n if n.endswith(".service") else n + ".service"):
+            print_box(f"Service '{n}' not found.\nTrying: {chosen}", title="Alex")
+        units.append(chosen)
+    if failed:
+        units.extend(failed_units())
+    units = list(dict.fromkeys(units))
 
+    if not units:
+        print_box("No failed units. 🎉", title="Alex")
+        return
+    if apply:
+        print_box("--apply runs follow-up probes for one unit at a time; with several units only the first round is done.", title="Alex")
+
+    errors = service_diagnose_many(
+        units,
+        use_cache=not no_cache,
+        refresh=refresh,
+        verbose=verbose,
+        strong=strong,
+        max_workers=int(cfg.max_concurrent_requests or 1),
+    )
+    if errors:
+        raise SystemExit(1)
 
 @app.command()
 def auth(
@@ -312,12 +543,159 @@ def config(
     else:
         print_box(f"Saved.\nConfig file: {path}", title="Alex")
 
+@app.command()
+def cache(
+    clear: bool = typer.Option(False, "--clear", help="Delete all cached answers"),
+):
+    """Show response cache stats (or clear it)."""
+    if clear:
+        removed = response_cache.clear()
+        print_box(f"Removed {removed} cached answer(s).", title="Alex")
+        return
+
+    st = response_cache.summary()
+    total = st["hits"] + st["misses"]
+    rate = f"{100 * st['hits'] / total:.0f}%" if total else "-"
+    msg = (
+        f"Path: {st['path']}\n"
+        f"Entries: {st['entries']} ({st['bytes'] / 1024:.1f} KiB)\n"
+        f"Hits: {st['hits']}  Misses: {st['misses']}  Hit rate: {rate}\n"
+    )
+    print_box(Text(msg), title="Alex cache")
+
+@app.command()
+def stats(
+    days: int = typer.Option(30, "--days", "-d", help="Only look at the last N days (0 = everything)"),
+    prometheus: Optional[str] = typer.Option(None, "--prometheus", metavar="FILE",
+                                             help="Write the window's totals as a Prometheus textfile (e.g. /var/lib/node_exporter/textfile/alex.prom)"),
+):
+    """Show model latency, token usage, cost and command run times."""
+    import time
+    from rich.table import Table
+
+    since = time.time() - days * 86400 if days > 0 else None
+    records = metrics.load_records(since=since)
+
+    if prometheus:
+        try:
+            metrics.write_prometheus(prometheus, records, window=f"{days}d" if days > 0 else "all")
+        except OSError as e:
+            print_box(f"Cannot write {prometheus}: {e}", title="Alex")
+            raise SystemExit(1)
+        print_box(f"Wrote {len(records)} record(s) to {prometheus}", title="Alex")
+        return
+
+    if not records:
+        print_box(f"No records yet.\nMetrics file: {metrics.metrics_path()}", title="Alex stats")
+        return
+
+    def cost(g) -> str:
+        return f"${g['cost']:.4f}" + ("" if g["cost_known"] else "+")
+
+    def model_table(title: str, groups) -> Table:
+        t = Table(title=title, show_header=True, header_style="bold")
+        t.add_column("", no_wrap=True)
+        for col in ("Calls", "Cache hits", "p50", "p90", "p99", "In tok", "Cached tok", "Out tok", "Cost"):
+            t.add_column(col, justify="right")
+        for key, g in groups:
+            if not g["calls"]:
+                continue
+            lat = g["latency"]
+            t.add_row(
+                key, str(g["calls"]), str(g["cache_hits"]),
+                *(f"{metrics.percentile(lat, q):.2f}s" if lat else "-" for q in (50, 90, 99)),
+                str(g["input"]), str(g["cached"]), str(g["output"]), cost(g),
+            )
+        return t
+
+    by_sub = sorted(metrics.by_subcommand(records).items())
+    by_day = sorted(metrics.by_day(records).items(), reverse=True)
+
+    if machine_output():
+        for group, items in (("subcommand", by_sub), ("day", by_day)):
+            for key, g in items:
+                emit("stats", group=group, key=key, **metrics.summarize(g))
+        return
+
+    console = get_console()
+    console.print(model_table("Model calls by subcommand", by_sub))
+    console.print(model_table("Model calls by day", by_day))
+
+    t = Table(title="Executed commands by subcommand", show_header=True, header_style="bold")
+    t.add_column("", no_wrap=True)
+    for col in ("Commands", "Failed", "Timed out", "p50", "p95", "Total"):
+        t.add_column(col, justify="right")
+    for key, g in by_sub:
+        if not g["commands"]:
+            continue
+        dur = g["duration"]
+        t.add_row(
+            key, str(g["commands"]), str(g["failed"]), str(g["timed_out"]),
+            f"{metrics.percentile(dur, 50):.2f}s", f"{metrics.percentile(dur, 95):.2f}s", f"{sum(dur):.1f}s",
+        )
+    console.print(t)
+    console.print(f"[dim]{len(records)} record(s) from {metrics.metrics_path()}; "
+                  "cost is an estimate from list prices, '+' = includes models without a known price[/dim]")
+
+@app.command()
+def serve(
+    stop: bool = typer.Option(False, "--stop", help="Stop the running daemon"),
+    status: bool = typer.Option(False, "--status", help="Show whether the daemon is running"),
+):
+    """Run a resident daemon so other alex calls start instantly (Ctrl-C to stop)."""
+    from . import daemon
+
+    if stop:
+        print_box("Daemon stopped." if daemon.stop() else "Daemon is not running.", title="Alex")
+        return
+    if status:
+        pid = daemon.running_pid()
+        msg = f"Running (pid {pid})\nSocket: {daemon.socket_path()}" if pid else "Not running."
+        print_box(msg, title="Alex")
+        return
+    raise SystemExit(daemon.serve())
+
 @app.command()
 def doctor():
     """Check installation and configuration sanity."""
+    from .doctor import run_doctor
+
     raise SystemExit(run_doctor())
 
+@app.callback()
+def _options(
+    fmt: str = typer.Option(
+        "rich", "--format", envvar="ALEX_FORMAT", metavar="rich|json|ndjson|plain",
+        help="Output: rich panels, or json/ndjson/plain for scripts (no rich layout, never prompts)",
+    ),
+):
+    from . import render
+
+    try:
+        render.set_format(fmt.lower())
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--format")
+
+
+def _subcommand(argv: List[str]) -> str:
+    skip = False
+    for a in argv:
+        if skip:
+            skip = False
+        elif a == "--format":
+            skip = True
+        elif not a.startswith("-"):
+            return a
+    return ""
+
+
 def main():
+    from . import render
+
     if len(sys.argv) == 1:
         sys.argv.append("--help")
-    app()
+    metrics.subcommand = _subcommand(sys.argv[1:])
+    try:
+        app()
+    finally:
+        render.finish()
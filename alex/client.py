@@ -0,0 +1,150 @@
+"""
+Console entry point.
+
+Stdlib only on purpose: when `alex serve` is running, the command line,
+environment and the terminal's stdin/stdout/stderr are handed to the daemon
+over a Unix socket and this process just waits for the exit code. Otherwise
+(or if anything goes wrong) the CLI runs in-process as usual.
+"""
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+from typing import List, Optional
+
+from . import __version__
+
+PROTOCOL = 1
+
+# these need a controlling terminal (sudo, getpass, $EDITOR) or are the daemon itself
+_LOCAL_COMMANDS = {"serve", "auth", "config"}
+_LOCAL_FLAGS = {"--apply", "-a", "--yes", "-y"}
+
+
+def runtime_dir() -> str:
+    base = os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/alex-{os.getuid()}"
+    return os.path.join(base, "alex")
+
+
+def _check_private(path: str, kind: int) -> None:
+    """Raise PermissionError unless path is ours and of that kind (lstat: symlinks fail)."""
+    st = os.lstat(path)
+    if stat.S_IFMT(st.st_mode) != kind or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a {'directory' if kind == stat.S_IFDIR else 'socket'} owned by uid {os.getuid()}")
+    if kind == stat.S_IFDIR and st.st_mode & 0o077:
+        raise PermissionError(f"{path} is accessible to other users (mode {stat.S_IMODE(st.st_mode):o})")
+
+
+def ensure_runtime_dir() -> str:
+    """
+    Create the runtime dir (0700) and verify it and its parent. Without
+    XDG_RUNTIME_DIR the parent is /tmp/alex-<uid>, which anyone could have
+    created first.
+    """
+    path = runtime_dir()
+    for d in (os.path.dirname(path), path):
+        try:
+            os.mkdir(d, 0o700)
+        except FileExistsError:
+            pass
+        _check_private(d, stat.S_IFDIR)
+    return path
+
+
+def socket_path() -> str:
+    return os.path.join(runtime_dir(), "daemon.sock")
+
+
+def peer_uid(sock: socket.socket) -> int:
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _pid, uid, _gid = struct.unpack("3i", creds)
+    return uid
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("daemon closed the connection")
+        buf += chunk
+    return buf
+
+
+def _should_forward(argv: List[str]) -> bool:
+    if os.environ.get("ALEX_NO_DAEMON"):
+        return False
+    if not argv or argv[0] in _LOCAL_COMMANDS:
+        return False
+    return not any(a in _LOCAL_FLAGS for a in argv)
+
+
+def forward(argv: List[str]) -> Optional[int]:
+    """
+    Run argv in the daemon. Returns the exit code, or None when the daemon
+    is not available and the caller should run in-process.
+    """
+    if not _should_forward(argv):
+        return None
+    path = socket_path()
+    try:
+        # the environment (API key) and our terminal go to whoever listens there: make sure it is us
+        ensure_runtime_dir()
+        _check_private(path, stat.S_IFSOCK)
+    except OSError:
+        return None
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        if peer_uid(sock) != os.getuid():
+            sock.close()
+            return None
+        header = json.dumps({
+            "protocol": PROTOCOL,
+            "version": __version__,
+            "argv": argv,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+        }).encode("utf-8")
+        socket.send_fds(sock, [struct.pack("!I", len(header))], [0, 1, 2])
+        sock.sendall(header)
+
+        if _recv_exact(sock, 1) != b"A":
+            # daemon of another alex version, or it refused us
+            sock.close()
+            return None
+        (pid,) = struct.unpack("!i", _recv_exact(sock, 4))
+    except OSError:
+        return None
+
+    # Ctrl-C in our terminal has to reach the worker running our command
+    def _relay(signum, _frame):
+        try:
+            os.kill(pid, signum)
+        except OSError:
+            pass
+
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, _relay)
+
+    try:
+        (code,) = struct.unpack("!i", _recv_exact(sock, 4))
+    except (OSError, ConnectionError):
+        code = 1
+    finally:
+        sock.close()
+    return code
+
+
+def main():
+    code = forward(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+
+    from .cli import main as cli_main
+
+    cli_main()
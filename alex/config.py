@@ -1,4 +1,28 @@
 import os
 
-ALEX_DEFAULT_MODEL = os.getenv("ALEX_MODEL", "gpt-4.1-mini")
-ALEX_ERR_FILE_DEFAULT = "/tmp/alex_last_error.txt"
+from .client import runtime_dir
+
+# read per call: the daemon serves every request with the client's own environment
+
+
+def default_model() -> str:
+    return os.getenv("ALEX_MODEL", "gpt-4.1-mini")
+
+
+def strong_model() -> str:
+    # escalation target of the fast tier (see alex/routing.py); ALEX_MODEL alone pins both
+    return os.getenv("ALEX_STRONG_MODEL", os.getenv("ALEX_MODEL", "gpt-4.1"))
+
+
+# shared log of the old hook, still read when the new one does not exist yet
+ALEX_ERR_FILE_LEGACY = "/tmp/alex_last_error.txt"
+
+
+def error_file() -> str:
+    """Per-user log written by scripts/alex-shell-hook.sh (rotated at ALEX_ERR_MAX_BYTES)."""
+    return os.path.join(runtime_dir(), "errors.log")
+
+
+def default_error_file() -> str:
+    current = error_file()
+    return current if os.path.exists(current) or not os.path.exists(ALEX_ERR_FILE_LEGACY) else ALEX_ERR_FILE_LEGACY
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import traceback
+from typing import Optional
+
+from . import __version__
+from .client import PROTOCOL, ensure_runtime_dir, peer_uid, runtime_dir, socket_path, _recv_exact
+
+
+def pid_path() -> str:
+    return os.path.join(runtime_dir(), "daemon.pid")
+
+
+def running_pid() -> Optional[int]:
+    try:
+        with open(pid_path(), "r", encoding="ascii") as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def _warm_up() -> None:
+    # everything a command may need is imported once here and shared by every fork
+    from . import cli, doctor, service_diag, service_resolve  # noqa: F401
+    from .user_config import load_config
+
+    load_config()
+    try:
+        import openai  # noqa: F401
+    except ImportError:
+        pass
+
+
+def _reopen_stdio() -> None:
+    # the daemon's sys.std* were set up for its own (non-tty) fds
+    for fd, name, mode in ((0, "stdin", "r"), (1, "stdout", "w"), (2, "stderr", "w")):
+        tty = os.isatty(fd)
+        stream = open(fd, mode, buffering=1 if (tty and mode == "w") else -1,
+                      encoding="utf-8", errors="replace", closefd=False)
+        setattr(sys, name, stream)
+        setattr(sys, f"__{name}__", stream)
+
+
+def _run_request(conn: socket.socket) -> None:
+    """Runs in a forked worker; never returns."""
+    code = 1
+    try:
+        msg, fds, _flags, _addr = socket.recv_fds(conn, 4, 3)
+        (size,) = struct.unpack("!I", msg)
+        req = json.loads(_recv_exact(conn, size).decode("utf-8"))
+        if len(fds) != 3 or req.get("protocol") != PROTOCOL or req.get("version") != __version__:
+            conn.sendall(b"R")
+            os._exit(0)
+
+        os.setsid()
+        for i, fd in enumerate(fds):
+            os.dup2(fd, i)
+            os.close(fd)
+        os.environ.clear()
+        os.environ.update(req.get("env") or {})
+        try:
+            os.chdir(req.get("cwd") or "/")
+        except OSError:
+            pass
+        _reopen_stdio()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+        from . import render
+        from .cli import main
+
+        render._console = None
+        conn.sendall(b"A" + struct.pack("!i", os.getpid()))
+
+        sys.argv = ["alex"] + list(req.get("argv") or [])
+        try:
+            main()
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except KeyboardInterrupt:
+            code = 130
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        try:
+            conn.sendall(struct.pack("!i", code))
+        except OSError:
+            pass
+        os._exit(code & 0xFF)
+
+
+def serve() -> int:
+    """
+    Keep the interpreter, imports and config warm and run each forwarded
+    command in a forked worker that takes over the client's terminal fds.
+    """
+    path = socket_path()
+    try:
+        ensure_runtime_dir()
+    except OSError as e:
+        print(f"alex daemon: {e}", file=sys.stderr)
+        return 1
+
+    if running_pid():
+        print(f"alex daemon already running (pid {running_pid()})", file=sys.stderr)
+        return 1
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    _warm_up()
+
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        srv.bind(path)
+    finally:
+        os.umask(old_umask)
+    srv.listen(32)
+
+    with open(pid_path(), "w", encoding="ascii") as f:
+        f.write(str(os.getpid()))
+
+    # workers report their exit code over the socket; let the kernel reap them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    def _stop(_signum, _frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"alex daemon listening on {path} (pid {os.getpid()})", file=sys.stderr)
+
+    try:
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except InterruptedError:
+                continue
+            try:
+                if peer_uid(conn) != os.getuid():
+                    conn.close()
+                    continue
+                if os.fork() == 0:
+                    srv.close()
+                    _run_request(conn)
+            except OSError:
+                pass
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.close()
+        for p in (path, pid_path()):
+            try:
+                os.unlink(p)
+            except OSError:
+                pass
+    return 0
+
+
+def stop() -> bool:
+    pid = running_pid()
+    if not pid:
+        return False
+    os.kill(pid, signal.SIGTERM)
+    return True
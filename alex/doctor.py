@@ -8,17 +8,14 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional
 
-from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
-from .render import print_box
+from .render import emit, machine_output, print_box, get_console
 from .user_config import config_path
 from .auth import get_status, key_path
 
-console = Console()
-
 
 @dataclass
 class Check:
@@ -125,16 +122,20 @@ def run_doctor() -> int:
     )
 
     # Render
-    t = Table(show_header=True, header_style="bold")
-    t.add_column("Check", overflow="fold")
-    t.add_column("Status", width=8)
-    t.add_column("Value", overflow="fold")
-    t.add_column("Hint", overflow="fold")
+    if machine_output():
+        for c in checks:
+            emit("check", label=c.label, status=c.status, value=c.value, hint=c.hint)
+    else:
+        t = Table(show_header=True, header_style="bold")
+        t.add_column("Check", overflow="fold")
+        t.add_column("Status", width=8)
+        t.add_column("Value", overflow="fold")
+        t.add_column("Hint", overflow="fold")
 
-    for c in checks:
-        t.add_row(c.label, _status_text(c.status), c.value, c.hint or "")
+        for c in checks:
+            t.add_row(c.label, _status_text(c.status), c.value, c.hint or "")
 
-    console.print(Panel(t, title="[bold]Alex doctor[/bold]", border_style="white"))
+        get_console().print(Panel(t, title="[bold]Alex doctor[/bold]", border_style="white"))
 
     overall = _overall(checks)
     if overall == "OK":
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence
+
+from rich.text import Text
+
+from .errors import ErrorCluster, cluster_error_blocks
+from .openai_client import call_responses_structured
+from .render import emit, get_console, machine_output, print_box, render_structured
+
+
+def _prompt(cluster: ErrorCluster, cmd: Optional[str]) -> str:
+    rep = cluster.representative
+    seen = f"Seen {cluster.count}x"
+    if cluster.count > 1 and cluster.first_ts and cluster.last_ts:
+        seen += f" between {cluster.first_ts} and {cluster.last_ts}"
+    return (
+        f"Original command (optional): {cmd or rep.command or '(unknown)'}\n\n"
+        f"{seen} (latest occurrence below).\n\n"
+        f"Error log:\n{rep.text}\n"
+    )
+
+
+def _title(i: int, total: int, cluster: ErrorCluster) -> str:
+    rep = cluster.representative
+    cmd = rep.command if len(rep.command) <= 40 else rep.command[:39] + "…"
+    parts = [f"Alex {i}/{total}", f"{cluster.count}x"]
+    if rep.exit_code is not None:
+        parts.append(f"exit {rep.exit_code}")
+    if cmd:
+        parts.append(cmd)
+    return " · ".join(parts)
+
+
+def analyse_error_batch(
+    blocks: Sequence[str],
+    cmd: Optional[str] = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    tier: Optional[str] = "fast",
+    max_workers: int = 4,
+) -> int:
+    """
+    Cluster error blocks and analyse one representative per cluster, with at
+    most max_workers model calls in flight. Returns the number of failed analyses.
+    """
+    clusters = cluster_error_blocks(blocks)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(clusters)
+    errors: List[Optional[str]] = [None] * len(clusters)
+
+    console = get_console()
+    t0 = time.monotonic()
+    with console.status(f"Analysing {len(clusters)} distinct error(s) from {len(blocks)} block(s)…") as status:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(clusters)))) as pool:
+            futures = {
+                pool.submit(call_responses_structured, _prompt(c, cmd), "error_analysis", use_cache, refresh, tier=tier): i
+                for i, c in enumerate(clusters)
+            }
+            for done, fut in enumerate(as_completed(futures), start=1):
+                i = futures[fut]
+                try:
+                    results[i] = fut.result()
+                except Exception as e:
+                    errors[i] = f"{type(e).__name__}: {e}"
+                status.update(f"Analysed {done}/{len(clusters)} distinct error(s)…")
+    wall = time.monotonic() - t0
+
+    for i, c in enumerate(clusters):
+        title = _title(i + 1, len(clusters), c)
+        if results[i] is not None:
+            render_structured(results[i], title=title)
+        else:
+            print_box(Text(f"Analysis failed: {errors[i]}"), title=title)
+
+    if machine_output():
+        emit("summary", blocks=len(blocks), clusters=len(clusters), failed=sum(1 for e in errors if e), wall=round(wall, 3))
+    else:
+        console.print(
+            f"[dim]{len(blocks)} error block(s) in {len(clusters)} cluster(s), analysed in {wall:.1f}s[/dim]"
+        )
+    return sum(1 for e in errors if e)
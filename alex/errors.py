@@ -1,46 +1,408 @@
-import os, re
+import os, re, hashlib
 from datetime import datetime
-from typing import List, Optional
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 
-ERROR_TS_RE = re.compile(r"^----\s+(\d{4}-\d{2}-\d{2}(?:\s+\d{2}:\d{2}:\d{2})?)\s+----", re.MULTILINE)
+from .cache import cache_dir
 
-def read_error_log_blocks(path: str) -> List[str]:
-    if not os.path.isfile(path):
-        return []
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        data = f.read().strip()
+TS_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+BLOCK_MARK = b"---- "
+_HEADER_TS_RE = re.compile(rb"----\s+(\d{4}-\d{2}-\d{2}(?:\s+\d{2}:\d{2}:\d{2})?)\s+----")
+_TAIL_CHUNK = 64 * 1024
+
+INDEX_MAGIC = "alex-errlog-index-1"
+# fixed width so the header can be rewritten in place after appending entries
+_INDEX_HEADER = INDEX_MAGIC + " {inode:>20} {size:>20}\n"
+
+
+def _split_blocks(data: str) -> List[str]:
+    data = data.strip()
     if not data:
         return []
     return [("---- " + b.strip()) for b in data.split("---- ") if b.strip()]
 
-def parse_block_time(block: str) -> Optional[datetime]:
-    m = ERROR_TS_RE.search(block)
-    if not m:
+
+def _read_from(path: str, offset: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read().decode("utf-8", errors="ignore")
+
+
+def read_error_log_blocks(path: str, last: Optional[int] = None, since: Optional[str] = None) -> List[str]:
+    """
+    Blocks of the shell-hook error log, oldest first. The rotated
+    <path>.1 is read too when the current file alone is not enough.
+
+    last:  only the last N blocks are needed (read backwards from EOF).
+    since: blocks older than this are not needed (sidecar offset index).
+    Both are hints - callers still run filter_error_blocks on the result.
+    """
+    blocks = _read_blocks(path, last, since)
+    older = path + ".1"
+    if (not last or len(blocks) < last) and os.path.isfile(older):
+        blocks = _read_blocks(older, last - len(blocks) if last else None, since) + blocks
+    return blocks
+
+
+def _read_blocks(path: str, last: Optional[int], since: Optional[str]) -> List[str]:
+    if not os.path.isfile(path):
+        return []
+
+    if since:
+        offset = _since_offset(path, parse_since(since))
+        if offset is not None:
+            blocks = _split_blocks(_read_from(path, offset))
+            return blocks[-last:] if last else blocks
+
+    if last:
+        return _tail_blocks(path, last)
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return _split_blocks(f.read())
+
+
+def _tail_blocks(path: str, n: int) -> List[str]:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        while pos > 0:
+            step = min(_TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            # n+1 marks => the last n blocks are complete even if the chunk cut the first one
+            if buf.count(BLOCK_MARK) > n:
+                break
+
+    blocks = _split_blocks(buf.decode("utf-8", errors="ignore"))
+    if pos > 0:
+        # first piece may be the cut-off tail of an older block
+        blocks = blocks[1:]
+    return blocks[-n:]
+
+
+def clear_error_log(path: str) -> None:
+    open(path, "w").close()
+    for p in (_index_path(path), Path(path + ".1"), _index_path(path + ".1")):
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+
+# ---- sidecar index: one fixed-width "<offset>\t<timestamp>" line per block start ----
+# Fixed-width lines let --since binary-search the index file with seeks
+# instead of loading it, and let updates append without rewriting.
+
+_INDEX_LINE = "{off:020d}\t{ts}\n"
+_INDEX_LINE_LEN = 20 + 1 + 19 + 1
+_NO_TS = "0000-00-00 00:00:00"
+
+
+def _index_path(path: str) -> Path:
+    h = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return cache_dir() / f"errlog-{h}.idx"
+
+
+def _norm_ts(ts: str) -> str:
+    """Normalize a header timestamp so plain string order == time order."""
+    ts = " ".join(ts.split())
+    return ts if len(ts) > 10 else ts + " 00:00:00"
+
+
+def _scan_marks(data: bytes, base: int, min_offset: int, prev_ts: str) -> List[Tuple[int, str]]:
+    entries = []
+    pos = data.find(BLOCK_MARK)
+    while pos != -1:
+        if base + pos >= min_offset:
+            m = _HEADER_TS_RE.match(data, pos)
+            # blocks without a timestamp inherit the previous one to keep the index sorted
+            ts = _norm_ts(m.group(1).decode("ascii")) if m else prev_ts
+            entries.append((base + pos, ts))
+            prev_ts = ts
+        pos = data.find(BLOCK_MARK, pos + 1)
+    return entries
+
+
+def _index_entry(f, i: int) -> Tuple[int, str]:
+    f.seek(len(_INDEX_HEADER.format(inode=0, size=0)) + i * _INDEX_LINE_LEN)
+    line = f.read(_INDEX_LINE_LEN)
+    return int(line[:20]), line[21:40].decode("ascii")
+
+
+def _index_count(f) -> int:
+    f.seek(0, os.SEEK_END)
+    return (f.tell() - len(_INDEX_HEADER.format(inode=0, size=0))) // _INDEX_LINE_LEN
+
+
+def _indexed_size(idx: Path, st: os.stat_result) -> Optional[int]:
+    try:
+        with open(idx, "r", encoding="ascii") as f:
+            header = f.readline().split()
+    except OSError:
+        return None
+    if len(header) != 3 or header[0] != INDEX_MAGIC:
+        return None
+    inode, size = int(header[1]), int(header[2])
+    if inode != st.st_ino or size > st.st_size:
+        # log was rotated or cleared
+        return None
+    return size
+
+
+def update_index(path: str) -> Optional[Path]:
+    """
+    Bring the sidecar index up to date, reading only bytes appended since
+    the last update. Returns the index path, or None if it cannot be used
+    (e.g. cache dir not writable).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    idx = _index_path(path)
+    indexed = _indexed_size(idx, st)
+    if indexed == st.st_size:
+        return idx
+
+    last_off, prev_ts = -1, _NO_TS
+    if indexed is not None:
+        with open(idx, "rb") as f:
+            n = _index_count(f)
+            if n:
+                last_off, prev_ts = _index_entry(f, n - 1)
+
+    # re-read a few bytes before the boundary in case a mark was cut by a write in progress
+    start = max(0, (indexed or 0) - len(BLOCK_MARK))
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(st.st_size - start)
+    new = _scan_marks(data, start, last_off + 1, prev_ts)
+    header = _INDEX_HEADER.format(inode=st.st_ino, size=start + len(data))
+
+    try:
+        idx.parent.mkdir(parents=True, exist_ok=True)
+        if indexed is not None:
+            with open(idx, "r+", encoding="ascii") as f:
+                f.seek(0, os.SEEK_END)
+                f.writelines(_INDEX_LINE.format(off=off, ts=ts) for off, ts in new)
+                f.seek(0)
+                f.write(header)
+        else:
+            tmp = idx.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="ascii") as f:
+                f.write(header)
+                f.writelines(_INDEX_LINE.format(off=off, ts=ts) for off, ts in new)
+            os.replace(tmp, idx)
+    except OSError:
         return None
-    ts = m.group(1)
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+
+    return idx
+
+
+def _since_offset(path: str, cutoff: datetime) -> Optional[int]:
+    idx = update_index(path)
+    if idx is None:
+        return None
+    want = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    # the log is append-only, so timestamps are (practically) sorted
+    with open(idx, "rb") as f:
+        lo, hi = 0, _index_count(f)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _index_entry(f, mid)[1] < want:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == _index_count(f):
+            return os.path.getsize(path)
+        return _index_entry(f, lo)[0]
+
+
+def parse_since(since: str) -> datetime:
+    for fmt in TS_FORMATS:
         try:
-            return datetime.strptime(ts, fmt)
+            return datetime.strptime(since, fmt)
         except ValueError:
             pass
-    return None
+    raise ValueError("Invalid --since format")
 
-def filter_error_blocks(blocks: List[str], since: Optional[str], grep: Optional[str]) -> List[str]:
+
+@dataclass
+class ErrorBlock:
+    text: str
+    ts: Optional[datetime]
+    exit_code: Optional[int]
+    command: str
+    # only in records of the current hook
+    cwd: Optional[str] = None
+    duration: Optional[float] = None
+
+
+_BLOCK_HEADER_RE = re.compile(
+    r"^----\s+(\d{4}-\d{2}-\d{2}(?:\s+\d{2}:\d{2}(?::\d{2})?)?)\s+----"
+    r"(?:\s*\nExit code:\s*(-?\d+)\s*\|\s*Command:\s*([^\n]*))?"
+    r"(?:\nCwd:\s*(.*?)(?:\s*\|\s*Duration:\s*(\d+(?:\.\d+)?)s)?[ \t]*(?=\n|$))?"
+)
+
+
+def _parse_ts(ts: str) -> Optional[datetime]:
+    try:
+        # one C call instead of trying three strptime formats
+        return datetime.fromisoformat(" ".join(ts.split()))
+    except ValueError:
+        return None
+
+
+def parse_block(block: str) -> ErrorBlock:
+    """Parse a block header once: timestamp, exit code and failed command."""
+    m = _BLOCK_HEADER_RE.match(block)
+    if not m:
+        return ErrorBlock(text=block, ts=None, exit_code=None, command="")
+    code, duration = m.group(2), m.group(5)
+    return ErrorBlock(
+        text=block,
+        ts=_parse_ts(m.group(1)),
+        exit_code=int(code) if code is not None else None,
+        command=(m.group(3) or "").strip(),
+        cwd=m.group(4),
+        duration=float(duration) if duration is not None else None,
+    )
+
+
+def parse_block_time(block: str) -> Optional[datetime]:
+    return parse_block(block).ts
+
+
+def _since_start(blocks: Sequence[str], cutoff: datetime) -> int:
+    """
+    First index whose block is not older than cutoff. The log is appended in
+    time order, so this is a binary search; blocks without a timestamp sort first.
+    """
+    lo, hi = 0, len(blocks)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        ts = parse_block(blocks[mid]).ts
+        if ts is None or ts < cutoff:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def iter_error_blocks(
+    blocks: Sequence[str],
+    since: Optional[str] = None,
+    grep: Union[str, Sequence[str], None] = None,
+    regex: Optional[str] = None,
+    exit_code: Optional[int] = None,
+    command: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Stream blocks matching all given filters, in log order.
+
+    grep:    one or more case-insensitive substrings, all must match
+    regex:   Python regex searched in the whole block
+    exit_code / command: matched against the parsed header
+    """
+    terms = [grep] if isinstance(grep, str) else list(grep or [])
+    matchers = [re.compile(re.escape(t), re.IGNORECASE) for t in terms if t]
+    if regex:
+        try:
+            matchers.append(re.compile(regex, re.MULTILINE))
+        except re.error as e:
+            raise ValueError(f"Invalid --regex: {e}")
+    cmd_rx = re.compile(re.escape(command), re.IGNORECASE) if command else None
+    need_header = since is not None or exit_code is not None or cmd_rx is not None
+
+    start = 0
+    cutoff = None
     if since:
-        cutoff = None
-        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
-            try:
-                cutoff = datetime.strptime(since, fmt)
-                break
-            except ValueError:
-                pass
-        if cutoff is None:
-            raise ValueError("Invalid --since format")
+        cutoff = parse_since(since)
+        start = _since_start(blocks, cutoff)
 
-        blocks = [b for b in blocks if (parse_block_time(b) and parse_block_time(b) >= cutoff)]
+    for i in range(start, len(blocks)):
+        b = blocks[i]
+        if need_header:
+            hdr = parse_block(b)
+            if cutoff is not None and (hdr.ts is None or hdr.ts < cutoff):
+                continue
+            if exit_code is not None and hdr.exit_code != exit_code:
+                continue
+            if cmd_rx and not cmd_rx.search(hdr.command):
+                continue
+        if all(rx.search(b) for rx in matchers):
+            yield b
 
-    if grep:
-        g = grep.lower()
-        blocks = [b for b in blocks if g in b.lower()]
 
-    return blocks
+def filter_error_blocks(
+    blocks: Sequence[str],
+    since: Optional[str],
+    grep: Union[str, Sequence[str], None],
+    regex: Optional[str] = None,
+    exit_code: Optional[int] = None,
+    command: Optional[str] = None,
+) -> List[str]:
+    return list(iter_error_blocks(blocks, since, grep, regex=regex, exit_code=exit_code, command=command))
+
+
+_PATH_RE = re.compile(r"(?<![\w<])(?:~|\.{1,2})?/[^\s:'\"()\[\],]+")
+
+
+def fingerprint_block(block: str) -> str:
+    """
+    Identity of an error regardless of when and where it happened: exit code,
+    command and output with paths, numbers, ids and timestamps masked.
+    """
+    from .logreduce import template_of
+
+    hdr = parse_block(block)
+    m = _BLOCK_HEADER_RE.match(block)
+    body = block[m.end():] if m else block
+
+    def norm(s: str) -> str:
+        return " ".join(template_of(_PATH_RE.sub("<PATH>", s)).lower().split())
+
+    key = f"{hdr.exit_code}\n{norm(hdr.command)}\n{norm(body)}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class ErrorCluster:
+    fingerprint: str
+    blocks: List[ErrorBlock]
+
+    @property
+    def count(self) -> int:
+        return len(self.blocks)
+
+    @property
+    def representative(self) -> ErrorBlock:
+        # the newest occurrence, closest to the current state of the machine
+        return self.blocks[-1]
+
+    @property
+    def first_ts(self) -> Optional[datetime]:
+        return self.blocks[0].ts
+
+    @property
+    def last_ts(self) -> Optional[datetime]:
+        return self.blocks[-1].ts
+
+
+def cluster_error_blocks(blocks: Sequence[str]) -> List[ErrorCluster]:
+    """Group blocks by fingerprint; most frequent first, ties by latest occurrence."""
+    clusters: dict = {}
+    last_seen: dict = {}
+    for i, b in enumerate(blocks):
+        fp = fingerprint_block(b)
+        c = clusters.get(fp)
+        if c is None:
+            c = clusters[fp] = ErrorCluster(fingerprint=fp, blocks=[])
+        c.blocks.append(parse_block(b))
+        last_seen[fp] = i
+    return sorted(clusters.values(), key=lambda c: (-c.count, -last_seen[c.fingerprint]))
@@ -1,26 +1,17 @@
-import os, shlex, subprocess, re
-from typing import Optional
+import os, selectors, shlex, signal, subprocess, re, threading, time
+from typing import List, Optional
+
+from . import metrics
+from .safety import FALLBACK_PATTERNS, classify
 
 APT_WARNING_RE = re.compile(r"^WARNING: apt does not have a stable CLI interface\.", re.IGNORECASE)
 
-BLACKLIST_PATTERNS = [
-    (re.compile(r"\brm\s+-rf\b", re.IGNORECASE), "rm -rf is destructive"),
-    (re.compile(r"\bmkfs(\.|$)", re.IGNORECASE), "mkfs formats filesystems"),
-    (re.compile(r"\bdd\b.*\bif=", re.IGNORECASE), "dd can overwrite disks"),
-    (re.compile(r":\(\)\s*\{\s*:\s*\|\s*:\s*&\s*\}\s*;\s*:", re.IGNORECASE), "fork bomb"),
-    (re.compile(r"\bshutdown\b|\breboot\b|\bpoweroff\b", re.IGNORECASE), "system power control"),
-    (re.compile(r"\b(chmod|chown)\b\s+-R\s+/\b", re.IGNORECASE), "recursive permission change on /"),
-    (re.compile(r"(?:^|\s)>(?:>?)\s*/etc/", re.IGNORECASE), "redirect into /etc"),
-    (re.compile(r"\btee\b.*\s/etc/", re.IGNORECASE), "writing into /etc"),
-    (re.compile(r"\bcurl\b.*\|\s*(bash|sh)\b", re.IGNORECASE), "pipe to shell"),
-    (re.compile(r"\bwget\b.*\|\s*(bash|sh)\b", re.IGNORECASE), "pipe to shell"),
-]
+# the regex list now lives in safety.py (used there when a command can't be tokenized)
+BLACKLIST_PATTERNS = FALLBACK_PATTERNS
 
 def classify_blacklist(cmd: str) -> Optional[str]:
-    for rx, reason in BLACKLIST_PATTERNS:
-        if rx.search(cmd):
-            return reason
-    return None
+    """Reason the command is dangerous (rules + user policy from config), or None."""
+    return classify(cmd)
 
 def clean_stderr(stderr: str) -> str:
     lines = []
@@ -38,22 +29,239 @@ def normalize_command(cmd: str) -> str:
         c += " --no-pager"
     return c
 
-def run_command(cmd: str) -> subprocess.CompletedProcess:
+DEFAULT_COMMAND_TIMEOUT = 300
+# at least this much of head and of tail is kept (service_diag sends 8000 chars of stdout)
+MIN_CAPTURE_CHARS = 8000
+_READ_CHUNK = 65536
+# a detached grandchild may still hold the pipes open after the command exits
+_DRAIN_GRACE = 2.0
+
+
+class CommandResult(subprocess.CompletedProcess):
+    """
+    CompletedProcess plus capture details.
+    stdout/stderr hold at most head+tail of the output, total sizes are in *_bytes.
+    """
+
+    def __init__(self, args, returncode, stdout="", stderr="", stdout_bytes=0, stderr_bytes=0,
+                 truncated=False, timed_out=False, duration=0.0):
+        super().__init__(args, returncode, stdout, stderr)
+        self.stdout_bytes = stdout_bytes
+        self.stderr_bytes = stderr_bytes
+        self.truncated = truncated
+        self.timed_out = timed_out
+        self.duration = duration
+
+
+class _BoundedCapture:
+    """Keeps the first `head` and the last `tail` bytes of a stream."""
+
+    def __init__(self, head: int, tail: int):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail += chunk
+            over = len(self.tail) - self.tail_limit
+            if over > 0:
+                del self.tail[:over]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.head) + len(self.tail)
+
+    def text(self) -> str:
+        head = self.head.decode("utf-8", errors="replace")
+        tail = self.tail.decode("utf-8", errors="replace")
+        if not self.truncated:
+            return head + tail
+        dropped = self.total - len(self.head) - len(self.tail)
+        return f"{head}\n… [{dropped} bytes truncated] …\n{tail}"
+
+
+def _wait_and_wake(proc: subprocess.Popen, fd: int) -> None:
+    proc.wait()
+    os.write(fd, b"\0")
+
+
+def _descendants(pid: int) -> List[int]:
+    children = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for e in entries:
+        if not e.isdigit():
+            continue
+        try:
+            with open(f"/proc/{e}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # "pid (comm) state ppid ..." - comm may contain spaces
+        ppid = int(stat.rsplit(b")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(e))
+    out, todo = [], [pid]
+    while todo:
+        for c in children.get(todo.pop(), []):
+            out.append(c)
+            todo.append(c)
+    return out
+
+
+def _kill(proc: subprocess.Popen, own_group: bool) -> None:
+    try:
+        if own_group:
+            os.killpg(proc.pid, signal.SIGKILL)
+            return
+        for pid in _descendants(proc.pid):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        proc.kill()
+    except OSError:
+        pass
+
+
+def _capture(args, env, timeout: Optional[float], capture_chars: int, interactive: bool) -> CommandResult:
+    t0 = time.monotonic()
+    # Interactive commands (sudo password prompts...) must stay in the terminal's
+    # foreground process group; everything else gets its own session so a
+    # timeout can take down the whole process group.
+    own_group = not interactive
+    proc = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=None if interactive else subprocess.DEVNULL,
+        env=env,
+        start_new_session=own_group,
+    )
+
+    out = _BoundedCapture(capture_chars, capture_chars)
+    err = _BoundedCapture(capture_chars, capture_chars)
+    # The pipes are read and closed by this thread only, so no reader can be left
+    # inside os.read() on an fd that is closed (and reused) under it. The waiter
+    # thread just reaps the process and wakes the selector through a self-pipe.
+    wake_r, wake_w = os.pipe()
+    waiter = threading.Thread(target=_wait_and_wake, args=(proc, wake_w), daemon=True)
+    waiter.start()
+    sel = selectors.DefaultSelector()
+    sel.register(proc.stdout.fileno(), selectors.EVENT_READ, out)
+    sel.register(proc.stderr.fileno(), selectors.EVENT_READ, err)
+    sel.register(wake_r, selectors.EVENT_READ, None)
+
+    deadline = t0 + timeout if timeout else None
+    timed_out = False
+    exited_at = None
+    pipes = 2
+    try:
+        while exited_at is None or (pipes and time.monotonic() < exited_at + _DRAIN_GRACE):
+            if exited_at is None and deadline is not None and time.monotonic() >= deadline:
+                timed_out = True
+                _kill(proc, own_group)
+                deadline = None  # the waiter wakes us once it is reaped
+            limit = exited_at + _DRAIN_GRACE if exited_at is not None else deadline
+            for key, _ in sel.select(None if limit is None else max(0.0, limit - time.monotonic())):
+                if key.data is None:
+                    sel.unregister(wake_r)
+                    exited_at = time.monotonic()
+                    continue
+                try:
+                    chunk = os.read(key.fd, _READ_CHUNK)
+                except OSError:
+                    chunk = b""
+                if chunk:
+                    key.data.feed(chunk)
+                else:
+                    sel.unregister(key.fd)
+                    pipes -= 1
+    finally:
+        sel.close()
+        if proc.poll() is None:
+            _kill(proc, own_group)
+        waiter.join()
+        for fd in (wake_r, wake_w):
+            os.close(fd)
+        proc.stdout.close()
+        proc.stderr.close()
+
+    stderr = err.text()
+    returncode = proc.returncode
+    if timed_out:
+        stderr += f"\nalex: command timed out after {timeout:g}s (killed)\n"
+        returncode = 124
+
+    return CommandResult(
+        args=args,
+        returncode=returncode,
+        stdout=out.text(),
+        stderr=stderr,
+        stdout_bytes=out.total,
+        stderr_bytes=err.total,
+        truncated=out.truncated or err.truncated,
+        timed_out=timed_out,
+        duration=time.monotonic() - t0,
+    )
+
+
+def run_command(
+    cmd: str,
+    timeout: Optional[float] = None,
+    max_output_chars: Optional[int] = None,
+    interactive: bool = False,
+) -> CommandResult:
+    """
+    Run a command with bounded output capture and a wall-clock timeout.
+    timeout/max_output_chars default to the user config (command_timeout, max_output_chars).
+    """
     shell_ops = ["|", "&&", "||", ";", ">", "<", "$(", "`"]
     cmd = normalize_command(cmd)
 
+    from .user_config import load_config
+
+    cfg = load_config()
+    if timeout is None:
+        timeout = cfg.command_timeout
+    if max_output_chars is None:
+        max_output_chars = cfg.max_output_chars
+    capture_chars = max(int(max_output_chars or 0), MIN_CAPTURE_CHARS)
+
     env = os.environ.copy()
     env["SYSTEMD_PAGER"] = "cat"
     env["SYSTEMD_LESS"] = "FRSXMK"
 
+    session = False
     try:
         if any(op in cmd for op in shell_ops):
-            return subprocess.run(["bash", "-lc", cmd], text=True, capture_output=True, env=env)
-        args = shlex.split(cmd)
-        return subprocess.run(args, text=True, capture_output=True, env=env)
+            from .shell_session import needs_isolation, run_in_session
+
+            session = bool(cfg.shell_session) and not needs_isolation(cmd, interactive)
+            if session:
+                result = run_in_session(cmd, env, timeout, capture_chars, interactive)
+            else:
+                result = _capture(["bash", "-lc", cmd], env, timeout, capture_chars, interactive)
+        else:
+            result = _capture(shlex.split(cmd), env, timeout, capture_chars, interactive)
 
     except FileNotFoundError:
         missing = shlex.split(cmd)[0] if cmd.strip() else cmd
-        return subprocess.CompletedProcess(args=cmd, returncode=127, stdout="", stderr=f"bash: {missing}: command not found\n")
+        result = CommandResult(args=cmd, returncode=127, stdout="", stderr=f"bash: {missing}: command not found\n")
     except Exception as e:
-        return subprocess.CompletedProcess(args=cmd, returncode=1, stdout="", stderr=f"alex: failed to run command: {e}\n")
+        result = CommandResult(args=cmd, returncode=1, stdout="", stderr=f"alex: failed to run command: {e}\n")
+
+    metrics.record(
+        "exec", exit=result.returncode, duration=round(result.duration, 3),
+        timed_out=result.timed_out, truncated=result.truncated, session=session,
+    )
+    return result
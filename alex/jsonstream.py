@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def parse_partial(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Best-effort parse of an incomplete JSON object (as it arrives from a stream).
+
+    Open strings, arrays and objects are closed; if the tail is not repairable
+    (half a key, a dangling ':' or a cut literal), we fall back to the last
+    point where a value was complete.
+    """
+    stack: List[str] = []
+    in_str = False
+    esc = False
+    # (end index, closers needed at that point)
+    checkpoint: Optional[Tuple[int, str]] = None
+
+    for i, ch in enumerate(text):
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+
+        if ch == '"':
+            in_str = True
+        elif ch == "{":
+            stack.append("}")
+            checkpoint = (i + 1, "".join(reversed(stack)))
+        elif ch == "[":
+            stack.append("]")
+            checkpoint = (i + 1, "".join(reversed(stack)))
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            checkpoint = (i + 1, "".join(reversed(stack)))
+        elif ch == ",":
+            checkpoint = (i, "".join(reversed(stack)))
+
+    if not stack and not in_str:
+        return _loads(text)
+
+    head = text
+    if in_str:
+        if esc:
+            head = head[:-1]
+        head += '"'
+    data = _loads(head + "".join(reversed(stack)))
+    if data is not None:
+        return data
+
+    if checkpoint:
+        end, closers = checkpoint
+        return _loads(text[:end] + closers)
+    return None
+
+
+def _loads(s: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(s)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,95 @@
+"""
+Journal condensing for model prompts.
+
+Crash-looping units fill `journalctl -n 200` with the same few lines that only
+differ in PIDs, timestamps and counters. reduce_journal() groups lines by
+template (variable tokens masked) and prints each repeated template once, as
+its first real line with a count and first/last time. Lines that occur once
+(usually the interesting error) are kept verbatim, order is preserved.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# below this there is nothing worth condensing
+MIN_LINES = 20
+
+_TS = r"(?:[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d(?:\.\d+)?|\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?(?:[+-]\d\d:?\d\d|Z)?)"
+# journalctl short / short-iso / short-precise: "<ts> <host> <ident>[<pid>]: <message>"
+JOURNAL_LINE_RE = re.compile(rf"^(?P<ts>{_TS}) (?P<host>\S+) (?P<ident>[^\s\[:]+)(?:\[\d+\])?: (?P<msg>.*)$")
+
+# order matters: specific shapes first, plain numbers last
+_MASKS = [
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<UUID>"),
+    (re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE), "<HEX>"),
+    (re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{8,}\b", re.IGNORECASE), "<HEX>"),
+    (re.compile(r"\d+(?:[.:]\d+)*"), "<N>"),
+]
+
+
+def template_of(message: str) -> str:
+    for rx, repl in _MASKS:
+        message = rx.sub(repl, message)
+    return message
+
+
+@dataclass
+class _Group:
+    first: str  # first line verbatim
+    first_ts: str
+    last_ts: str
+    count: int = 1
+
+
+def reduce_journal(text: str, min_lines: int = MIN_LINES) -> str:
+    """
+    Condensed journal text, or text unchanged when it is short or does not
+    get any smaller.
+    """
+    lines = text.splitlines()
+    if len(lines) < min_lines:
+        return text
+
+    groups: Dict[str, _Group] = {}
+    order: List[str] = []
+    for line in lines:
+        m = JOURNAL_LINE_RE.match(line)
+        if m:
+            key = m.group("ident") + "\0" + template_of(m.group("msg"))
+            ts = m.group("ts")
+        else:
+            # "-- Boot ... --", "-- No entries --", wrapped continuation lines
+            key, ts = "\0" + template_of(line), ""
+        g = groups.get(key)
+        if g is None:
+            groups[key] = _Group(first=line, first_ts=ts, last_ts=ts)
+            order.append(key)
+        else:
+            g.count += 1
+            if ts:
+                g.last_ts = ts
+
+    if len(order) == len(lines):
+        return text
+
+    out = [f"[journal condensed: {len(lines)} lines -> {len(order)} distinct; repeated lines shown once with count and time range]"]
+    for key in order:
+        g = groups[key]
+        if g.count == 1:
+            out.append(g.first)
+        else:
+            span = f", {g.first_ts} .. {g.last_ts}" if g.first_ts and g.last_ts != g.first_ts else ""
+            out.append(f"[x{g.count}{span}] {g.first}")
+
+    reduced = "\n".join(out)
+    return reduced if len(reduced) < len(text) else text
+
+
+def maybe_reduce(cmd: Optional[str], text: str) -> str:
+    """reduce_journal for journalctl output; anything else is returned as is."""
+    if not cmd or "journalctl" not in cmd:
+        return text
+    return reduce_journal(text)
@@ -0,0 +1,223 @@
+"""
+Local telemetry: every model call and every executed command appends one
+JSON line to metrics.jsonl in the cache dir. `alex stats` aggregates it and
+can export a Prometheus textfile for node_exporter's textfile collector.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .cache import cache_dir
+
+# rotated to metrics.jsonl.1 beyond this (one old file is kept)
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+# set once by cli.main() so records know which subcommand produced them
+subcommand = ""
+
+
+def metrics_path() -> Path:
+    return cache_dir() / "metrics.jsonl"
+
+
+def _enabled() -> bool:
+    from .user_config import load_config
+
+    return bool(load_config().metrics)
+
+
+def record(kind: str, **fields: Any) -> None:
+    """Append one record. Never raises - telemetry must not break a command."""
+    try:
+        if not _enabled():
+            return
+        rec = {"ts": round(time.time(), 3), "kind": kind, "sub": subcommand, **fields}
+        line = (json.dumps(rec, separators=(",", ":")) + "\n").encode("utf-8")
+        path = metrics_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # O_APPEND + one write() per record: concurrent writers (diag threads, parallel alex runs) don't interleave
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, line)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > METRICS_MAX_BYTES:
+            _rotate(path)
+    except Exception:
+        pass
+
+
+def _rotate(path: Path) -> None:
+    # several writers can cross the limit at once: only the first to get the lock
+    # rotates, the others see the fresh file and leave .1 alone
+    with open(path.with_name("metrics.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.stat(path).st_size <= METRICS_MAX_BYTES:
+                return
+        except FileNotFoundError:
+            return
+        os.replace(path, path.with_name(path.name + ".1"))
+
+
+def call_cost(rec: Dict[str, Any]) -> Optional[float]:
+    price = MODEL_PRICES.get(rec.get("model") or "")
+    if price is None or rec.get("cache_hit"):
+        return None if price is None else 0.0
+    cached = int(rec.get("cached", 0))
+    uncached = max(int(rec.get("input", 0)) - cached, 0)
+    return (uncached * price[0] + cached * price[1] + int(rec.get("output", 0)) * price[2]) / 1_000_000
+
+
+def load_records(since: Optional[float] = None) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    path = metrics_path()
+    for p in (path.with_name(path.name + ".1"), path):
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn line after a crash
+                    if since is None or rec.get("ts", 0) >= since:
+                        out.append(rec)
+        except OSError:
+            continue
+    return out
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in 0..100."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, math.ceil(q / 100 * len(s)) - 1))
+    return s[k]
+
+
+def _group(records: Iterable[Dict[str, Any]], key) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+        "calls": 0, "cache_hits": 0, "errors": 0, "latency": [], "input": 0, "cached": 0, "output": 0,
+        "cost": 0.0, "cost_known": True, "commands": 0, "failed": 0, "timed_out": 0, "duration": [],
+    })
+    for r in records:
+        g = groups[key(r)]
+        if r.get("kind") == "model":
+            g["calls"] += 1
+            if r.get("error"):
+                g["errors"] += 1
+                continue
+            if r.get("cache_hit"):
+                g["cache_hits"] += 1
+                continue
+            g["latency"].append(float(r.get("latency", 0.0)))
+            g["input"] += int(r.get("input", 0))
+            g["cached"] += int(r.get("cached", 0))
+            g["output"] += int(r.get("output", 0))
+            cost = call_cost(r)
+            if cost is None:
+                g["cost_known"] = False
+            else:
+                g["cost"] += cost
+        elif r.get("kind") == "exec":
+            g["commands"] += 1
+            g["duration"].append(float(r.get("duration", 0.0)))
+            if r.get("exit") != 0:
+                g["failed"] += 1
+            if r.get("timed_out"):
+                g["timed_out"] += 1
+    return dict(groups)
+
+
+def summarize(g: Dict[str, Any]) -> Dict[str, Any]:
+    """A _group() entry with percentiles instead of the raw latency/duration lists."""
+    lat, dur = g["latency"], g["duration"]
+    return {
+        "calls": g["calls"], "cache_hits": g["cache_hits"], "errors": g["errors"],
+        **{f"latency_p{q}": round(percentile(lat, q), 3) for q in (50, 90, 99)},
+        "input_tokens": g["input"], "cached_tokens": g["cached"], "output_tokens": g["output"],
+        "cost_usd": round(g["cost"], 6), "cost_known": g["cost_known"],
+        "commands": g["commands"], "failed": g["failed"], "timed_out": g["timed_out"],
+        "duration_p50": round(percentile(dur, 50), 3), "duration_p95": round(percentile(dur, 95), 3),
+        "duration_total": round(sum(dur), 3),
+    }
+
+
+def by_subcommand(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return _group(records, lambda r: r.get("sub") or "-")
+
+
+def by_day(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return _group(records, lambda r: time.strftime("%Y-%m-%d", time.localtime(r.get("ts", 0))))
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(records: List[Dict[str, Any]], window: str = "all") -> str:
+    # The records come from a --days window over a rotated file, so the values can go
+    # down between scrapes: gauges and summaries labelled with the window, no counters.
+    groups = by_subcommand(records)
+    gauges = [
+        ("alex_model_calls", "Model calls (including cache hits and errors).", "calls"),
+        ("alex_model_cache_hits", "Model calls answered from the response cache.", "cache_hits"),
+        ("alex_model_errors", "Model calls that failed.", "errors"),
+        ("alex_model_input_tokens", "Input tokens sent to the model.", "input"),
+        ("alex_model_cached_tokens", "Input tokens served from the provider's prompt cache.", "cached"),
+        ("alex_model_output_tokens", "Output tokens generated by the model.", "output"),
+        ("alex_model_cost_usd", "Estimated model cost in USD (known models only).", "cost"),
+        ("alex_commands", "Shell commands executed.", "commands"),
+        ("alex_commands_failed", "Shell commands with a non-zero exit code.", "failed"),
+        ("alex_commands_timed_out", "Shell commands killed by the timeout.", "timed_out"),
+    ]
+    summaries = [
+        ("alex_model_latency_seconds", "Model call latency.", "latency"),
+        ("alex_command_duration_seconds", "Shell command run time.", "duration"),
+    ]
+    lines = []
+    for name, help_text, field in gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for sub, g in sorted(groups.items()):
+            value = g[field]
+            if isinstance(value, float):
+                value = round(value, 6)
+            lines.append(f'{name}{{subcommand="{_label(sub)}",window="{_label(window)}"}} {value}')
+    for name, help_text, field in summaries:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} summary")
+        for sub, g in sorted(groups.items()):
+            labels = f'subcommand="{_label(sub)}",window="{_label(window)}"'
+            values = g[field]
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f'{name}{{{labels},quantile="{q}"}} {round(percentile(values, q * 100), 6)}')
+            lines.append(f"{name}_sum{{{labels}}} {round(sum(values), 6)}")
+            lines.append(f"{name}_count{{{labels}}} {len(values)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, records: List[Dict[str, Any]], window: str = "all") -> None:
+    # textfile collector may read at any moment: write aside, then rename
+    target = Path(path)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.write_text(prometheus_text(records, window), encoding="utf-8")
+    os.replace(tmp, target)
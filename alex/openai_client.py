@@ -1,24 +1,201 @@
+import io
 import json
-from typing import Any, Dict
-from openai import OpenAI
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from .schema import get_unified_schema
 from .system import get_system_info
-from .config import ALEX_DEFAULT_MODEL
 from .user_config import load_config
+from . import cache, metrics, routing
+from .jsonstream import parse_partial
+from .logreduce import reduce_journal
 
 
+@dataclass
+class CallTiming:
+    total: float = 0.0
+    connect: float = 0.0  # TCP connect + TLS handshake (0 when a pooled connection was reused)
+    new_connections: int = 0
 
-def call_responses_structured(prompt: str, intent: str) -> Dict[str, Any]:
-    client = OpenAI()
 
-    sysinfo = get_system_info()
+_client = None
+_client_lock = threading.Lock()
+_local = threading.local()
+
+
+def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    # httpcore trace hook, called in the thread doing the request
+    t = getattr(_local, "timing", None)
+    if t is None:
+        return
+    if event_name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+        _local.connect_started = time.monotonic()
+    elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+        t.connect += time.monotonic() - getattr(_local, "connect_started", time.monotonic())
+        if event_name == "connection.connect_tcp.complete":
+            t.new_connections += 1
+
+
+def _add_trace(request: Any) -> None:
+    request.extensions["trace"] = _trace
+
+
+def get_client() -> Any:
+    """
+    One OpenAI client per process, so every call (and every service
+    diagnosis round) reuses the same keep-alive connection pool.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI, Timeout
+
+            from .replay import make_transport, settings as replay_settings
+
+            # httpx is not our direct dependency, take its Limits class from the SDK's default
+            Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+            cfg = load_config()
+            timeout = Timeout(float(cfg.api_timeout), connect=float(cfg.api_connect_timeout))
+            limits = Limits(
+                max_connections=int(cfg.api_max_connections),
+                max_keepalive_connections=int(cfg.api_max_connections),
+                keepalive_expiry=float(cfg.api_keepalive),
+            )
+            extra: Dict[str, Any] = {}
+            replay = replay_settings(cfg)
+            if replay.mode:
+                # cassettes instead of (or in front of) the network, see alex/replay.py
+                extra["transport"] = make_transport(replay, limits)
+            http_client = DefaultHttpxClient(
+                timeout=timeout,
+                limits=limits,
+                event_hooks={"request": [_add_trace]},
+                **extra,
+            )
+            _client = OpenAI(base_url=cfg.api_base_url or None, timeout=timeout, http_client=http_client)
+    return _client
+
+
+def last_timing() -> Optional[CallTiming]:
+    """Timing of the last model call made by the current thread."""
+    return getattr(_local, "last", None)
+
+
+def _timed(fn: Callable[[], Any]) -> Any:
+    _local.timing = CallTiming()
+    t0 = time.monotonic()
+    try:
+        return fn()
+    finally:
+        _local.timing.total = time.monotonic() - t0
+        _local.last = _local.timing
+        _local.timing = None
+
+
+def _output_text(resp: Any) -> str:
+    raw = getattr(resp, "output_text", None)
+    if callable(raw):
+        raw = resp.output_text()
+    if not raw:
+        raw = str(resp)
+    return raw
+
+
+# parse_partial reads the whole text so far: ~20 re-parses a second, not one per token
+PARTIAL_INTERVAL = 0.05
+
+
+def _stream_output_text(client: Any, request: Dict[str, Any], on_partial: Callable[[Dict[str, Any]], None]) -> Tuple[str, Any]:
+    """
+    Consume the Responses event stream, feeding partial JSON to on_partial
+    at most every PARTIAL_INTERVAL seconds.
+    Returns the full text and the final response object (id, usage).
+    """
+    buf = io.StringIO()
+    final = None
+    last = 0.0
+    for event in client.responses.create(stream=True, **request):
+        etype = getattr(event, "type", "")
+        if etype == "response.output_text.delta":
+            buf.write(event.delta)
+            now = time.monotonic()
+            if now - last < PARTIAL_INTERVAL:
+                continue
+            last = now
+            partial = parse_partial(buf.getvalue())
+            if partial:
+                on_partial(partial)
+        elif etype == "response.completed":
+            final = event.response
+        elif etype in ("response.failed", "error"):
+            err = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", "")
+            raise RuntimeError(f"Model stream failed: {err}")
+
+    raw = buf.getvalue()
+    if not raw and final is not None:
+        raw = _output_text(final)
+    return raw, final
 
-    cfg = load_config()
 
-    # model: config > env > default
-    model = cfg.model or ALEX_DEFAULT_MODEL
+@dataclass
+class Usage:
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+
+
+def _usage(resp: Any) -> Usage:
+    u = getattr(resp, "usage", None)
+    if u is None:
+        return Usage()
+    details = getattr(u, "input_tokens_details", None)
+    return Usage(
+        input_tokens=getattr(u, "input_tokens", 0) or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        output_tokens=getattr(u, "output_tokens", 0) or 0,
+    )
 
+
+def last_usage() -> Optional[Usage]:
+    """Token usage of the last model call made by the current thread (None for cache hits)."""
+    return getattr(_local, "last_usage", None)
+
+
+@dataclass
+class Conversation:
+    """
+    State of a multi-round exchange (service diagnosis).
+
+    Rounds are chained on the server with previous_response_id, so each round
+    only sends what is new. If the server refuses chaining (e.g. response
+    storage disabled for the org), we fall back to resending the preamble and
+    a compact local summary of earlier rounds instead of everything.
+    """
+    preamble: str = ""
+    previous_response_id: Optional[str] = None
+    server_side: bool = True
+    model: Optional[str] = None  # set by the first round, later rounds stay on it
+    history: List[str] = field(default_factory=list)
+    usage: List[Usage] = field(default_factory=list)
+
+    def remember(self, note: str) -> None:
+        """Add a short line to the local summary used by the fallback."""
+        self.history.append(note)
+
+    def standalone_prompt(self, prompt: str) -> str:
+        parts = [self.preamble] if self.preamble else []
+        if self.history:
+            parts.append("EARLIER ROUNDS (summary):\n" + "\n".join(self.history))
+        parts.append(prompt)
+        return "\n\n".join(parts)
+
+
+def _developer_instructions(cfg: Any) -> str:
     language_line = "Answer in Czech." if (cfg.language or "").lower().startswith("cs") else "Answer in English."
 
 
@@ -28,7 +205,7 @@ def call_responses_structured(prompt: str, intent: str) -> Dict[str, Any]:
         "practical": "Be practical and direct.",
     }.get((cfg.style or "practical").lower(), "Be practical and direct.")
 
-    developer_instructions = (
+    return (
         "You are Alex, a practical Linux CLI assistant.\n"
         f"{language_line}\n"
         f"{style_line}\n"
@@ -44,51 +221,185 @@ def call_responses_structured(prompt: str, intent: str) -> Dict[str, Any]:
         "  - and/or: apt-cache policy <pkg>\n"
         "Only then propose apt install.\n"
         "If apt says 'Unable to locate package', suggest likely correct package names (e.g., stunnel -> stunnel4).\n"
+        "Set confidence=low when the cause is unclear or you are guessing, high only when the input shows it.\n"
 
     )
 
-    user_input = (
-        f"System:\n{sysinfo}\n\n"
-        f"Intent: {intent}\n\n"
-        f"Request:\n{prompt}\n"
-    )
 
+def _chaining_refused(exc: Exception) -> bool:
+    from openai import BadRequestError, NotFoundError
+
+    return isinstance(exc, (BadRequestError, NotFoundError))
+
+
+def last_route() -> Optional[routing.Route]:
+    """Model tier used by the last structured call of the current thread."""
+    return getattr(_local, "last_route", None)
+
+
+def call_responses_structured(
+    prompt: str,
+    intent: str,
+    use_cache: bool = True,
+    refresh: bool = False,
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+    conversation: Optional[Conversation] = None,
+    tier: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    use_cache=False skips the on-disk response cache entirely,
+    refresh=True ignores a cached answer but stores the new one.
+    on_partial switches to streaming and receives the partially parsed answer.
+    conversation makes this one round of a multi-round exchange (see Conversation).
+    tier "fast" escalates a weak answer to the strong model, "strong" starts
+    there, None uses `model` (or the model of the conversation's first round).
+    """
+    cfg = load_config()
+    _local.last_route = None
+    if tier is None and conversation and conversation.model:
+        route = routing.Route(tier="default", model=conversation.model)
+    else:
+        route = routing.Route(tier=tier or "default", model=routing.pick(cfg, tier))
+    prev_id = conversation.previous_response_id if conversation else None
+
+    data = _call(prompt, intent, route.model, use_cache, refresh, on_partial, conversation)
+
+    strong = routing.pick(cfg, "strong")
+    if tier == "fast" and cfg.escalate and strong != route.model:
+        reason = routing.weak_answer(data)
+        if reason:
+            # ask the same question again, not chained onto the weak answer
+            if conversation:
+                conversation.previous_response_id = prev_id
+            route = routing.Route(tier="strong", model=strong, escalated_from=route.model, reason=reason)
+            data = _call(prompt, intent, strong, use_cache, refresh, on_partial, conversation)
+
+    if conversation:
+        conversation.model = route.model
+    _local.last_route = route
+    metrics.record("route", intent=intent, tier=route.tier, model=route.model,
+                   escalated_from=route.escalated_from, reason=route.reason)
+    return data
+
+
+def _call(
+    prompt: str,
+    intent: str,
+    model: str,
+    use_cache: bool,
+    refresh: bool,
+    on_partial: Optional[Callable[[Dict[str, Any]], None]],
+    conversation: Optional[Conversation],
+) -> Dict[str, Any]:
+    sysinfo = get_system_info()
+    cfg = load_config()
+
+    developer_instructions = _developer_instructions(cfg)
     rschema = get_unified_schema()
 
-    resp = client.responses.create(
-        model=ALEX_DEFAULT_MODEL,
-        input=[
-            {"role": "developer", "content": developer_instructions},
-            {"role": "user", "content": user_input},
-        ],
-        text={
-            "format": {
-                "type": "json_schema",
-                "name": rschema["name"],
-                "schema": rschema["schema"],
-                "strict": rschema["strict"],
-            }
-        },
-        temperature=0.2,
+    chained = bool(conversation and conversation.server_side and conversation.previous_response_id)
+    if conversation and not chained:
+        prompt = conversation.standalone_prompt(prompt)
+
+    def build_request(prompt: str, chained: bool) -> Dict[str, Any]:
+        user_input = (
+            f"System:\n{sysinfo}\n\n"
+            f"Intent: {intent}\n\n"
+            f"Request:\n{prompt}\n"
+        )
+        request: Dict[str, Any] = dict(
+            model=model,
+            input=[
+                {"role": "developer", "content": developer_instructions},
+                {"role": "user", "content": user_input},
+            ],
+            text={
+                "format": {
+                    "type": "json_schema",
+                    "name": rschema["name"],
+                    "schema": rschema["schema"],
+                    "strict": rschema["strict"],
+                }
+            },
+            temperature=0.2,
+        )
+        if chained:
+            # developer message, system info and earlier rounds already live on the server
+            request["input"] = [{"role": "user", "content": f"Intent: {intent}\n\n{prompt}\n"}]
+            request["previous_response_id"] = conversation.previous_response_id
+        return request
+
+    # chained rounds depend on server-side state, never serve them from cache
+    use_cache = use_cache and bool(cfg.cache) and not chained
+    cache.stats.last_hit_age = None
+    _local.last_usage = None
+    key = cache.make_key(
+        model=model,
+        schema=rschema["name"],
+        developer=developer_instructions,
+        system=sysinfo,
+        intent=intent,
+        prompt=prompt,
     )
+    if use_cache and not refresh:
+        hit = cache.get(key, ttl=int(cfg.cache_ttl or 0))
+        if hit is not None:
+            if conversation:
+                conversation.previous_response_id = hit.get("response_id")
+            metrics.record("model", intent=intent, model=model, cache_hit=True)
+            return hit["data"]
 
-    raw = getattr(resp, "output_text", None)
-    if callable(raw):
-        raw = resp.output_text()
-    if not raw:
-        raw = str(resp)
+    # the SDK is the slowest import in alex: get_client() imports it lazily, cache hits never need it
+    client = get_client()
+
+    def send(request: Dict[str, Any]) -> Tuple[str, Any]:
+        if on_partial is not None:
+            return _timed(lambda: _stream_output_text(client, request, on_partial))
+        resp = _timed(lambda: client.responses.create(**request))
+        return _output_text(resp), resp
 
     try:
-        return json.loads(raw)
+        try:
+            raw, resp = send(build_request(prompt, chained))
+        except Exception as e:
+            if not (chained and _chaining_refused(e)):
+                raise
+            conversation.server_side = False
+            prompt = conversation.standalone_prompt(prompt)
+            raw, resp = send(build_request(prompt, False))
+    except Exception as e:
+        metrics.record("model", intent=intent, model=model, error=type(e).__name__,
+                       latency=round(last_timing().total, 3) if last_timing() else 0.0)
+        raise
+
+    usage = _usage(resp)
+    _local.last_usage = usage
+    metrics.record(
+        "model", intent=intent, model=model, stream=on_partial is not None,
+        chained=bool(conversation and conversation.server_side and chained),
+        latency=round(last_timing().total, 3),
+        input=usage.input_tokens, cached=usage.cached_tokens, output=usage.output_tokens,
+    )
+    response_id = getattr(resp, "id", None)
+    if conversation:
+        conversation.previous_response_id = response_id
+        conversation.usage.append(usage)
+
+    try:
+        data = json.loads(raw)
     except Exception:
         raise RuntimeError(f"Model returned non-JSON output:\n{raw}")
 
+    if use_cache:
+        cache.put(key, data, max_entries=int(cfg.cache_max_entries or 0), response_id=response_id)
+    return data
+
 def call_service_fix_plan(diag: Dict[str, Any]) -> Dict[str, Any]:
     """
     Ask AI to propose a safe fix plan for a systemd service based on diagnostics + unit file content.
     Returns JSON in a strict schema.
     """
-    client = OpenAI()
+    client = get_client()
 
     # Strict schema for a fix plan
     schema = {
@@ -139,12 +450,14 @@ def call_service_fix_plan(diag: Dict[str, Any]) -> Dict[str, Any]:
         "fragment_path": diag.get("fragment_path", ""),
         "systemctl_show": diag.get("systemctl_show", "")[:12000],
         "systemctl_status": diag.get("systemctl_status", "")[:12000],
-        "journalctl": diag.get("journalctl", "")[:12000],
+        "journalctl": reduce_journal(diag.get("journalctl", ""))[:12000],
         "unit_before": diag.get("unit_before", "")[:20000],
     }
 
-    resp = client.responses.create(
-        model=ALEX_DEFAULT_MODEL,
+    # a fix plan changes the system: always the strong tier
+    model = routing.pick(load_config(), "strong")
+    request = dict(
+        model=model,
         input=[
             {"role": "developer", "content": developer},
             {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
@@ -159,12 +472,21 @@ def call_service_fix_plan(diag: Dict[str, Any]) -> Dict[str, Any]:
         },
         temperature=0.2,
     )
+    try:
+        resp = _timed(lambda: client.responses.create(**request))
+    except Exception as e:
+        metrics.record("model", intent="fix_plan", model=model, error=type(e).__name__,
+                       latency=round(last_timing().total, 3) if last_timing() else 0.0)
+        raise
 
-    raw = getattr(resp, "output_text", None)
-    if callable(raw):
-        raw = resp.output_text()
-    if not raw:
-        raw = str(resp)
+    usage = _usage(resp)
+    _local.last_usage = usage
+    metrics.record(
+        "model", intent="fix_plan", model=model, stream=False, chained=False,
+        latency=round(last_timing().total, 3),
+        input=usage.input_tokens, cached=usage.cached_tokens, output=usage.output_tokens,
+    )
+    raw = _output_text(resp)
 
     try:
         return json.loads(raw)
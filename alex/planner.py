@@ -0,0 +1,374 @@
+"""
+Execution plan for `alex run --apply`.
+
+Commands are classified as read-only (inspects the system, changes nothing)
+or mutating: a program counts as read-only only with an argument list of a
+known safe shape (`date +%F` yes, `date -s ...` no), anything else mutates.
+Commands that only stop when interrupted (`tail -f`, `ping` without `-c`)
+never count as read-only: in a batch they would hold a worker until the
+timeout. Consecutive read-only, low-risk commands form one batch that runs
+concurrently; everything else runs alone, in the order the model gave.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence
+
+from .safety import Simple, parse, tokenize
+
+# read-only checks are mostly waiting on systemd/apt/the kernel
+PLAN_MAX_WORKERS = 4
+
+# need the terminal for a password prompt, so never run in a parallel batch
+_ELEVATORS = {"sudo", "doas", "su", "pkexec", "run0"}
+
+# programs that have no way to write, whatever the arguments
+# (output redirects are checked separately, endless forms by _endless)
+_READ_ONLY = {
+    "cat", "head", "tail", "grep", "egrep", "fgrep", "zgrep", "zcat", "ls", "stat",
+    "du", "df", "free", "uptime", "uname", "id", "whoami", "groups", "ps", "pgrep", "pidof",
+    "netstat", "lsof", "lsblk", "findmnt", "lscpu", "lsmod", "lspci", "lsusb", "vmstat",
+    "iostat", "nproc", "apt-cache", "dpkg-query", "which", "whereis", "type", "command", "echo",
+    "printf", "wc", "cut", "tr", "column", "getent", "readlink", "realpath", "basename",
+    "dirname", "test", "[", "true", "false", "md5sum", "sha256sum", "diff", "cmp", "dig",
+    "nslookup", "host", "journalctl", "last", "who", "w", "printenv", "locale",
+    "jq", "hexdump", "strings", "nl", "fold", "comm", "join", "paste", "seq", "ping",
+    "traceroute", "tracepath", "mtr", "namei", "getfacl", "lsattr", "ulimit",
+}
+
+# program -> first argument (subcommand) that only reads
+_READ_ONLY_SUBCOMMANDS = {
+    "systemctl": {"status", "is-active", "is-enabled", "is-failed", "is-system-running",
+                  "list-units", "list-unit-files", "list-timers", "list-sockets",
+                  "list-dependencies", "list-jobs", "show", "cat", "get-default", "help"},
+    "apt": {"list", "show", "search", "policy", "depends", "rdepends", "changelog"},
+    "ip": {"a", "addr", "address", "l", "link", "r", "route", "n", "neigh", "neighbour", "rule",
+           "-s", "-4", "-6", "-br", "-c", "-j", "-d"},
+    "docker": {"ps", "images", "inspect", "logs", "info", "version", "stats", "top", "port"},
+    "podman": {"ps", "images", "inspect", "logs", "info", "version", "stats", "top", "port"},
+    "ufw": {"status", "show", "version"},
+    "nft": {"list"},
+    "snap": {"list", "info", "find", "services", "changes", "version"},
+    "flatpak": {"list", "info", "search"},
+    "firewall-cmd": {"--state", "--list-all", "--list-ports", "--list-services",
+                     "--get-active-zones", "--get-default-zone"},
+    "kubectl": {"get", "describe", "logs", "top", "version", "explain", "api-resources"},
+}
+
+# anything asked only for its version or help ("-h" is halt for shutdown, "-v" verbose for most)
+_INFO_FLAGS = {"--version", "-V", "--help"}
+# config test switches
+_CONFIG_TESTS = {"nginx": {"-t", "-T"}, "apache2ctl": {"-t", "-S", "configtest"},
+                 "sshd": {"-t", "-T"}, "named-checkconf": set(), "visudo": {"-c"}}
+
+_WRITE_FLAGS = {
+    "find": {"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprintf", "-fls"},
+    "sed": {"-i", "--in-place"},
+    "curl": {"-o", "-O", "--output", "--remote-name", "-d", "--data", "-X", "--request", "-T",
+             "--upload-file", "-F"},
+    "journalctl": {"--vacuum-size", "--vacuum-time", "--vacuum-files", "--rotate", "--flush",
+                   "--sync", "--relinquish-var", "--setup-keys", "--update-catalog"},
+    "sort": {"-o", "--output", "--compress-program"},
+    "ip": {"add", "del", "delete", "set", "change", "replace", "flush", "append", "exec"},
+}
+
+
+# --- argv shapes: program -> (args) -> True when that argument list only reads ----
+
+def _operands(args: List[str], takes_value: Collection[str] = ()) -> List[str]:
+    """Non-option arguments, skipping the values of options in takes_value."""
+    out, skip = [], False
+    for a in args:
+        if skip:
+            skip = False
+        elif a.startswith("-") and a != "-":
+            skip = a in takes_value
+        else:
+            out.append(a)
+    return out
+
+
+def _short(args: List[str], letters: str) -> bool:
+    """Any of the letters among the short options (-abc clusters included)."""
+    return any(a.startswith("-") and not a.startswith("--") and set(a[1:]) & set(letters)
+               for a in args)
+
+
+def _has_option(args: List[str], *names: str) -> bool:
+    """Any of the long options, with or without =VALUE."""
+    return any(a.split("=", 1)[0] in names for a in args)
+
+
+def _no_options(*forbidden: str) -> Callable[[List[str]], bool]:
+    return lambda args: not _has_option(args, *forbidden)
+
+
+def _date(args: List[str]) -> bool:
+    # date -s / date MMDDhhmm set the clock; only +FORMAT operands print
+    if _short(args, "s") or _has_option(args, "--set"):
+        return False
+    operands = _operands(args, ("-d", "--date", "-r", "--reference", "-f", "--file"))
+    return all(o.startswith("+") for o in operands)
+
+
+def _sysctl(args: List[str]) -> bool:
+    if any("=" in a for a in args) or _short(args, "wp"):
+        return False
+    return not any(a in ("--write", "--load", "--system") for a in args)
+
+
+def _awk(args: List[str]) -> bool:
+    # system(), print > file, "cmd" | getline, -i inplace; -f runs a program we can't see
+    if _short(args, "fi") or _has_option(args, "--file", "--include", "--load"):
+        return False
+    return not any(x in a for a in args for x in ("system", ">", "|", "getline"))
+
+
+# curl: plain GETs to stdout only
+_CURL_FLAGS = {"-s", "-S", "-L", "-I", "-i", "-v", "-k", "-f", "-4", "-6", "--silent",
+               "--show-error", "--location", "--head", "--include", "--verbose", "--insecure",
+               "--fail", "--compressed", "--ipv4", "--ipv6"}
+_CURL_VALUES = {"-H", "--header", "-m", "--max-time", "--connect-timeout", "-w", "--write-out",
+                "-A", "--user-agent", "--resolve", "--retry", "-u", "--user", "--cacert"}
+
+
+def _curl(args: List[str]) -> bool:
+    i = 0
+    while i < len(args):
+        a = args[i]
+        if a in _CURL_VALUES:
+            i += 2
+            continue
+        if a.startswith("-") and a not in _CURL_FLAGS:
+            name = a.split("=", 1)[0]
+            short_ok = not a.startswith("--") and set(a[1:]) <= set("sSLIivkf46")
+            if not short_ok and name not in _CURL_VALUES:
+                return False
+        i += 1
+    return True
+
+
+def _openssl(args: List[str]) -> bool:
+    if not args or args[0] not in ("version", "ciphers", "list", "s_client", "x509", "verify",
+                                   "crl", "asn1parse"):
+        return False
+    return not any(a in ("-out", "-keyout", "-signkey", "-req", "-new") for a in args)
+
+
+def _git(args: List[str]) -> bool:
+    if not args:
+        return False
+    sub, rest = args[0], args[1:]
+    if any(a.startswith(("--output", "--ext-diff")) for a in rest):
+        return False
+    if sub in ("status", "log", "diff", "show", "rev-parse", "describe", "blame", "ls-files",
+               "shortlog", "grep"):
+        return True
+    if sub == "branch":
+        listing = {"-a", "-r", "-v", "-vv", "--all", "--remotes", "--list", "--show-current",
+                   "--verbose", "--no-color"}
+        filters = ("--contains", "--merged", "--no-merged", "--sort", "--format")
+        return all(a in listing or a.startswith(filters) for a in rest)
+    if sub == "remote":
+        return not rest or rest == ["-v"] or (rest[0] in ("show", "get-url") and len(rest) <= 3)
+    return False
+
+
+def _ss(args: List[str]) -> bool:
+    # -K kills the matched sockets, -D dumps to a file
+    return not _short(args, "KD") and not _has_option(args, "--kill", "--diag")
+
+
+def _max_operands(n: int, takes_value: Collection[str] = ()) -> Callable[[List[str]], bool]:
+    # uniq IN OUT / xxd IN OUT write OUT
+    return lambda args: len(_operands(args, takes_value)) <= n
+
+
+def _state_tool(args: List[str]) -> bool:
+    # hostnamectl/timedatectl/...: without a verb, or with one that shows
+    verbs = _operands(args, ("-H", "--host", "-M", "--machine", "-p", "--property"))
+    return not verbs or verbs[0] in ("status", "show", "list", "list-sessions", "list-users",
+                                     "list-seats", "list-timezones", "list-locales",
+                                     "list-keymaps", "tree", "introspect")
+
+
+_SYSTEMD_ANALYZE = {"time", "blame", "critical-chain", "verify", "security", "dump", "calendar",
+                    "timespan", "timestamp", "cat-config", "unit-paths", "syscall-filter",
+                    "condition", "plot", "dot"}
+
+_SHAPES: Dict[str, Callable[[List[str]], bool]] = {
+    "date": _date,
+    "sysctl": _sysctl,
+    "awk": _awk, "gawk": _awk, "mawk": _awk,
+    "curl": _curl,
+    "openssl": _openssl,
+    "git": _git,
+    "ss": _ss,
+    "uniq": _max_operands(1, ("-f", "-s", "-w", "--skip-fields", "--skip-chars", "--check-chars")),
+    "xxd": _max_operands(1, ("-c", "-g", "-l", "-s", "-o", "-n", "-cols", "-len", "-seek")),
+    "sort": lambda args: not _short(args, "o"),  # sort -uo FILE
+    "tree": lambda args: not _short(args, "o"),
+    "file": _no_options("-C", "--compile"),
+    "blkid": lambda args: not _short(args, "g") and "--garbage-collect" not in args,
+    "rg": _no_options("--pre"),
+    "lastlog": lambda args: not _short(args, "CS") and not _has_option(args, "--clear", "--set"),
+    "systemd-analyze": lambda args: not args or args[0] in _SYSTEMD_ANALYZE,
+    "hostname": lambda args: (not _operands(args) and not _short(args, "bF")
+                              and not _has_option(args, "--boot", "--file")),
+    "mount": lambda args: (not _operands(args, ("-t", "--types")) and not _short(args, "aBMo")
+                           and "--all" not in args),
+    "swapon": lambda args: not _operands(args) and all(
+        a in ("--show", "-s", "--summary", "--noheadings", "--bytes") or a.startswith("--show=")
+        for a in args),
+    "timedatectl": _state_tool, "hostnamectl": _state_tool, "localectl": _state_tool,
+    "loginctl": _state_tool, "busctl": _state_tool,
+    "apt-config": lambda args: bool(args) and args[0] in ("dump", "shell"),
+}
+
+
+_DPKG_QUERIES = {"-l", "-L", "-s", "-S", "--list", "--listfiles", "--status", "--search",
+                 "--get-selections", "--print-architecture"}
+_IPTABLES_LISTS = {"-L", "-S", "--list", "--list-rules"}
+_IPTABLES_CHANGES = {"-Z", "--zero", "-F", "--flush", "-X", "-A", "-D", "-I", "-R", "-P", "-N",
+                     "-E"}
+
+# mtr without one of these draws a curses screen until quit
+_MTR_REPORTS = {"-r", "--report", "-w", "--report-wide", "-j", "--json", "-C", "--csv", "-x",
+                "--xml"}
+
+
+def _endless(s: Simple) -> bool:
+    """Follows, watches or repeats until interrupted (or needs a terminal to quit)."""
+    a = s.args
+    sub, rest = (a[0], a[1:]) if a else ("", [])
+    if s.name == "tail":
+        return _short(a, "fF") or any(x.startswith(("--follow", "--retry")) for x in a)
+    if s.name == "journalctl":
+        return _short(a, "f") or "--follow" in a
+    if s.name in ("docker", "podman"):
+        if sub == "logs":
+            return _short(rest, "f") or "--follow" in rest
+        return sub == "events" or (sub == "stats" and "--no-stream" not in rest)
+    if s.name == "kubectl":
+        if sub == "logs":
+            return _short(rest, "f") or _has_option(rest, "--follow")
+        return _short(rest, "w") or any(x.startswith("--watch") for x in rest)
+    if s.name == "ping":
+        # -c COUNT or -w DEADLINE end it
+        return not any(x.startswith(("-c", "-w")) for x in a)
+    if s.name == "mtr":
+        return not any(x in _MTR_REPORTS for x in a)
+    if s.name in ("vmstat", "iostat"):
+        # a delay without a count repeats forever
+        return sum(x.isdigit() for x in _operands(a)) == 1
+    if s.name == "ip":
+        return "monitor" in a
+    return False
+
+
+def _simple_read_only(s: Simple) -> bool:
+    for op, target in s.redirects:
+        if op in ("<", "<<", "<&"):
+            continue
+        if op == ">&" and target.isdigit():
+            continue
+        if target != "/dev/null":
+            return False
+
+    flags = _WRITE_FLAGS.get(s.name, ())
+    if any(a in flags or a.split("=", 1)[0] in flags for a in s.args):
+        return False
+    # sed -i.bak, sed -ni
+    if s.name == "sed" and (_short(s.args, "i") or _has_option(s.args, "--in-place")):
+        return False
+    if _endless(s):
+        return False
+
+    if s.name in _READ_ONLY:
+        return True
+    if s.name in _SHAPES:
+        return _SHAPES[s.name](s.args)
+    if s.name == "firewall-cmd":
+        shows = _READ_ONLY_SUBCOMMANDS["firewall-cmd"]
+        return bool(s.args) and all(a in shows or a.startswith("--zone") for a in s.args)
+    if s.args and s.args[0] in _READ_ONLY_SUBCOMMANDS.get(s.name, ()):
+        return True
+    if s.name == "ip" and s.args and any(a in _READ_ONLY_SUBCOMMANDS["ip"] for a in s.args[:3]):
+        return True
+    if s.name == "dpkg" and s.args and s.args[0] in _DPKG_QUERIES:
+        return True
+    if s.name in ("iptables", "ip6tables") and any(a in _IPTABLES_LISTS for a in s.args):
+        # -Z with -L zeroes the counters, -F/-X/-A... change rules
+        return not any(a in _IPTABLES_CHANGES for a in s.args)
+    tests = _CONFIG_TESTS.get(s.name)
+    if tests is not None and (not tests or any(a in tests for a in s.args)):
+        return True
+    return len(s.args) == 1 and s.args[0] in _INFO_FLAGS
+
+
+def is_read_only(cmd: str) -> bool:
+    """True only when every part of the command line is known to just read."""
+    try:
+        simples = parse(cmd)
+    except ValueError:
+        return False
+    return bool(simples) and all(_simple_read_only(s) for s in simples)
+
+
+def needs_terminal(cmd: str) -> bool:
+    try:
+        words = tokenize(cmd)
+    except ValueError:
+        return True
+    return any(os.path.basename(w) in _ELEVATORS for w in words)
+
+
+@dataclass
+class PlannedCommand:
+    index: int  # 1-based position in the model's list
+    cmd: str
+    risk: str
+    read_only: bool
+    reason: Optional[str] = None  # safety scanner verdict
+
+
+@dataclass
+class Step:
+    commands: List[PlannedCommand] = field(default_factory=list)
+
+    @property
+    def parallel(self) -> bool:
+        return len(self.commands) > 1
+
+
+def _batchable(c: PlannedCommand) -> bool:
+    return c.read_only and c.risk == "low" and not c.reason and not needs_terminal(c.cmd)
+
+
+def plan(commands: Sequence[Dict[str, Any]],
+         classify: Callable[[str], Optional[str]]) -> List[Step]:
+    """
+    Group the model's commands into steps. A step with several commands is a
+    run of consecutive batchable (read-only, low risk, no sudo) commands.
+    Empty commands are dropped, blacklisted ones become super_high.
+    """
+    steps: List[Step] = []
+    for i, c in enumerate(commands, start=1):
+        cmd = (c.get("cmd") or "").strip()
+        if not cmd:
+            continue
+        reason = classify(cmd)
+        pc = PlannedCommand(
+            index=i,
+            cmd=cmd,
+            risk="super_high" if reason else (c.get("risk") or "low"),
+            read_only=is_read_only(cmd),
+            reason=reason,
+        )
+        prev = steps[-1].commands[-1] if steps else None
+        if prev is not None and _batchable(pc) and _batchable(prev):
+            steps[-1].commands.append(pc)
+        else:
+            steps.append(Step([pc]))
+    return steps
@@ -1,25 +1,193 @@
-from typing import Any, Dict
+import json
+import sys
+from typing import Any, Callable, Dict, List, Optional
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
-console = Console()
+from . import cache
+
+# --format: "rich" draws panels; json/ndjson/plain write events to stdout without rich
+FORMATS = ("rich", "json", "ndjson", "plain")
+
+_console = None
+_format = "rich"
+_events: List[Dict[str, Any]] = []
+
+def get_console() -> Console:
+    """One shared Console per process, created on first use."""
+    global _console
+    if _console is None:
+        # in machine formats stdout carries only events, incidental output goes to stderr
+        _console = Console(stderr=_format != "rich")
+    return _console
+
+def set_format(fmt: str) -> None:
+    global _format, _console
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, use one of: {', '.join(FORMATS)}")
+    _format = fmt
+    _console = None
+    _events.clear()
+
+def machine_output() -> bool:
+    return _format != "rich"
+
+def emit(kind: str, **fields: Any) -> None:
+    """One output event: written at once (ndjson/plain) or collected for finish() (json)."""
+    ev = {"type": kind, **fields}
+    if _format == "json":
+        _events.append(ev)
+        return
+    line = json.dumps(ev, ensure_ascii=False) + "\n" if _format == "ndjson" else _plain(ev)
+    if line:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+def finish() -> None:
+    """End of the command: json format prints everything collected as one array."""
+    if _format == "json":
+        sys.stdout.write(json.dumps(_events, ensure_ascii=False, indent=2) + "\n")
+        sys.stdout.flush()
+        _events.clear()
+
+def ask(question: str, default: bool) -> bool:
+    """Confirm.ask in the terminal; machine formats never prompt and answer no."""
+    if _format == "rich":
+        from rich.prompt import Confirm
+
+        return Confirm.ask(question, default=default)
+    emit("prompt", text=question, answer=False)
+    return False
+
+def _plain_text(renderable) -> str:
+    if isinstance(renderable, Text):
+        return renderable.plain
+    if isinstance(renderable, str):
+        try:
+            return Text.from_markup(renderable).plain
+        except Exception:
+            return renderable
+    # tables etc.: lay out once without colours
+    from io import StringIO
+
+    buf = StringIO()
+    Console(file=buf, width=120, color_system=None, highlight=False).print(renderable)
+    return buf.getvalue().rstrip("\n")
+
+def _plain_answer(data: Dict[str, Any]) -> List[str]:
+    lines = [data.get("summary", "").strip()]
+    for i, s in enumerate(data.get("steps", []), start=1):
+        lines.append(f"{i}. {s}")
+    for c in data.get("commands", []):
+        why = f" {c['why']}" if c.get("why") else ""
+        lines.append(f"$ {c.get('cmd', '')}  #{why} [{c.get('risk', 'low')}]")
+    lines += [f"check: {c}" for c in data.get("checks", [])]
+    lines += [f"note: {n}" for n in data.get("notes", [])]
+    return lines
+
+def _plain(ev: Dict[str, Any]) -> str:
+    kind = ev["type"]
+    if kind == "answer":
+        # the bare default title says nothing; cluster/unit titles ("Error 2/5 ×3: …") do
+        lines = ([ev["title"]] if ev.get("title", "Alex") != "Alex" else []) + _plain_answer(ev["data"])
+    elif kind == "message":
+        lines = [ev["text"]]
+    elif kind == "plan":
+        lines = [
+            f"plan {c['index']}: step {c['step']}{' (parallel)' if c['parallel'] else ''} "
+            f"{'read-only' if c['read_only'] else 'changes'} {c['risk']}: {c['cmd']}"
+            for c in ev["commands"]
+        ]
+    elif kind == "result":
+        status = "ok" if ev["exit"] == 0 else "FAILED"
+        lines = [f"[{ev['index']}/{ev['total']}] {status} exit={ev['exit']} {ev['duration']:.2f}s: {ev['cmd']}"]
+        lines += [x for x in (ev["stdout"].rstrip("\n"), ev["stderr"].rstrip("\n")) if x]
+    elif kind == "skipped":
+        lines = [f"[{ev['index']}/{ev['total']}] skipped: {ev['cmd']} ({ev['reason']})"]
+    elif kind == "check":
+        lines = [f"{ev['status']:<4} {ev['label']}: {ev['value']}" + (f" ({ev['hint']})" if ev.get("hint") else "")]
+    elif kind == "stats":
+        lines = [
+            f"{ev['group']} {ev['key']}: {ev['calls']} calls ({ev['cache_hits']} cached, {ev['errors']} failed), "
+            f"p50 {ev['latency_p50']:.2f}s p90 {ev['latency_p90']:.2f}s, tokens in {ev['input_tokens']} "
+            f"cached {ev['cached_tokens']} out {ev['output_tokens']}, ${ev['cost_usd']:.4f}"
+            f"{'' if ev['cost_known'] else '+'}; {ev['commands']} commands ({ev['failed']} failed) "
+            f"{ev['duration_total']:.1f}s"
+        ]
+    elif kind == "unit":
+        lines = [f"{ev['unit']} [{ev['state']}] {ev['finding']}"]
+    elif kind == "summary":
+        # run: commands/wall/run_time, error --batch: blocks/clusters, service: units
+        lines = ["summary: " + " ".join(f"{k}={v}" for k, v in ev.items() if k != "type")]
+    else:
+        # cache/timing/usage/route/prompt notes are not part of the plain text
+        return ""
+    return "\n".join(lines) + "\n"
+
+def _box(renderable, title: str = "Alex") -> Panel:
+    return Panel(
+        renderable,
+        title=f"[bold green]{title}[/bold green]",
+        title_align="left",
+        border_style="white",
+        expand=False,
+        padding=(1, 2),
+    )
 
 def print_box(renderable, title: str = "Alex"):
-    console.print(
-        Panel(
-            renderable,
-            title=f"[bold green]{title}[/bold green]",
-            title_align="left",
-            border_style="white",
-            expand=False,
-            padding=(1, 2),
-        )
+    if _format != "rich":
+        emit("message", title=title, text=_plain_text(renderable))
+        return
+    get_console().print(_box(renderable, title=title))
+
+def print_cache_note():
+    age = cache.stats.last_hit_age
+    if age is None:
+        return
+    if _format != "rich":
+        emit("cache", hit=True, age=round(age, 1))
+        return
+    get_console().print(f"[dim]⚡ Cached answer ({cache.format_age(age)} old). Use --refresh to ask again.[/dim]")
+
+def print_call_timing(timing):
+    if timing is None or cache.stats.last_hit_age is not None:
+        return
+    if _format != "rich":
+        emit("timing", total=round(timing.total, 3), connect=round(timing.connect, 3),
+             new_connections=timing.new_connections)
+        return
+    conn = f"connect {timing.connect:.2f}s, new connection" if timing.new_connections else "reused connection"
+    get_console().print(f"[dim]⏱ Model call {timing.total:.2f}s ({conn})[/dim]")
+
+def print_route_note(route, verbose=False):
+    """Which model answered; always shown when a fast answer was escalated."""
+    if route is None:
+        return
+    if _format != "rich":
+        emit("route", tier=route.tier, model=route.model, escalated_from=route.escalated_from, reason=route.reason)
+        return
+    if route.escalated_from:
+        get_console().print(f"[dim]↗ {route.escalated_from} answer had {route.reason}, asked {route.model} instead.[/dim]")
+    elif verbose:
+        get_console().print(f"[dim]🧠 Model {route.model} ({route.tier} tier)[/dim]")
+
+def print_round_usage(round_i, usage, chained):
+    if usage is None:
+        return
+    if _format != "rich":
+        emit("usage", round=round_i, chained=chained, input_tokens=usage.input_tokens,
+             cached_tokens=usage.cached_tokens, output_tokens=usage.output_tokens)
+        return
+    mode = "chained" if chained else "full context"
+    get_console().print(
+        f"[dim]🔢 Round {round_i} ({mode}): {usage.input_tokens} input tokens "
+        f"({usage.cached_tokens} cached), {usage.output_tokens} output[/dim]"
     )
 
-def render_structured(data: Dict[str, Any]):
+def _structured_body(data: Dict[str, Any]) -> Table:
     summary = Text(data.get("summary", "").strip())
 
     steps = data.get("steps", [])
@@ -64,7 +232,10 @@ def render_structured(data: Dict[str, Any]):
         notes_text.append("• None\n")
 
     body = Table.grid(padding=(0, 1))
-    body.add_row(Text("Summary", style="bold"))
+    heading = Text("Summary", style="bold")
+    if data.get("confidence"):
+        heading.append(f"  (confidence: {data['confidence']})", style="dim")
+    body.add_row(heading)
     body.add_row(summary)
     body.add_row(Text(""))
     body.add_row(Text("Steps", style="bold"))
@@ -75,5 +246,36 @@ def render_structured(data: Dict[str, Any]):
     body.add_row(checks_text)
     body.add_row(Text("Notes", style="bold"))
     body.add_row(notes_text)
+    return body
+
+def render_structured(data: Dict[str, Any], title: str = "Alex"):
+    if _format != "rich":
+        emit("answer", title=title, data=data)
+        return
+    print_box(_structured_body(data), title=title)
+
+def render_structured_live(fetch: Callable[[Optional[Callable[[Dict[str, Any]], None]]], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Progressively render a streamed answer.
+    fetch(on_partial) must call on_partial(partial_data) as the JSON grows
+    (throttled by the caller, see openai_client.PARTIAL_INTERVAL) and return
+    the final data. Without a terminal it gets on_partial=None: nothing to
+    animate, so no partial parsing either.
+    """
+    from rich.live import Live
+
+    console = get_console()
+    if _format != "rich" or not console.is_terminal:
+        # nothing to animate when piped, draw once at the end
+        data = fetch(None)
+        render_structured(data)
+        return data
+
+    with Live(console=console, refresh_per_second=12) as live:
+        def on_partial(partial: Dict[str, Any]):
+            live.update(_box(_structured_body(partial), title="Alex …"))
+
+        data = fetch(on_partial)
+        live.update(_box(_structured_body(data), title="Alex"), refresh=True)
 
-    print_box(body, title="Alex")
+    return data
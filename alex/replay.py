@@ -0,0 +1,173 @@
+"""
+Record/replay transport for the OpenAI client.
+
+  record  requests go to the real API; every exchange is also written to a
+          cassette directory (one JSON file per distinct request)
+  replay  nothing leaves the machine; answers come from the cassettes, with
+          optional injected latency (fixed, or as recorded) so end-to-end
+          timings of run/error/service can be measured offline
+
+Enabled by config (replay_mode, replay_dir, replay_latency, replay_chunk_delay)
+or, taking precedence, ALEX_REPLAY / ALEX_REPLAY_DIR / ALEX_REPLAY_LATENCY /
+ALEX_REPLAY_CHUNK_DELAY.
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+from .cache import cache_dir
+
+MODES = ("record", "replay")
+# only these response headers are kept; the body is stored decoded
+_KEPT_HEADERS = ("content-type", "x-request-id", "openai-processing-ms")
+
+
+@dataclass
+class ReplaySettings:
+    mode: str = ""  # "" (off), "record" or "replay"
+    directory: str = ""
+    latency: Optional[float] = 0.0  # seconds before the first byte, None = as recorded
+    chunk_delay: float = 0.0  # seconds between streamed events
+
+
+def settings(cfg: Any) -> ReplaySettings:
+    mode = (os.environ.get("ALEX_REPLAY") or cfg.replay_mode or "").strip().lower()
+    if mode not in MODES:
+        return ReplaySettings()
+    directory = os.environ.get("ALEX_REPLAY_DIR") or cfg.replay_dir or str(cache_dir() / "cassettes")
+    latency = str(os.environ.get("ALEX_REPLAY_LATENCY") or cfg.replay_latency or 0).strip().lower()
+    return ReplaySettings(
+        mode=mode,
+        directory=os.path.expanduser(directory),
+        latency=None if latency == "recorded" else float(latency),
+        chunk_delay=float(os.environ.get("ALEX_REPLAY_CHUNK_DELAY") or cfg.replay_chunk_delay or 0),
+    )
+
+
+def _httpx():
+    # the SDK's HTTP library (not our direct dependency), found the same way get_client finds Limits
+    from openai import DEFAULT_CONNECTION_LIMITS
+
+    return importlib.import_module(type(DEFAULT_CONNECTION_LIMITS).__module__.split(".")[0])
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    try:
+        canon = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canon = body.decode("utf-8", errors="replace")
+    h = hashlib.sha256(f"{method} {path}\n{canon}".encode("utf-8"))
+    return h.hexdigest()[:24]
+
+
+def _events(body: bytes) -> Iterator[bytes]:
+    """Split an SSE body into events (each with its blank-line terminator)."""
+    parts = body.split(b"\n\n")
+    for i, p in enumerate(parts):
+        if p:
+            yield p + b"\n\n"
+        elif i < len(parts) - 1:
+            yield b"\n\n"
+
+
+class ReplayTransport:
+    """
+    httpx transport (duck-typed: handle_request/close) in front of the real
+    one. In replay mode `inner` is not used and may be None.
+    """
+
+    def __init__(self, opts: ReplaySettings, inner: Any = None):
+        self.opts = opts
+        self.inner = inner
+        self._httpx = _httpx()
+        os.makedirs(opts.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.opts.directory, key + ".json")
+
+    def handle_request(self, request: Any) -> Any:
+        body = request.read()
+        key = request_key(request.method, request.url.path, body)
+        if self.opts.mode == "record":
+            return self._record(request, key, body)
+        return self._replay(request, key)
+
+    def _record(self, request: Any, key: str, body: bytes) -> Any:
+        t0 = time.monotonic()
+        resp = self.inner.handle_request(request)
+        first_byte = time.monotonic() - t0
+        try:
+            content = resp.read()
+        finally:
+            resp.close()
+        total = time.monotonic() - t0
+
+        headers = {k: v for k, v in resp.headers.items() if k.lower() in _KEPT_HEADERS}
+        entry = {
+            "request": {"method": request.method, "path": request.url.path, "body": body.decode("utf-8", errors="replace")},
+            "status": resp.status_code,
+            "headers": headers,
+            "body": content.decode("utf-8", errors="replace"),
+            "elapsed": {"first_byte": round(first_byte, 4), "total": round(total, 4)},
+        }
+        tmp = self._path(key) + f".{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=1)
+        os.replace(tmp, self._path(key))
+        return self._httpx.Response(resp.status_code, headers=headers, content=content, request=request)
+
+    def _replay(self, request: Any, key: str) -> Any:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            # 404 like an unknown previous_response_id: chained rounds fall back to a full prompt
+            msg = f"No recorded exchange for this request (key {key} in {self.opts.directory})"
+            return self._httpx.Response(
+                404, request=request,
+                json={"error": {"message": msg, "type": "replay_miss", "param": None, "code": None}},
+            )
+
+        elapsed = entry.get("elapsed") or {}
+        latency = self.opts.latency if self.opts.latency is not None else float(elapsed.get("first_byte", 0))
+        if latency > 0:
+            time.sleep(latency)
+
+        content = entry["body"].encode("utf-8")
+        headers = entry.get("headers") or {}
+        if "text/event-stream" not in headers.get("content-type", ""):
+            return self._httpx.Response(entry["status"], headers=headers, content=content, request=request)
+
+        events = list(_events(content))
+        delay = self.opts.chunk_delay
+        if self.opts.latency is None and not delay and len(events) > 1:
+            delay = max(0.0, float(elapsed.get("total", 0)) - latency) / len(events)
+
+        def stream() -> Iterator[bytes]:
+            for i, ev in enumerate(events):
+                if i and delay:
+                    time.sleep(delay)
+                yield ev
+
+        return self._httpx.Response(entry["status"], headers=headers, content=stream(), request=request)
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+
+    def __enter__(self) -> "ReplayTransport":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def make_transport(opts: ReplaySettings, limits: Any) -> ReplayTransport:
+    inner = _httpx().HTTPTransport(limits=limits) if opts.mode == "record" else None
+    return ReplayTransport(opts, inner)
@@ -0,0 +1,60 @@
+"""
+Model tiers for structured calls.
+
+  fast    first passes (error explanation, first service round): small model
+  strong  escalation target, or straight away with --strong
+  None    the plain `model` setting (alex run, later service rounds)
+
+A fast answer is re-asked on the strong tier when it reports low confidence
+or comes back without commands. `model` in the config still pins one model
+for everything unless model_fast/model_strong are set.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .config import default_model, strong_model
+
+
+@dataclass
+class Models:
+    default: str
+    fast: str
+    strong: str
+
+
+@dataclass
+class Route:
+    tier: str  # "default", "fast" or "strong"
+    model: str
+    escalated_from: Optional[str] = None
+    reason: Optional[str] = None  # why the fast answer was not kept
+
+
+def models(cfg: Any) -> Models:
+    # model: config > env (ALEX_MODEL / ALEX_STRONG_MODEL) > default
+    default = cfg.model or default_model()
+    return Models(
+        default=default,
+        fast=cfg.model_fast or default,
+        strong=cfg.model_strong or cfg.model or strong_model(),
+    )
+
+
+def pick(cfg: Any, tier: Optional[str]) -> str:
+    m = models(cfg)
+    if tier == "fast":
+        return m.fast
+    if tier == "strong":
+        return m.strong
+    return m.default
+
+
+def weak_answer(data: Dict[str, Any]) -> Optional[str]:
+    """Reason to escalate a fast-tier answer, None to keep it."""
+    if (data.get("confidence") or "").lower() == "low":
+        return "low confidence"
+    if not any((c.get("cmd") or "").strip() for c in data.get("commands") or []):
+        return "no commands"
+    return None
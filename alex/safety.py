@@ -0,0 +1,478 @@
+"""
+Command safety scanner.
+
+A command is tokenized once (shlex, with pipelines, &&/||/;, subshells and
+redirects split out), then every simple command is checked against the rules
+for its program name, and the raw text gets one combined regex (fork bomb +
+user rules from config.toml). The old regex blacklist (FALLBACK_PATTERNS)
+always runs as well, so parsing can only add findings, never lose them.
+Verdicts are memoized per policy.
+"""
+from __future__ import annotations
+
+import functools
+import os
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# the old blacklist: checked on the raw text of every command, whatever the parser finds
+FALLBACK_PATTERNS = [
+    (re.compile(r"\brm\s+-rf\b", re.IGNORECASE), "rm -rf is destructive"),
+    (re.compile(r"\bmkfs(\.|$)", re.IGNORECASE), "mkfs formats filesystems"),
+    (re.compile(r"\bdd\b.*\bif=", re.IGNORECASE), "dd can overwrite disks"),
+    (re.compile(r":\(\)\s*\{\s*:\s*\|\s*:\s*&\s*\}\s*;\s*:", re.IGNORECASE), "fork bomb"),
+    (re.compile(r"\bshutdown\b|\breboot\b|\bpoweroff\b", re.IGNORECASE), "system power control"),
+    (re.compile(r"\b(chmod|chown)\b\s+-R\s+/\b", re.IGNORECASE), "recursive permission change on /"),
+    (re.compile(r"(?:^|\s)>(?:>?)\s*/etc/", re.IGNORECASE), "redirect into /etc"),
+    (re.compile(r"\btee\b.*\s/etc/", re.IGNORECASE), "writing into /etc"),
+    (re.compile(r"\bcurl\b.*\|\s*(bash|sh)\b", re.IGNORECASE), "pipe to shell"),
+    (re.compile(r"\bwget\b.*\|\s*(bash|sh)\b", re.IGNORECASE), "pipe to shell"),
+]
+
+_FALLBACK_RX = re.compile(
+    "|".join(f"(?P<f{i}>{rx.pattern})" for i, (rx, _) in enumerate(FALLBACK_PATTERNS)), re.IGNORECASE
+)
+
+_FORK_BOMB = r":\(\)\s*\{\s*:\s*\|\s*:\s*&\s*\}\s*;\s*:"
+
+# longest first, shlex hands us runs of punctuation like ")|" or "2>&1;"
+_OPERATORS = [">>", "&&", "||", "|&", ";;", ">&", "<&", "&>", "<(", ">(", "<<", ">|", "<", ">", "|", "&", ";", "(", ")"]
+_SEPARATORS = {"&&", "||", "&", ";", ";;", "(", ")"}
+_PROCSUBS = {"<(", ">("}
+_PIPES = {"|", "|&"}
+_REDIRECTS = {">>", ">&", "<&", "&>", "<<", ">|", "<", ">"}
+
+# wrappers that run their arguments as a command: name -> options taking a value
+_WRAPPERS: Dict[str, set] = {
+    "sudo": {"-u", "-g", "-U", "-C", "-D", "-h", "-p", "-r", "-t", "-T"},
+    "doas": {"-u", "-C"},
+    "env": {"-u", "-C", "-S"},
+    "nohup": set(),
+    "time": set(),
+    "command": set(),
+    "exec": set(),
+    "builtin": set(),
+    "nice": {"-n"},
+    "ionice": {"-c", "-n", "-p"},
+    "stdbuf": {"-i", "-o", "-e"},
+    "xargs": {"-I", "-n", "-P", "-L", "-d", "-E", "-s", "-a"},
+    "timeout": {"-s", "-k"},
+    "setsid": set(),
+    "chroot": {"--userspec", "--groups"},
+    "runuser": {"-u", "-g", "-G", "-w", "--user", "--group", "--supp-group", "--whitelist-environment"},
+}
+# shell keywords that may precede the command word: "{ rm ...; }", "if rm ...; then", "! grep"
+_RESERVED = {"{", "}", "!", "if", "then", "else", "elif", "fi", "do", "done", "while", "until", "time"}
+# option -> takes a value, for programs whose remaining arguments are a command line
+_SSH_VALUE_OPTS = set("-B -b -c -D -E -e -F -I -i -J -L -l -m -O -o -p -Q -R -S -W -w".split())
+_WATCH_VALUE_OPTS = {"-n", "--interval", "-q", "--equexit"}
+_FIND_EXEC = {"-exec", "-execdir", "-ok", "-okdir"}
+_SHELLS = {"bash", "sh", "dash", "zsh", "ksh"}
+_DOWNLOADERS = {"curl", "wget"}
+_ASSIGNMENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+_BLOCK_DEVICE_RE = re.compile(r"^/dev/(sd|hd|vd|xvd|nvme|mmcblk|md|dm-)")
+
+
+@dataclass
+class Simple:
+    """One simple command: argv without wrappers, redirect targets, and the programs piped into it."""
+    name: str
+    args: List[str]
+    redirects: List[Tuple[str, str]] = field(default_factory=list)
+    upstream: List[str] = field(default_factory=list)
+
+
+def _split_operators(tok: str) -> List[str]:
+    out = []
+    while tok:
+        for op in _OPERATORS:
+            if tok.startswith(op):
+                out.append(op)
+                tok = tok[len(op):]
+                break
+        else:
+            out.append(tok)
+            break
+    return out
+
+
+def tokenize(cmd: str) -> List[str]:
+    """Shell words and operators. Raises ValueError on unbalanced quotes."""
+    # backticks and newlines separate commands as far as we are concerned
+    lex = shlex.shlex(cmd.replace("`", " ; ").replace("\n", " ; "), posix=True, punctuation_chars=True)
+    lex.whitespace_split = True
+    lex.commenters = ""
+    tokens: List[str] = []
+    for tok in lex:
+        if tok and all(c in "();<>|&" for c in tok):
+            tokens.extend(_split_operators(tok))
+        elif tok.endswith("$") and len(tok) > 1:
+            # "$(" arrives as "...$" + "("
+            tokens.append(tok[:-1])
+        elif tok != "$":
+            tokens.append(tok)
+    return tokens
+
+
+def _unwrap(words: List[str]) -> List[str]:
+    """Drop shell keywords, VAR=x prefixes and wrappers like sudo/env/nohup (with their options)."""
+    i = 0
+    while i < len(words):
+        w = words[i]
+        if w in _RESERVED or _ASSIGNMENT_RE.match(w):
+            i += 1
+            continue
+        name = os.path.basename(w).lower()
+        takes_value = _WRAPPERS.get(name)
+        if takes_value is None:
+            break
+        if name == "command" and i + 1 < len(words) and words[i + 1] in ("-v", "-V"):
+            break  # only looks the program up
+        if name == "runuser" and ("-c" in words[i:] or "--command" in words[i:]):
+            break  # runuser -l user -c '...': the body is parsed by _bodies
+        i += 1
+        while i < len(words) and words[i].startswith("-") and words[i] != "--":
+            i += 2 if words[i] in takes_value else 1
+        if i < len(words) and words[i] == "--":
+            i += 1
+        if name in ("timeout", "chroot") and i < len(words):
+            i += 1  # the duration / the new root
+    return words[i:]
+
+
+def _after_options(args: List[str], takes_value: set) -> List[str]:
+    i = 0
+    while i < len(args) and args[i].startswith("-") and args[i] != "--":
+        i += 2 if args[i] in takes_value else 1
+    return args[i + 1:] if i < len(args) and args[i] == "--" else args[i:]
+
+
+def _bodies(s: Simple) -> List[List[str]]:
+    """Command lines s runs itself (sh -c, su -c, eval, watch, ssh, find -exec), as tokens."""
+    texts: List[str] = []
+    words: List[List[str]] = []
+    if s.name in _SHELLS or s.name in ("su", "runuser"):
+        for opt in ("-c", "--command"):
+            if opt in s.args[:-1]:
+                texts.append(s.args[s.args.index(opt) + 1])
+    elif s.name == "eval":
+        texts.append(" ".join(s.args))
+    elif s.name == "watch":
+        texts.append(" ".join(_after_options(s.args, _WATCH_VALUE_OPTS)))
+    elif s.name == "ssh":
+        rest = _after_options(s.args, _SSH_VALUE_OPTS)
+        texts.append(" ".join(rest[1:]))  # after the host
+    elif s.name == "find":
+        argv: Optional[List[str]] = None
+        for a in s.args:
+            if a in _FIND_EXEC:
+                argv = []
+            elif argv is not None and a in (";", "+"):
+                words.append(argv)
+                argv = None
+            elif argv is not None:
+                argv.append(a)
+        if argv:
+            words.append(argv)  # "-exec rm {} \;" loses its ";" to the tokenizer
+    for text in texts:
+        try:
+            words.append(tokenize(text))
+        except ValueError:
+            continue
+    return [w for w in words if w]
+
+
+def parse(cmd: str) -> List[Simple]:
+    """Simple commands of cmd in order (bash -c '...' bodies are parsed too)."""
+    return _parse(tokenize(cmd), depth=0)
+
+
+def _parse(tokens: List[str], depth: int) -> List[Simple]:
+    out: List[Simple] = []
+    words: List[str] = []
+    redirects: List[Tuple[str, str]] = []
+    upstream: List[str] = []
+    # programs whose output reaches the current command through <(...)
+    fed: List[str] = []
+
+    def flush(piped: bool) -> None:
+        nonlocal words, redirects, upstream, fed
+        argv = _unwrap(words)
+        if argv:
+            s = Simple(name=os.path.basename(argv[0]).lower(), args=argv[1:], redirects=redirects, upstream=upstream + fed)
+            out.append(s)
+            # sh -c "...", eval, ssh host "...", find -exec ... run their own command lines
+            for body in _bodies(s) if depth < 3 else ():
+                inner = _parse(body, depth + 1)
+                out.extend(inner)
+                if s.name in _SHELLS and any("$(" in w or "`" in w for w in s.args):
+                    # bash -c "$(curl ...)" executes what was downloaded
+                    s.upstream = s.upstream + [x.name for x in inner]
+            upstream = s.upstream + [s.name] if piped else []
+        else:
+            if redirects:
+                # "> /etc/passwd", "exec > /etc/hosts": no program, the redirect still writes
+                out.append(Simple(name="", args=[], redirects=redirects))
+            if not piped:
+                upstream = []
+        words, redirects, fed = [], [], []
+
+    i = 0
+    while i < len(tokens):
+        t = tokens[i]
+        if t in _PIPES:
+            flush(piped=True)
+        elif t in _SEPARATORS:
+            flush(piped=False)
+        elif t in _PROCSUBS:
+            level, j = 1, i + 1
+            while j < len(tokens) and level:
+                if tokens[j] in ("(", "<(", ">("):
+                    level += 1
+                elif tokens[j] == ")":
+                    level -= 1
+                j += 1
+            inner = _parse(tokens[i + 1 : j - 1 if level == 0 else j], depth + 1)
+            out.extend(inner)
+            if t == "<(":
+                fed.extend(x.name for x in inner)
+            i = j
+            continue
+        elif t in _REDIRECTS:
+            target = tokens[i + 1] if i + 1 < len(tokens) else ""
+            if target and target not in _SEPARATORS and target not in _PIPES and target not in _PROCSUBS:
+                i += 1
+            if words and words[-1].isdigit():
+                words.pop()  # the fd in "2>/dev/null"
+            redirects.append((t, target))
+        else:
+            words.append(t)
+        i += 1
+    flush(piped=False)
+    return out
+
+
+# --- rules: (Simple) -> reason or None ---------------------------------------
+
+def _short_flags(args: List[str]) -> str:
+    return "".join(a[1:] for a in args if a.startswith("-") and not a.startswith("--"))
+
+
+def _rm_rf(s: Simple) -> Optional[str]:
+    flags = _short_flags(s.args)
+    recursive = "r" in flags or "R" in flags or "--recursive" in s.args
+    force = "f" in flags or "--force" in s.args
+    return "rm -rf is destructive" if recursive and force else None
+
+
+def _rm_recursive(s: Simple) -> Optional[str]:
+    flags = _short_flags(s.args)
+    return "recursive delete" if ("r" in flags or "R" in flags or "--recursive" in s.args) else None
+
+
+def _mkfs(s: Simple) -> Optional[str]:
+    return "mkfs formats filesystems"
+
+
+def _dd(s: Simple) -> Optional[str]:
+    return "dd can overwrite disks" if any(a.startswith(("if=", "of=")) for a in s.args) else None
+
+
+def _power(s: Simple) -> Optional[str]:
+    return "system power control"
+
+
+def _systemctl(s: Simple) -> Optional[str]:
+    if any(a in ("reboot", "poweroff", "halt", "kexec", "shutdown") for a in s.args):
+        return "system power control"
+    return None
+
+
+def _init(s: Simple) -> Optional[str]:
+    return "system power control" if s.args[:1] in (["0"], ["6"]) else None
+
+
+def _recursive_perms(s: Simple) -> Optional[str]:
+    recursive = "R" in _short_flags(s.args) or "--recursive" in s.args
+    target = next((a for a in s.args if a.startswith("/")), None)
+    if recursive and target:
+        return "recursive permission change on /" if target == "/" else f"recursive permission change on {target}"
+    return None
+
+
+def _tee(s: Simple) -> Optional[str]:
+    return "writing into /etc" if any(a.startswith("/etc/") for a in s.args) else None
+
+
+def _shell(s: Simple) -> Optional[str]:
+    if any(u in _DOWNLOADERS for u in s.upstream):
+        return "pipe to shell"
+    return None
+
+
+def _package_removal(s: Simple) -> Optional[str]:
+    if s.name == "dpkg":
+        return "package removal" if any(a in ("-r", "-P", "--remove", "--purge") for a in s.args) else None
+    return "package removal" if any(a in ("remove", "purge", "autoremove") for a in s.args) else None
+
+
+def _systemctl_strict(s: Simple) -> Optional[str]:
+    if any(a in ("stop", "disable", "mask", "kill", "isolate") for a in s.args):
+        return "stops or disables units"
+    return _systemctl(s)
+
+
+def _kill(s: Simple) -> Optional[str]:
+    return "kills processes"
+
+
+def _chmod_strict(s: Simple) -> Optional[str]:
+    if any(a in ("777", "0777", "a+rwx", "o+w") for a in s.args):
+        return "world-writable permissions"
+    return _recursive_perms(s)
+
+
+def _firewall_flush(s: Simple) -> Optional[str]:
+    if s.name == "nft":
+        return "flushes firewall rules" if "flush" in s.args else None
+    return "flushes firewall rules" if any(a in ("-F", "--flush", "-X") for a in s.args) else None
+
+
+def _accounts(s: Simple) -> Optional[str]:
+    return "account changes"
+
+
+Rule = Callable[[Simple], Optional[str]]
+
+NORMAL_RULES: Dict[str, List[Rule]] = {
+    "rm": [_rm_rf],
+    "dd": [_dd],
+    "shutdown": [_power], "reboot": [_power], "poweroff": [_power], "halt": [_power],
+    "systemctl": [_systemctl],
+    "init": [_init], "telinit": [_init],
+    "chmod": [_recursive_perms], "chown": [_recursive_perms], "chgrp": [_recursive_perms],
+    "tee": [_tee],
+    **{sh: [_shell] for sh in _SHELLS},
+}
+
+STRICT_RULES: Dict[str, List[Rule]] = {
+    "rm": [_rm_rf, _rm_recursive],
+    "apt": [_package_removal], "apt-get": [_package_removal], "aptitude": [_package_removal], "dpkg": [_package_removal],
+    "systemctl": [_systemctl_strict],
+    "kill": [_kill], "pkill": [_kill], "killall": [_kill],
+    "chmod": [_chmod_strict],
+    "iptables": [_firewall_flush], "ip6tables": [_firewall_flush], "nft": [_firewall_flush],
+    "userdel": [_accounts], "groupdel": [_accounts], "usermod": [_accounts],
+}
+
+
+@dataclass(frozen=True)
+class Policy:
+    level: str = "normal"
+    # (reason, regex) from the [safety_rules] table in config.toml
+    rules: Tuple[Tuple[str, str], ...] = ()
+
+
+@functools.lru_cache(maxsize=16)
+def _compile(policy: Policy) -> Tuple[Dict[str, List[Rule]], "re.Pattern", Dict[str, str],
+                                      List[Tuple["re.Pattern", str]], "re.Pattern"]:
+    rules = {k: list(v) for k, v in NORMAL_RULES.items()}
+    if policy.level == "strict":
+        for name, extra in STRICT_RULES.items():
+            rules[name] = extra
+    # mkfs, mkfs.ext4, mkfs.xfs...
+    rules["mkfs"] = [_mkfs]
+
+    # fork bomb + user rules in one alternation; group name -> reason. A rule that is
+    # valid alone but not inside a group (global inline flags) or that has groups of
+    # its own (backreferences, named groups) is matched on its own instead.
+    parts = [f"(?P<r0>{_FORK_BOMB})"]
+    reasons = {"r0": "fork bomb"}
+    alone: List[Tuple[re.Pattern, str]] = []
+    for i, (reason, rx) in enumerate(policy.rules, start=1):
+        try:
+            own = re.compile(rx, re.IGNORECASE)
+        except re.error:
+            continue  # broken user rule, don't let it disable the others
+        try:
+            grouped = not own.groups and re.compile(f"(?:{rx})")
+        except re.error:
+            grouped = False
+        if not grouped:
+            alone.append((own, reason))
+            continue
+        parts.append(f"(?P<r{i}>{rx})")
+        reasons[f"r{i}"] = reason
+
+    # most commands mention none of the ruled programs and redirect nowhere: skip tokenizing those
+    names = sorted(rules, key=len, reverse=True)
+    trigger = re.compile(r"[>`]|\$\(|\b(?:" + "|".join(re.escape(n) for n in names) + r")\b", re.IGNORECASE)
+    return rules, re.compile("|".join(parts), re.IGNORECASE), reasons, alone, trigger
+
+
+def _redirect_reason(target: str, strict: bool) -> Optional[str]:
+    if target.startswith("/etc/"):
+        return "redirect into /etc"
+    if strict and _BLOCK_DEVICE_RE.match(target):
+        return "writes to a block device"
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def scan(cmd: str, policy: Policy = Policy()) -> Optional[str]:
+    """Reason the command is dangerous, or None."""
+    rules, raw_rx, reasons, alone, trigger = _compile(policy)
+
+    m = raw_rx.search(cmd)
+    if m:
+        return reasons[m.lastgroup]
+    for rx, reason in alone:
+        if rx.search(cmd):
+            return reason
+    reason = _scan_parsed(cmd, rules, policy.level == "strict") if trigger.search(cmd) else None
+    if reason:
+        return reason
+    # the old blacklist is the floor, whatever the parser made of the command
+    m = _FALLBACK_RX.search(cmd)
+    return FALLBACK_PATTERNS[int(m.lastgroup[1:])][1] if m else None
+
+
+def _scan_parsed(cmd: str, rules: Dict[str, List[Rule]], strict: bool) -> Optional[str]:
+    try:
+        simples = parse(cmd)
+    except ValueError:
+        return None
+
+    for s in simples:
+        checks = rules.get(s.name)
+        if checks is None and s.name.startswith("mkfs."):
+            checks = rules["mkfs"]
+        for check in checks or ():
+            reason = check(s)
+            if reason:
+                return reason
+        for op, target in s.redirects:
+            if op in (">", ">>", ">|", "&>"):
+                reason = _redirect_reason(target, strict)
+                if reason:
+                    return reason
+        if strict and s.name == "dd" and any(_BLOCK_DEVICE_RE.match(a[3:]) for a in s.args if a.startswith("of=")):
+            return "writes to a block device"
+    return None
+
+
+def current_policy() -> Policy:
+    from .user_config import load_config
+
+    cfg = load_config()
+    rules = cfg.safety_rules if isinstance(cfg.safety_rules, dict) else {}
+    return Policy(
+        level=(cfg.safety_level or "normal").lower(),
+        rules=tuple((str(k), str(v)) for k, v in rules.items()),
+    )
+
+
+def classify(cmd: str, policy: Optional[Policy] = None) -> Optional[str]:
+    return scan(cmd, policy if policy is not None else current_policy())
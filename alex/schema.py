@@ -27,7 +27,8 @@ def get_unified_schema() -> Dict[str, Any]:
                 },
                 "checks": {"type": "array", "items": {"type": "string"}, "minItems": 0},
                 "notes": {"type": "array", "items": {"type": "string"}, "minItems": 0},
+                "confidence": {"type": "string", "enum": ["low", "medium", "high"]},
             },
-            "required": ["intent", "summary", "steps", "commands", "checks", "notes"],
+            "required": ["intent", "summary", "steps", "commands", "checks", "notes", "confidence"],
         },
     }
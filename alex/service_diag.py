@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-import difflib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
-from rich.prompt import Confirm
+from typing import List, Optional, Dict, Any, Tuple
 from rich.table import Table
 from rich.text import Text
 
-from .render import print_box, render_structured
-from .openai_client import call_responses_structured
+from .render import ask, emit, machine_output, print_box, render_structured, render_structured_live, print_cache_note, print_call_timing, print_round_usage, print_route_note, get_console
+from .openai_client import Conversation, call_responses_structured, last_route, last_timing, last_usage
 from .executor import run_command, clean_stderr, classify_blacklist
 from .utils import ensure_key
+from .unit_index import unit_index
+from .logreduce import maybe_reduce
+from .planner import is_read_only
 
 
 @dataclass
@@ -19,12 +22,30 @@ class CmdResult:
     returncode: int
     stdout: str
     stderr: str
+    duration: float = 0.0
+
+
+# probes are mostly waiting on systemd/journald, a few threads are plenty
+DIAG_MAX_WORKERS = 5
+# read-only probes should be quick; a hung one must not stall the whole round
+DIAG_PROBE_TIMEOUT = 60
+
+DIAG_CONTEXT = (
+    "You are diagnosing a systemd service on Debian.\n"
+    "Goal: Determine if the service exists and whether it is healthy.\n"
+    "If failing: determine the most likely root cause (config error, missing file, permissions, port in use, etc.)\n"
+    "When you need more evidence, propose additional SAFE diagnostic commands.\n"
+    "Prefer read-only commands.\n"
+    "If you suspect a port conflict, ask to run ss/lsof and identify the owning process.\n"
+    "If you suspect a bad config, ask to show the relevant config file location and show the exact problematic lines.\n"
+    "Return JSON matching schema (intent=general is ok).\n"
+)
 
 
 def _format_results(results: List[CmdResult]) -> str:
     chunks = []
     for r in results:
-        out = (r.stdout or "").strip()
+        out = maybe_reduce(r.cmd, (r.stdout or "").strip())
         err = (r.stderr or "").strip()
         chunks.append(
             f"### CMD\n{r.cmd}\n"
@@ -35,35 +56,56 @@ def _format_results(results: List[CmdResult]) -> str:
     return "\n\n".join(chunks)
 
 
-def _run_diag(cmds: List[str]) -> List[CmdResult]:
-    res: List[CmdResult] = []
-    for c in cmds:
-        p = run_command(c)
-        res.append(
-            CmdResult(
-                cmd=c,
-                returncode=p.returncode,
-                stdout=(p.stdout or ""),
-                stderr=clean_stderr(p.stderr or ""),
-            )
-        )
-    return res
-
-def _list_service_unit_files() -> List[str]:
-    r = run_command("systemctl list-unit-files --type=service --no-legend --no-pager")
-    if r.returncode != 0:
-        return []
-    units: List[str] = []
-    for line in (r.stdout or "").splitlines():
-        line = line.strip()
-        if not line:
+def _run_one(cmd: str) -> CmdResult:
+    t0 = time.monotonic()
+    p = run_command(cmd, timeout=DIAG_PROBE_TIMEOUT)
+    return CmdResult(
+        cmd=cmd,
+        returncode=p.returncode,
+        stdout=(p.stdout or ""),
+        stderr=clean_stderr(p.stderr or ""),
+        duration=time.monotonic() - t0,
+    )
+
+
+def _run_diag(cmds: List[str], max_workers: int = DIAG_MAX_WORKERS) -> List[CmdResult]:
+    """
+    Run read-only probes concurrently; results keep the order of cmds.
+    """
+    if len(cmds) <= 1 or max_workers <= 1:
+        return [_run_one(c) for c in cmds]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(cmds))) as pool:
+        return list(pool.map(_run_one, cmds))
+
+
+def _run_approved(approved: List[Tuple[str, bool]]) -> List[CmdResult]:
+    """
+    Run approved (cmd, exclusive) probes in their original order. Only consecutive
+    read-only ones share a concurrent batch; anything else runs alone.
+    """
+    results: List[CmdResult] = []
+    batch: List[str] = []
+    for cmd, exclusive in approved:
+        if not exclusive and is_read_only(cmd):
+            batch.append(cmd)
             continue
-        # format: "<unit> <state> <preset>"
-        unit = line.split(None, 1)[0]
-        units.append(unit)
-    return units
+        results += _run_diag(batch)
+        batch = []
+        results.append(_run_one(cmd))
+    return results + _run_diag(batch)
 
 
+def _print_timings(results: List[CmdResult], wall: float) -> None:
+    if machine_output():
+        for r in results:
+            emit("timing", cmd=r.cmd, exit=r.returncode, duration=round(r.duration, 3))
+        emit("timing", probes=len(results), wall=round(wall, 3))
+        return
+    console = get_console()
+    for r in results:
+        console.print(f"[dim]  {r.duration:6.2f}s  exit={r.returncode:<3} {r.cmd}[/dim]")
+    console.print(f"[dim]  {wall:6.2f}s  total (wall, {len(results)} probes)[/dim]")
+
 def _resolve_service_name(name: str) -> Dict[str, Any]:
     """
     Returns dict:
@@ -73,39 +115,20 @@ def _resolve_service_name(name: str) -> Dict[str, Any]:
     if not raw:
         return {"resolved": raw, "changed": False, "suggestions": []}
 
-    units = _list_service_unit_files()
-    units_l = {u.lower(): u for u in units}
-
-    # 1) exact match (as entered)
-    if raw.lower() in units_l:
-        return {"resolved": units_l[raw.lower()], "changed": False, "suggestions": []}
-
-    # 2) try ".service"
-    if not raw.lower().endswith(".service"):
-        cand = raw + ".service"
-        if cand.lower() in units_l:
-            return {"resolved": units_l[cand.lower()], "changed": True, "suggestions": []}
-
-    # 3) fuzzy suggestions (strip ".service" for better matching)
-    bare_units = [u[:-8] if u.endswith(".service") else u for u in units]
-    # compare against raw without ".service"
-    raw_bare = raw[:-8] if raw.lower().endswith(".service") else raw
-
-    matches = difflib.get_close_matches(raw_bare, bare_units, n=5, cutoff=0.72)
-    suggestions = []
-    for m in matches:
-        # rebuild into ".service" form if exists
-        s = m + ".service"
-        if s.lower() in units_l:
-            suggestions.append(units_l[s.lower()])
-        else:
-            suggestions.append(m)
+    idx = unit_index()
+
+    # 1) exact match (as entered, or with ".service", or an instance of a template)
+    exact = idx.lookup(raw)
+    if exact:
+        return {"resolved": exact, "changed": exact != raw, "suggestions": []}
+
+    # 2) fuzzy suggestions (".service" stripped on both sides)
+    matches = idx.close_matches(raw, n=5, cutoff=0.72, forms=("bare",))
+    suggestions = [u for u, _ in matches]
 
     # if top match is strong enough, auto-resolve
-    if suggestions:
-        score = difflib.SequenceMatcher(a=raw_bare.lower(), b=(suggestions[0].replace(".service", "")).lower()).ratio()
-        if score >= 0.90 and suggestions[0].lower() in units_l:
-            return {"resolved": suggestions[0], "changed": True, "suggestions": suggestions}
+    if matches and matches[0][1] >= 0.90:
+        return {"resolved": matches[0][0], "changed": True, "suggestions": suggestions}
 
     return {"resolved": raw, "changed": False, "suggestions": suggestions}
 
@@ -115,12 +138,19 @@ def service_diagnose(
     apply: bool = False,
     yes: bool = False,
     max_rounds: int = 3,
+    use_cache: bool = True,
+    refresh: bool = False,
+    stream: bool = False,
+    verbose: bool = False,
+    strong: bool = False,
 ) -> None:
     """
     Multi-step systemd service diagnostic:
     - baseline systemctl + journalctl
     - ask model what to run next
     - run suggested read-only probes (optionally ask)
+    The first round goes to the fast tier (or strong with strong=True), later
+    rounds stay on whichever model answered it.
     """
 
     ensure_key()
@@ -150,37 +180,53 @@ def service_diagnose(
         f"journalctl -u {service} -b --no-pager -n 200",
     ]
 
+    t0 = time.monotonic()
     results = _run_diag(base_cmds)
+    if verbose:
+        _print_timings(results, time.monotonic() - t0)
     baseline_text = _format_results(results)
 
-    context = (
-        "You are diagnosing a systemd service on Debian.\n"
-        "Goal: Determine if the service exists and whether it is healthy.\n"
-        "If failing: determine the most likely root cause (config error, missing file, permissions, port in use, etc.)\n"
-        "When you need more evidence, propose additional SAFE diagnostic commands.\n"
-        "Prefer read-only commands.\n"
-        "If you suspect a port conflict, ask to run ss/lsof and identify the owning process.\n"
-        "If you suspect a bad config, ask to show the relevant config file location and show the exact problematic lines.\n"
-        "Return JSON matching schema (intent=general is ok).\n"
+    # context + baseline go out once; later rounds only send the new results
+    conversation = Conversation(
+        preamble=(
+            DIAG_CONTEXT + "\n\n"
+            f"SERVICE: {service}\n\n"
+            f"BASELINE RESULTS:\n{baseline_text}"
+        )
     )
-
     prompt = (
-        f"SERVICE: {service}\n\n"
-        f"BASELINE RESULTS:\n{baseline_text}\n\n"
         "Request: Diagnose this service. If you need more info, return commands[] to run.\n"
         "Important: commands should be SAFE diagnostics (no edits). If you recommend changes, put them in notes.\n"
     )
 
     for round_i in range(1, max_rounds + 1):
-        data = call_responses_structured(context + "\n\n" + prompt, intent="general")
-        render_structured(data)
+        chained = bool(conversation.previous_response_id and conversation.server_side)
+        tier = ("strong" if strong else "fast") if round_i == 1 else None
+        if stream:
+            data = render_structured_live(
+                lambda on_partial: call_responses_structured(
+                    prompt, intent="general", use_cache=use_cache, refresh=refresh,
+                    on_partial=on_partial, conversation=conversation, tier=tier,
+                )
+            )
+        else:
+            data = call_responses_structured(
+                prompt, intent="general", use_cache=use_cache, refresh=refresh, conversation=conversation, tier=tier
+            )
+            render_structured(data)
+        print_cache_note()
+        print_route_note(last_route(), verbose)
+        if verbose:
+            print_call_timing(last_timing())
+            print_round_usage(round_i, last_usage(), chained and conversation.server_side)
 
         cmds = data.get("commands", [])
         if not cmds:
             return
 
-        total = len(cmds)
-        for idx, c in enumerate(cmds, start=1):
+        # (cmd, exclusive) - anything that needed a SUPER_HIGH confirmation runs alone
+        approved: List[Tuple[str, bool]] = []
+        for c in cmds:
             cmd = (c.get("cmd") or "").strip()
             if not cmd:
                 continue
@@ -196,31 +242,207 @@ def service_diagnose(
 
             if risk == "super_high":
                 msg = f"[round {round_i}] Run SUPER_HIGH diagnostic?\n{cmd}\nReason: {bl or 'blacklist match'}"
-                if not Confirm.ask(msg, default=False):
+                if not ask(msg, default=False):
                     continue
             else:
                 if not yes:
-                    if not Confirm.ask(f"[round {round_i}] Run diagnostic?\n{cmd}", default=True):
+                    if not ask(f"[round {round_i}] Run diagnostic?\n{cmd}", default=True):
                         continue
 
-            r = run_command(cmd)
-            results.append(
-                CmdResult(
-                    cmd=cmd,
-                    returncode=r.returncode,
-                    stdout=(r.stdout or ""),
-                    stderr=clean_stderr(r.stderr or ""),
-                )
-            )
+            approved.append((cmd, risk == "super_high"))
 
         if not apply:
             return
 
-        # feed back the new results and loop
+        # confirmations first, then the round runs: read-only probes concurrently
+        t0 = time.monotonic()
+        new_results = _run_approved(approved)
+        if verbose and new_results:
+            _print_timings(new_results, time.monotonic() - t0)
+        results.extend(new_results)
+
+        # local summary, only used if the server can't chain rounds
+        ran = ", ".join(f"{r.cmd} (exit {r.returncode})" for r in new_results) or "nothing"
+        conversation.remember(f"Round {round_i}: {(data.get('summary') or '').strip()} Ran: {ran}")
+
+        # feed back only the new results and loop
         prompt = (
-            f"SERVICE: {service}\n\n"
-            f"ALL RESULTS SO FAR:\n{_format_results(results)}\n\n"
+            f"NEW RESULTS (round {round_i}):\n{_format_results(new_results)}\n\n"
             "Continue diagnosis. If done, return commands=[] and put final answer in summary/notes.\n"
         )
 
     print_box("Reached max diagnostic rounds. If you want, run again with more rounds.", title="Alex")
+
+
+SHOW_PROPS = [
+    "Id", "LoadState", "ActiveState", "SubState", "Result", "UnitFileState", "NRestarts",
+    "ExecMainStatus", "ExecMainCode", "FragmentPath", "DropInPaths", "MainPID",
+]
+
+
+def failed_units() -> List[str]:
+    """Service units systemd currently reports as failed."""
+    p = run_command("systemctl list-units --type=service --state=failed --no-legend --plain --no-pager",
+                    timeout=DIAG_PROBE_TIMEOUT)
+    units = []
+    for line in (p.stdout or "").splitlines():
+        parts = line.split()
+        # some systemd versions still print the "●" marker with --plain
+        if parts and parts[0] == "●":
+            parts = parts[1:]
+        if parts:
+            units.append(parts[0])
+    return units
+
+
+def _show_cmd(units: List[str]) -> str:
+    return "systemctl show " + " ".join(units) + "".join(f" -p {p}" for p in SHOW_PROPS)
+
+
+def _show_many(units: List[str]) -> Dict[str, CmdResult]:
+    """
+    One `systemctl show` for all units, each unit's property block matched on
+    its Id=. If systemctl fails or a unit has no block of its own (unknown
+    name, alias), every unit is shown on its own with its own exit code.
+    """
+    cmd = _show_cmd(units)
+    r = _run_one(cmd)
+    by_id = {}
+    for block in r.stdout.strip().split("\n\n"):
+        unit_id = _props(block).get("Id")
+        if unit_id:
+            by_id[unit_id] = block.strip()
+    blocks = {u: by_id.get(u) or by_id.get(f"{u}.service") for u in units}
+    if r.returncode == 0 and all(blocks.values()):
+        return {u: CmdResult(cmd=cmd, returncode=0, stdout=blocks[u], stderr="", duration=r.duration)
+                for u in units}
+    return dict(zip(units, _run_diag([_show_cmd([u]) for u in units])))
+
+
+def _unit_props(shown: CmdResult) -> Dict[str, str]:
+    props = _props(shown.stdout)
+    if shown.returncode != 0 and not props.get("LoadState"):
+        props["LoadState"] = "error"  # systemctl could not show it: not a healthy unit
+    return props
+
+
+def _props(block: str) -> Dict[str, str]:
+    out = {}
+    for line in block.splitlines():
+        k, sep, v = line.partition("=")
+        if sep:
+            out[k] = v
+    return out
+
+
+def severity(props: Dict[str, str]) -> int:
+    """Lower is worse; derived from the unit's systemd state only."""
+    active = props.get("ActiveState", "")
+    load = props.get("LoadState", "")
+    restarts = int(props.get("NRestarts") or 0)
+    if active == "failed":
+        return 0
+    if load in ("not-found", "bad-setting", "error", "masked"):
+        return 1
+    if active in ("activating", "deactivating") and (restarts or props.get("SubState") == "auto-restart"):
+        return 2
+    if props.get("Result", "success") != "success":
+        return 3
+    if active != "active":
+        return 4
+    return 5
+
+
+def _state_line(props: Dict[str, str]) -> str:
+    state = f"{props.get('ActiveState', '?')}/{props.get('SubState', '?')}"
+    if props.get("Result") not in (None, "", "success"):
+        state += f", result={props['Result']}"
+    if int(props.get("NRestarts") or 0):
+        state += f", {props['NRestarts']} restarts"
+    if props.get("LoadState") not in (None, "", "loaded"):
+        state += f", {props['LoadState']}"
+    return state
+
+
+_SEVERITY_STYLE = {0: "bold red", 1: "red", 2: "yellow", 3: "yellow", 4: "cyan", 5: "green"}
+
+
+def service_diagnose_many(
+    services: List[str],
+    use_cache: bool = True,
+    refresh: bool = False,
+    verbose: bool = False,
+    strong: bool = False,
+    max_workers: int = 4,
+) -> int:
+    """
+    One diagnosis round for each unit: batched baseline, concurrent model
+    calls, then a combined report with the worst units first.
+    Returns the number of units whose analysis failed.
+    """
+    ensure_key()
+
+    t0 = time.monotonic()
+    shown = _show_many(services)
+    journals = _run_diag([f"journalctl -u {u} -b --no-pager -n 200" for u in services])
+    if verbose:
+        _print_timings(journals, time.monotonic() - t0)
+
+    props = {u: _unit_props(shown[u]) for u in services}
+    ordered = sorted(services, key=lambda u: (severity(props[u]), -int(props[u].get("NRestarts") or 0), u))
+
+    def diagnose(unit: str) -> Dict[str, Any]:
+        journal = journals[services.index(unit)]
+        baseline = _format_results([shown[unit], journal])
+        prompt = (
+            DIAG_CONTEXT + "\n\n"
+            f"SERVICE: {unit}\n\n"
+            f"BASELINE RESULTS:\n{baseline}\n\n"
+            "Request: Diagnose this service in one pass. Put the most likely root cause in summary, "
+            "SAFE follow-up diagnostics in commands[] and recommended changes in notes.\n"
+        )
+        return call_responses_structured(prompt, intent="general", use_cache=use_cache, refresh=refresh,
+                                         tier="strong" if strong else "fast")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    console = get_console()
+    with console.status(f"Diagnosing {len(services)} unit(s)…") as status:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(services)))) as pool:
+            futures = {pool.submit(diagnose, u): u for u in ordered}
+            for done, fut in enumerate(as_completed(futures), start=1):
+                u = futures[fut]
+                try:
+                    results[u] = fut.result()
+                except Exception as e:
+                    errors[u] = f"{type(e).__name__}: {e}"
+                status.update(f"Diagnosed {done}/{len(services)} unit(s)…")
+    wall = time.monotonic() - t0
+
+    table = Table(show_header=True, header_style="bold")
+    table.add_column("Unit", no_wrap=True)
+    table.add_column("State", overflow="fold")
+    table.add_column("Finding", overflow="fold")
+    for u in ordered:
+        finding = (results[u].get("summary") or "").strip().split("\n")[0] if u in results else f"analysis failed: {errors[u]}"
+        if machine_output():
+            emit("unit", unit=u, state=_state_line(props[u]), severity=severity(props[u]), finding=finding,
+                 error=errors.get(u))
+        else:
+            table.add_row(Text(u, style=_SEVERITY_STYLE[severity(props[u])]), _state_line(props[u]), finding)
+    if not machine_output():
+        print_box(table, title=f"Alex · {len(services)} units")
+
+    for u in ordered:
+        title = f"Alex · {u} · {_state_line(props[u])}"
+        if u in results:
+            render_structured(results[u], title=title)
+        else:
+            print_box(Text(f"Analysis failed: {errors[u]}"), title=title)
+
+    if machine_output():
+        emit("summary", units=len(services), failed=len(errors), wall=round(wall, 3))
+    else:
+        console.print(f"[dim]{len(services)} unit(s) diagnosed in {wall:.1f}s. "
+                      "For follow-up probes run: alex service <unit> --apply[/dim]")
+    return len(errors)
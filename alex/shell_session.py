@@ -0,0 +1,200 @@
+"""
+Long-lived bash for commands that need a shell (pipes, &&, redirects...).
+
+Starting `bash -lc` per command re-reads /etc/profile, profile.d (including
+alex's own hook) and ~/.profile every time. Instead, one non-login,
+non-interactive bash per alex process (one per concurrently running probe)
+reads commands from a pipe. Each command runs in a subshell, so cd/exit/set
+never leak into the next one, and is followed by sentinel lines on stdout
+and stderr that carry its exit code.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import re
+import secrets
+import selectors
+import shlex
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .executor import CommandResult, _BoundedCapture, _kill, _READ_CHUNK
+
+# "sleep 5 &" would keep writing into the session's pipes after its sentinel
+_BACKGROUND_RE = re.compile(r"(?<![&>|<])&(?![&>])")
+
+
+def needs_isolation(cmd: str, interactive: bool) -> bool:
+    """Commands that must get their own one-shot bash."""
+    if _BACKGROUND_RE.search(cmd):
+        return True
+    # prompts (sudo, apt's Y/n) read from the terminal; a session can only give them /dev/tty
+    return interactive and not os.isatty(0)
+
+
+class _SentinelReader:
+    """Feeds a stream into a capture until `\\n<mark>` shows up."""
+
+    def __init__(self, mark: bytes, cap: _BoundedCapture):
+        self.mark = b"\n" + mark
+        self.cap = cap
+        self.pending = b""
+        self.done = False
+        self.tail = b""  # what follows the mark on its line
+
+    def feed(self, chunk: bytes) -> None:
+        self.pending += chunk
+        i = self.pending.find(self.mark)
+        if i >= 0:
+            end = self.pending.find(b"\n", i + len(self.mark))
+            if end < 0:
+                return  # the rest of the sentinel line is still on its way
+            self.cap.feed(self.pending[:i])
+            self.tail = self.pending[i + len(self.mark):end].strip()
+            self.pending = b""
+            self.done = True
+            return
+        # keep just enough to find a mark split across reads
+        keep = len(self.mark) - 1
+        if len(self.pending) > keep:
+            self.cap.feed(self.pending[:-keep])
+            self.pending = self.pending[-keep:]
+
+    def flush(self) -> None:
+        """No sentinel coming (timeout, bash died): keep what was held back."""
+        if not self.done:
+            self.cap.feed(self.pending)
+            self.pending = b""
+
+
+class ShellSession:
+    def __init__(self, env: Dict[str, str], interactive: bool):
+        self.interactive = interactive
+        self.mark = f"__ALEX_DONE_{secrets.token_hex(8)}__".encode("ascii")
+        # interactive sessions stay in the terminal's process group (sudo needs it),
+        # others get their own so a timeout can kill the whole group
+        self.proc = subprocess.Popen(
+            ["bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            start_new_session=not interactive,
+        )
+        self.alive = True
+
+    def run(self, cmd: str, timeout: Optional[float], capture_chars: int) -> CommandResult:
+        t0 = time.monotonic()
+        stdin = "/dev/tty" if self.interactive else "/dev/null"
+        mark = self.mark.decode("ascii")
+        script = (
+            f"( cd -- {shlex.quote(os.getcwd())} 2>/dev/null; eval {shlex.quote(cmd)} ) <{stdin}\n"
+            f"printf '\\n%s %d\\n' {mark} $?; printf '\\n%s\\n' {mark} >&2\n"
+        )
+        out = _SentinelReader(self.mark, _BoundedCapture(capture_chars, capture_chars))
+        err = _SentinelReader(self.mark, _BoundedCapture(capture_chars, capture_chars))
+
+        timed_out = False
+        try:
+            self.proc.stdin.write(script.encode("utf-8"))
+            self.proc.stdin.flush()
+            timed_out = not self._read_until_done(out, err, timeout)
+        except OSError:
+            self.alive = False
+
+        out.flush()
+        err.flush()
+        stderr = err.cap.text()
+        if timed_out:
+            self.close(kill=True)
+            stderr += f"\nalex: command timed out after {timeout:g}s (killed)\n"
+            returncode = 124
+        elif out.done and err.done:
+            returncode = int(out.tail or 1)
+        else:
+            self.close(kill=True)
+            stderr += "\nalex: shell session ended unexpectedly\n"
+            returncode = 1
+
+        return CommandResult(
+            args=cmd,
+            returncode=returncode,
+            stdout=out.cap.text(),
+            stderr=stderr,
+            stdout_bytes=out.cap.total,
+            stderr_bytes=err.cap.total,
+            truncated=out.cap.truncated or err.cap.truncated,
+            timed_out=timed_out,
+            duration=time.monotonic() - t0,
+        )
+
+    def _read_until_done(self, out: _SentinelReader, err: _SentinelReader, timeout: Optional[float]) -> bool:
+        """False on timeout. EOF (bash died) returns True with the readers not done."""
+        deadline = time.monotonic() + timeout if timeout else None
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.proc.stdout, selectors.EVENT_READ, out)
+            sel.register(self.proc.stderr, selectors.EVENT_READ, err)
+            while not (out.done and err.done):
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                events = sel.select(left)
+                for key, _ in events:
+                    chunk = os.read(key.fd, _READ_CHUNK)
+                    if not chunk:
+                        self.alive = False
+                        return True
+                    key.data.feed(chunk)
+                    if key.data.done:
+                        sel.unregister(key.fileobj)
+        return True
+
+    def close(self, kill: bool = False) -> None:
+        if not self.alive and self.proc.poll() is not None:
+            return
+        self.alive = False
+        if kill:
+            _kill(self.proc, own_group=not self.interactive)
+        else:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            _kill(self.proc, own_group=not self.interactive)
+
+
+_idle: Dict[bool, List[ShellSession]] = {True: [], False: []}
+_lock = threading.Lock()
+
+
+def run_in_session(cmd: str, env: Dict[str, str], timeout: Optional[float], capture_chars: int,
+                   interactive: bool) -> CommandResult:
+    """Run cmd in an idle session (started on first use); concurrent callers get one each."""
+    with _lock:
+        idle = _idle[interactive]
+        session = idle.pop() if idle else None
+    if session is None:
+        session = ShellSession(env, interactive)
+
+    try:
+        return session.run(cmd, timeout, capture_chars)
+    finally:
+        if session.alive:
+            with _lock:
+                _idle[interactive].append(session)
+
+
+@atexit.register
+def close_all() -> None:
+    with _lock:
+        sessions = _idle[True] + _idle[False]
+        _idle[True].clear()
+        _idle[False].clear()
+    for s in sessions:
+        s.close()
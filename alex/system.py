@@ -1,22 +1,103 @@
+import json
 import os
 import platform
+from typing import Dict, Optional
 
-def get_system_info() -> str:
-    os_name = platform.system()
-    os_release = platform.release()
-    os_version = platform.version()
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+OS_RELEASE_PATHS = ("/etc/os-release", "/usr/lib/os-release")
+
+_facts: Optional[Dict[str, str]] = None
+
+
+def _cache_file() -> str:
+    # same dir as alex.cache.cache_dir(), without importing pathlib/hashlib on the hot path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "alex", "system.json")
+
+
+def _facts_key() -> Optional[str]:
+    """boot id + os-release mtime: facts only change with a reboot or a dist-upgrade."""
+    try:
+        with open(BOOT_ID_PATH, "r", encoding="ascii") as f:
+            boot_id = f.read().strip()
+    except OSError:
+        return None
+    mtime = 0
+    for p in OS_RELEASE_PATHS:
+        try:
+            mtime = os.stat(p).st_mtime_ns
+            break
+        except OSError:
+            continue
+    return f"{boot_id}:{mtime}"
+
+
+def _collect() -> Dict[str, str]:
+    u = platform.uname()
     distro = " ".join(platform.freedesktop_os_release().get("PRETTY_NAME", "").split()) \
         if hasattr(platform, "freedesktop_os_release") else ""
-    arch = platform.machine()
+    return {
+        "os_name": u.system,
+        "os_release": u.release,
+        "os_version": u.version,
+        "distro": distro,
+        "arch": u.machine,
+    }
+
+
+def system_facts() -> Dict[str, str]:
+    """
+    Host facts for prompts (hostname excluded), computed once per boot: memoized in-process and
+    kept in the cache dir under the current boot id.
+    """
+    global _facts
+    if _facts is not None:
+        return _facts
+
+    key = _facts_key()
+    path = _cache_file()
+    if key:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("key") == key:
+                _facts = stored["facts"]
+                return _facts
+        except (OSError, ValueError, KeyError):
+            pass
+
+    try:
+        facts = _collect()
+    except OSError:
+        facts = {"os_name": platform.system(), "os_release": "", "os_version": "", "distro": "",
+                 "arch": platform.machine()}
+    _facts = facts
+    if key:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "facts": facts}, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return facts
+
+
+def get_system_info() -> str:
+    f = system_facts()
+    # user differs between sudo/daemon-forwarded calls and the hostname can change
+    # without a reboot (hostnamectl set-hostname): neither is cached. os.uname(),
+    # not platform.node(), which platform memoizes for the life of the process.
     user = os.getenv("USER") or os.getenv("LOGNAME") or "unknown"
-    hostname = platform.node()
+    hostname = os.uname().nodename
 
     lines = []
-    lines.append(f"OS: {os_name} {os_release}")
-    if distro:
-        lines.append(f"Distro: {distro}")
-    lines.append(f"Kernel: {os_version}")
-    lines.append(f"Arch: {arch}")
+    lines.append(f"OS: {f['os_name']} {f['os_release']}")
+    if f["distro"]:
+        lines.append(f"Distro: {f['distro']}")
+    lines.append(f"Kernel: {f['os_version']}")
+    lines.append(f"Arch: {f['arch']}")
     lines.append(f"Hostname: {hostname}")
     lines.append(f"User: {user}")
     return "\n".join(lines)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+from .cache import cache_dir
+
+# systemd unit search path (system manager), highest priority first
+UNIT_SEARCH_PATHS = [
+    "/etc/systemd/system.control",
+    "/run/systemd/transient",
+    "/run/systemd/generator.early",
+    "/etc/systemd/system",
+    "/etc/systemd/system.attached",
+    "/run/systemd/system",
+    "/run/systemd/system.attached",
+    "/run/systemd/generator",
+    "/usr/local/lib/systemd/system",
+    "/usr/lib/systemd/system",
+    "/lib/systemd/system",
+    "/run/systemd/generator.late",
+]
+
+CATALOG_VERSION = 1
+
+_memo: Optional[Tuple[list, List[str]]] = None
+
+
+def _search_dirs() -> List[str]:
+    # on merged-/usr systems /lib/systemd/system is the same directory as /usr/lib/...
+    seen = set()
+    dirs = []
+    for d in UNIT_SEARCH_PATHS:
+        real = os.path.realpath(d)
+        if real in seen or not os.path.isdir(real):
+            continue
+        seen.add(real)
+        dirs.append(real)
+    return dirs
+
+
+def _fingerprint(dirs: List[str]) -> list:
+    """Directory mtimes change whenever a unit file is added, removed or renamed."""
+    fp = []
+    for d in dirs:
+        try:
+            fp.append([d, os.stat(d).st_mtime_ns])
+        except OSError:
+            fp.append([d, None])
+    return fp
+
+
+def _scan(dirs: List[str]) -> List[str]:
+    units = set()
+    for d in dirs:
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    # skip foo.service.d/ and foo.service.wants/ directories
+                    if e.name.endswith(".service") and not e.is_dir():
+                        units.add(e.name)
+        except OSError:
+            continue
+    return sorted(units)
+
+
+def _list_via_systemctl() -> List[str]:
+    from .executor import run_command
+
+    r = run_command("systemctl list-unit-files --type=service --no-legend --no-pager")
+    if r.returncode != 0:
+        return []
+    units = set()
+    for line in (r.stdout or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        # format: "<unit> <state> <preset>"
+        unit = line.split(None, 1)[0]
+        if unit.endswith(".service"):
+            units.add(unit)
+    return sorted(units)
+
+
+def _catalog_path():
+    return cache_dir() / "units.json"
+
+
+def list_service_units() -> List[str]:
+    """
+    All installed *.service unit names (including templates like foo@.service),
+    from a stat() sweep of the unit directories. The scan result is cached on
+    disk and reused while the directory mtimes stay the same.
+    """
+    global _memo
+
+    dirs = _search_dirs()
+    if not dirs:
+        # not a usual systemd layout, ask systemd itself
+        return _list_via_systemctl()
+
+    fp = _fingerprint(dirs)
+    if _memo and _memo[0] == fp:
+        return _memo[1]
+
+    path = _catalog_path()
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") == CATALOG_VERSION and data.get("fingerprint") == fp:
+            _memo = (fp, data["units"])
+            return data["units"]
+    except Exception:
+        pass
+
+    units = _scan(dirs)
+    _memo = (fp, units)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": CATALOG_VERSION, "fingerprint": fp, "units": units}), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return units
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import difflib
+import hashlib
+import marshal
+import os
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .cache import cache_dir
+from .unit_catalog import list_service_units
+
+SUFFIX = ".service"
+# below this size difflib over everything is fast enough and exact
+SMALL_CATALOG = 1500
+# how many n-gram candidates get the real SequenceMatcher scoring
+MAX_CANDIDATES = 300
+
+
+def normalize_unit(name: str) -> str:
+    """ssh -> ssh.service, ssh.service -> ssh.service"""
+    n = (name or "").strip()
+    return n if n.lower().endswith(SUFFIX) else n + SUFFIX
+
+
+def bare_unit(name: str) -> str:
+    """ssh.service -> ssh"""
+    n = (name or "").strip()
+    return n[: -len(SUFFIX)] if n.lower().endswith(SUFFIX) else n
+
+
+def _trigrams(s: str) -> set:
+    s = f"^{s.lower()}$"
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+class UnitIndex:
+    """
+    Trigram index over unit names. Fuzzy lookups first narrow the catalog to
+    names sharing the most trigrams with the query, then score only those
+    with difflib (same scores as before, just on far fewer strings).
+    """
+
+    def __init__(self, units: Sequence[str], persist: bool = False):
+        self.units = list(units)
+        self.bare = [bare_unit(u) for u in self.units]
+        self._by_lower = {u.lower(): u for u in self.units}
+        # trigram -> packed array("I") of unit positions
+        self._postings: Optional[Dict[str, bytes]] = None
+        self._persist = persist
+
+    def _load_postings(self) -> Dict[str, bytes]:
+        """Postings for big catalogs are kept in the cache dir (marshal loads in a few ms)."""
+        if not self._persist:
+            return self._build_postings()
+        digest = hashlib.sha1("\n".join(self.units).encode("utf-8")).hexdigest()
+        path = cache_dir() / "units.trigrams"
+        try:
+            with open(path, "rb") as f:
+                stored_digest, postings = marshal.load(f)
+            if stored_digest == digest:
+                return postings
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        postings = self._build_postings()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                marshal.dump((digest, postings), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        return postings
+
+    def _build_postings(self) -> Dict[str, bytes]:
+        # built on first fuzzy lookup only - exact lookups never need it
+        postings: Dict[str, List[int]] = {}
+        get = postings.get
+        for i, b in enumerate(self.bare):
+            for g in _trigrams(b):
+                lst = get(g)
+                if lst is None:
+                    postings[g] = [i]
+                else:
+                    lst.append(i)
+        return {g: array("I", ids).tobytes() for g, ids in postings.items()}
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Exact unit for name (case-insensitive, with or without .service).
+        Instances of template units (getty@tty1) resolve when the template exists.
+        """
+        unit = self._by_lower.get(normalize_unit(name).lower())
+        if unit:
+            return unit
+        b = bare_unit(name)
+        if "@" in b and not b.endswith("@"):
+            template = b.split("@", 1)[0] + "@" + SUFFIX
+            if template.lower() in self._by_lower:
+                return normalize_unit(name)
+        return None
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        grams = _trigrams(bare_unit(query))
+        if len(self.units) <= SMALL_CATALOG or len(grams) < 2:
+            return range(len(self.units))
+        if self._postings is None:
+            self._postings = self._load_postings()
+        hits: Counter = Counter()
+        for g in grams:
+            ids = self._postings.get(g)
+            if ids:
+                hits.update(array("I", ids))
+        return [i for i, _ in hits.most_common(MAX_CANDIDATES)]
+
+    def close_matches(
+        self,
+        query: str,
+        n: int = 5,
+        cutoff: float = 0.6,
+        forms: Tuple[str, ...] = ("bare",),
+    ) -> List[Tuple[str, float]]:
+        """
+        Best (unit, score) pairs like difflib.get_close_matches. forms picks what
+        the query is compared to: "bare" (ssh) and/or "full" (ssh.service);
+        a unit scores its best form. The bare form is compared with the bare
+        query, so "nginxx.service" and "nginxx" score the same.
+        """
+        q = (query or "").strip()
+        if not q or n <= 0:
+            return []
+
+        # one matcher per form, seq2 (the query side) is what difflib caches
+        matchers = []
+        for form in forms:
+            sm = difflib.SequenceMatcher()
+            sm.set_seq2(bare_unit(q) if form == "bare" else q)
+            matchers.append((self.bare if form == "bare" else self.units, sm))
+        scored = []
+        for i in self._candidates(q):
+            best = 0.0
+            for names, sm in matchers:
+                sm.set_seq1(names[i])
+                if sm.real_quick_ratio() >= cutoff and sm.quick_ratio() >= cutoff:
+                    best = max(best, sm.ratio())
+            if best >= cutoff:
+                scored.append((best, self.units[i]))
+
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [(u, s) for s, u in scored[:n]]
+
+
+_memo: Optional[Tuple[list, UnitIndex]] = None
+
+
+def unit_index() -> UnitIndex:
+    """Index over the current unit catalog, rebuilt only when the catalog changes."""
+    global _memo
+    units = list_service_units()
+    if _memo is None or _memo[0] is not units:
+        _memo = (units, UnitIndex(units, persist=True))
+    return _memo[1]
@@ -2,9 +2,9 @@ from __future__ import annotations
 
 import os
 import subprocess
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Union
 
 try:
     import tomllib  # py>=3.11
@@ -16,14 +16,45 @@ except Exception:  # pragma: no cover
 class UserConfig:
     language: str = "en"  # cs/en
     model: Optional[str] = None
+    # tiered routing (see alex/routing.py): first passes go to model_fast,
+    # weak answers (low confidence, no commands) are re-asked on model_strong
+    model_fast: Optional[str] = None  # default: model
+    model_strong: Optional[str] = None  # default: model, else gpt-4.1
+    escalate: bool = True
     # UX
     verbose: bool = False
     auto_yes: bool = False  
     max_output_chars: int = 4000
+    stream: bool = True  # render answers while they are generated
+    command_timeout: int = 300  # seconds per executed command, 0 = no limit
+    shell_session: bool = True  # shell commands go to one reused bash instead of `bash -lc` each
 
     # prompt tuning
     style: str = "practical"  # practical/terse/verbose
     safety_level: str = "normal"  # normal/strict
+    safety_rules: Dict[str, str] = field(default_factory=dict)  # reason -> regex, [safety_rules] table
+
+    # OpenAI connection (one pooled client per process)
+    api_base_url: Optional[str] = None  # default: OPENAI_BASE_URL or api.openai.com
+    api_timeout: float = 120.0
+    api_connect_timeout: float = 10.0
+    api_max_connections: int = 10
+    api_keepalive: float = 60.0  # seconds an idle connection is kept
+    max_concurrent_requests: int = 4  # in-flight model calls for batch commands
+
+    # record/replay of API exchanges for offline testing (see alex/replay.py)
+    replay_mode: str = ""  # ""/record/replay
+    replay_dir: Optional[str] = None  # default: <cache dir>/cassettes
+    replay_latency: Union[float, str] = 0.0  # seconds before the answer, or "recorded"
+    replay_chunk_delay: float = 0.0  # seconds between streamed events
+
+    # response cache
+    cache: bool = True
+    cache_ttl: int = 3600  # seconds, 0 = never expires
+    cache_max_entries: int = 200
+
+    # local telemetry for `alex stats` (model calls + executed commands)
+    metrics: bool = True
 
 def _config_dir() -> Path:
     xdg = os.environ.get("XDG_CONFIG_HOME")
@@ -38,14 +69,50 @@ def default_config_text() -> str:
 # Tip: after editing, just run alex again, the config is always loaded.
 
 language = "en"        # "cs" or "en"
-# model = "gpt-4.1-mini"
+# model = "gpt-4.1-mini"  # one model for everything (also the default of both tiers below)
+
+# First passes (alex error, first service round) use model_fast; an answer with
+# low confidence or without commands is asked again on model_strong (--strong: right away).
+# model_fast = "gpt-4.1-mini"
+# model_strong = "gpt-4.1"
+escalate = true
 
 verbose = false
 auto_yes = false
 max_output_chars = 4000
+stream = true          # show the answer while it is being generated
+command_timeout = 300  # seconds per executed command (0 = no limit)
+shell_session = true   # run pipelines in one reused non-login bash (false: fresh `bash -lc` per command)
 
 style = "practical"    # "practical" | "terse" | "verbose"
 safety_level = "normal" # "normal" | "strict"
+
+# api_base_url = "https://api.openai.com/v1"
+api_timeout = 120            # seconds per model request
+api_connect_timeout = 10
+api_max_connections = 10
+api_keepalive = 60           # keep idle connections this many seconds
+max_concurrent_requests = 4  # parallel model calls in batch commands (alex error --batch)
+
+# Offline testing: "record" saves every API exchange to replay_dir, "replay" answers
+# from those files without network (ALEX_REPLAY=record|replay overrides this).
+# replay_mode = "replay"
+# replay_dir = "~/.cache/alex/cassettes"
+# replay_latency = 0.8     # seconds, or "recorded"
+# replay_chunk_delay = 0.02
+
+cache = true           # reuse answers for identical questions on this host
+cache_ttl = 3600       # seconds (0 = never expire)
+cache_max_entries = 200
+
+metrics = true         # record call latency/tokens and command run times for `alex stats`
+
+# Extra commands that always need a SUPER_HIGH confirmation (case-insensitive regex).
+# safety_level = "strict" additionally flags package removal, systemctl stop/disable,
+# kill, recursive rm, firewall flushes and account changes.
+# [safety_rules]
+# "force push" = 'git\\s+push\\b.*--force'
+# "drops a database" = 'drop\\s+database'
 """
 
 def ensure_config_file() -> Path:
@@ -55,12 +122,37 @@ def ensure_config_file() -> Path:
         path.write_text(default_config_text(), encoding="utf-8")
     return path
 
+# (path, mtime_ns, size) -> parsed config; one parse per process unless the file changes
+_memo: Optional[tuple] = None
+
+
 def load_config() -> UserConfig:
+    """
+    Parsed config, shared by all callers in the process. Revalidated with one
+    stat() per call, so edits are picked up without a restart. Treat as read-only.
+    """
+    global _memo
     path = config_path()
-    if not path.exists() or not tomllib:
+    try:
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = (str(path), None, None)
+    if _memo is not None and _memo[0] == key:
+        return _memo[1]
+    cfg = _parse_config(path) if key[1] is not None else UserConfig()
+    _memo = (key, cfg)
+    return cfg
+
+
+def _parse_config(path: Path) -> UserConfig:
+    if not tomllib:
         return UserConfig()
 
-    raw = path.read_bytes()
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return UserConfig()
     try:
         data = tomllib.loads(raw.decode("utf-8"))
     except Exception:
@@ -68,7 +160,10 @@ def load_config() -> UserConfig:
         return UserConfig()
 
     cfg = UserConfig()
-    for key in ("language", "model", "verbose", "auto_yes", "max_output_chars", "style", "safety_level"):
+    for key in ("language", "model", "model_fast", "model_strong", "escalate", "verbose", "auto_yes", "max_output_chars", "stream", "command_timeout", "shell_session", "style", "safety_level", "safety_rules",
+                "api_base_url", "api_timeout", "api_connect_timeout", "api_max_connections", "api_keepalive", "max_concurrent_requests",
+                "replay_mode", "replay_dir", "replay_latency", "replay_chunk_delay",
+                "cache", "cache_ttl", "cache_max_entries", "metrics"):
         if key in data:
             setattr(cfg, key, data[key])
     return cfg
@@ -1,15 +1,71 @@
+# Alex shell hook: logs failed commands for "alex error".
+#
+# One record per failed command line, written with a single printf (no forks)
+# into a per-user log: $XDG_RUNTIME_DIR/alex/errors.log (or /tmp/alex-$UID/alex,
+# used only if it is a 0700 directory owned by the user and not a symlink).
+#
+#   ---- 2026-01-03 10:00:00 ----
+#   Exit code: 1 | Command: make install
+#   Cwd: /home/me/src/app | Duration: 12.345s
+
+# /etc/profile.d is also read by sh: keep this first line POSIX
+[ -n "$BASH_VERSION" ] || return 0
+[[ -z "${PS1-}" ]] && return 0
+
+__alex_err_base="${XDG_RUNTIME_DIR:-/tmp/alex-$UID}"
+__alex_err_dir="$__alex_err_base/alex"
+__alex_err_file="$__alex_err_dir/errors.log"
+__alex_err_max=${ALEX_ERR_MAX_BYTES:-1048576}
+__alex_err_n=0
+
+# /tmp/alex-$UID can be pre-created (or symlinked) by anyone: only log into
+# directories that are real, ours and private
+__alex_private_dir() {
+  [[ -d "$1" ]] || mkdir -m 700 "$1" 2>/dev/null
+  [[ -d "$1" && ! -L "$1" && -O "$1" ]] && [[ "$(stat -c %a "$1" 2>/dev/null)" == 700 ]]
+}
+if ! __alex_private_dir "$__alex_err_base" || ! __alex_private_dir "$__alex_err_dir"; then
+  echo "alex: not logging errors, $__alex_err_dir is not a private directory owned by you" >&2
+  unset -f __alex_private_dir
+  return 0
+fi
+unset -f __alex_private_dir
+
+__alex_rotate() {
+  local size
+  size=$(stat -c %s "$__alex_err_file" 2>/dev/null) || return
+  (( size > __alex_err_max )) && mv -f "$__alex_err_file" "$__alex_err_file.1"
+  return 0
+}
+
 __alex_log_error() {
   local exit_code=$?
   [[ $exit_code -eq 0 ]] && return
-  [[ -z "$PS1" ]] && return
+  # never follow a symlink planted in place of the log
+  [[ -L "$__alex_err_file" ]] && return
+  # errtrace fires once per failing command inside functions too; log the command line once
+  [[ -n "${__alex_t0-}" && "$__alex_t0" == "${__alex_logged-}" ]] && return
+  __alex_logged=${__alex_t0-}
 
-  local ts
-  ts=$(date "+%Y-%m-%d %H:%M:%S")
+  local cmd=${BASH_COMMAND//$'\n'/\\n} dur=""
+  if [[ -n "${__alex_t0-}" && -n "${EPOCHREALTIME-}" ]]; then
+    local us=$(( ${EPOCHREALTIME//[!0-9]/} - __alex_t0 ))
+    printf -v dur ' | Duration: %d.%03ds' $(( us / 1000000 )) $(( us / 1000 % 1000 ))
+  fi
 
-  echo "---- $ts ----" >> /tmp/alex_last_error.txt
-  echo "Exit code: $exit_code | Command: $BASH_COMMAND" >> /tmp/alex_last_error.txt
-  echo >> /tmp/alex_last_error.txt
+  printf -- '---- %(%Y-%m-%d %H:%M:%S)T ----\nExit code: %d | Command: %s\nCwd: %s%s\n\n' \
+    -1 "$exit_code" "$cmd" "$PWD" "$dur" >> "$__alex_err_file"
+
+  # size check needs a fork, so only every 32nd record
+  (( ++__alex_err_n % 32 )) || __alex_rotate
 }
 
+# PS0 is expanded right before a command line runs; the arithmetic subscript
+# stores the start time (microseconds) without a fork or a DEBUG trap
+if [[ -n "${EPOCHREALTIME-}" ]]; then
+  PS0="${PS0-}"'${__alex_noop[__alex_t0=${EPOCHREALTIME//[!0-9]/}]-}'
+fi
+
+__alex_rotate
 trap '__alex_log_error' ERR
 set -o errtrace
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the local hot paths of alex (everything that runs on
+this machine on each invocation, no model calls):
+
+  errors    read_error_log_blocks + filter_error_blocks on synthetic logs
+  safety    classify_blacklist over a command corpus (cold and memoized)
+  resolve   both service name resolvers over synthetic unit catalogs
+  render    render_structured with a large command table
+  format    service_diag._format_results on large probe outputs
+  startup   CLI cold start per local subcommand (fresh interpreter)
+
+The report is JSON on stdout, so runs can be compared across versions:
+
+  python scripts/bench.py > before.json
+  git checkout feature && python scripts/bench.py --compare before.json
+  python scripts/bench.py --only errors safety --log-sizes 1
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+# the per-area scripts next to this one provide corpora and the cold start runner
+from bench_resolve import QUERIES, synthetic_units  # noqa: E402
+from bench_safety import corpus  # noqa: E402
+from startup_bench import SUBCOMMANDS, time_subcommand  # noqa: E402
+
+GROUPS = ("errors", "safety", "resolve", "render", "format", "startup")
+
+FAILED = [
+    ("make install", 2, "make: *** [Makefile:42: install] Error 1"),
+    ("npm run build", 1, "npm ERR! code ELIFECYCLE\nnpm ERR! errno 1"),
+    ("sudo systemctl restart nginx", 1, "Job for nginx.service failed because the control process exited with error code."),
+    ("python3 manage.py migrate", 1, "django.db.utils.OperationalError: could not connect to server: Connection refused"),
+    ("cargo build --release", 101, "error[E0432]: unresolved import `crate::foo`"),
+    ("ssh deploy@10.0.0.5", 255, "ssh: connect to host 10.0.0.5 port 22: Connection timed out"),
+    ("git push origin main", 1, "error: failed to push some refs to 'origin'"),
+    ("cp build/app /opt/app/", 1, "cp: cannot create regular file '/opt/app/app': Permission denied"),
+]
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> Dict[str, float]:
+    """Run fn repeat times; milliseconds per run."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {"min_ms": round(samples[0], 3), "median_ms": round(statistics.median(samples), 3)}
+
+
+# ---- errors ---------------------------------------------------------------
+
+def write_error_log(path: Path, size_mb: float, seed: int = 3) -> int:
+    """Hook-format log of roughly size_mb megabytes, one record per second. Returns block count."""
+    rnd = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    ts = datetime(2026, 1, 1)
+    n = 0
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            cmd, code, err = rnd.choice(FAILED)
+            rec = (
+                f"---- {ts:%Y-%m-%d %H:%M:%S} ----\n"
+                f"Exit code: {code} | Command: {cmd}\n"
+                f"Cwd: /home/dev/src/app{n % 7} | Duration: {rnd.random() * 30:.3f}s\n"
+                f"{err}\n\n"
+            )
+            f.write(rec)
+            written += len(rec)
+            ts += timedelta(seconds=1)
+            n += 1
+    return n
+
+
+def bench_errors(tmp: Path, sizes: List[float], repeat: int) -> Dict[str, Any]:
+    from alex.errors import filter_error_blocks, read_error_log_blocks
+
+    out: Dict[str, Any] = {}
+    for mb in sizes:
+        path = tmp / f"errors-{mb:g}mb.log"
+        n = write_error_log(path, mb)
+        p = str(path)
+        # since: the last ~1% of records
+        since = (datetime(2026, 1, 1) + timedelta(seconds=int(n * 0.99))).strftime("%Y-%m-%d %H:%M:%S")
+        blocks = read_error_log_blocks(p)
+        read_error_log_blocks(p, since=since)  # builds the sidecar offset index once
+        r = max(1, repeat if mb <= 10 else 2)
+        out[f"{mb:g}mb"] = {
+            "blocks": n,
+            "read_all": measure(lambda: read_error_log_blocks(p), r),
+            "read_last_20": measure(lambda: read_error_log_blocks(p, last=20), repeat),
+            "read_since_indexed": measure(lambda: read_error_log_blocks(p, since=since), repeat),
+            "filter_grep": measure(lambda: filter_error_blocks(blocks, None, "permission denied"), r),
+            "filter_exit_command": measure(
+                lambda: filter_error_blocks(blocks, None, None, exit_code=1, command="systemctl"), r),
+            "filter_since": measure(lambda: filter_error_blocks(blocks, since, None), repeat),
+        }
+        path.unlink()
+    return out
+
+
+# ---- safety ---------------------------------------------------------------
+
+def bench_safety(count: int, repeat: int) -> Dict[str, Any]:
+    from alex.executor import classify_blacklist
+    from alex.safety import scan
+
+    cmds = corpus(count)
+
+    def cold():
+        scan.cache_clear()
+        for c in cmds:
+            classify_blacklist(c)
+
+    def warm():
+        for c in cmds:
+            classify_blacklist(c)
+
+    res = {"commands": len(cmds), "cold": measure(cold, repeat)}
+    warm()
+    res["memoized"] = measure(warm, repeat)
+    for k in ("cold", "memoized"):
+        res[k]["us_per_cmd"] = round(res[k]["median_ms"] * 1000 / len(cmds), 2)
+    return res
+
+
+# ---- resolve --------------------------------------------------------------
+
+def bench_resolve(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    from alex import unit_index
+    from alex.service_diag import _resolve_service_name
+    from alex.service_resolve import resolve_service_name
+
+    out: Dict[str, Any] = {}
+    real = unit_index.list_service_units
+    try:
+        for n in sizes:
+            units = synthetic_units(n)
+            # unit_index() memoizes on the identity of the catalog list
+            unit_index.list_service_units = lambda units=units: units
+            unit_index._memo = None
+            build = measure(lambda: unit_index.unit_index().close_matches("warmup", n=1), 1)
+            out[str(len(units))] = {
+                "index_build": build,
+                "resolve_service_name": measure(lambda: [resolve_service_name(q) for q in QUERIES], repeat),
+                "service_diag_resolve": measure(lambda: [_resolve_service_name(q) for q in QUERIES], repeat),
+                "queries": len(QUERIES),
+            }
+    finally:
+        unit_index.list_service_units = real
+        unit_index._memo = None
+    return out
+
+
+# ---- render ---------------------------------------------------------------
+
+def structured_answer(n_cmds: int) -> Dict[str, Any]:
+    risks = ["low", "medium", "high", "super_high"]
+    return {
+        "intent": "general",
+        "summary": "nginx fails to start because port 80 is already bound by apache2. " * 3,
+        "steps": [f"Step {i}: check the unit and its drop-ins, then reload the daemon" for i in range(12)],
+        "commands": [
+            {
+                "cmd": f"sudo journalctl -u svc{i}.service -b --no-pager -n 200 | grep -i 'error\\|fail'",
+                "why": "Shows the most recent failures of the unit since boot, filtered to error lines only.",
+                "risk": risks[i % len(risks)],
+            }
+            for i in range(n_cmds)
+        ],
+        "checks": [f"systemctl is-active svc{i}" for i in range(10)],
+        "notes": ["Port conflicts are the usual cause after installing a second web server."] * 5,
+    }
+
+
+def bench_render(cmd_counts: List[int], repeat: int) -> Dict[str, Any]:
+    from rich.console import Console
+
+    from alex import render
+
+    out: Dict[str, Any] = {}
+    saved = render._console
+    try:
+        for n in cmd_counts:
+            data = structured_answer(n)
+            sink = io.StringIO()
+            render._console = Console(file=sink, width=120, force_terminal=True, color_system="truecolor")
+
+            def run():
+                sink.seek(0)
+                sink.truncate()
+                render.render_structured(data)
+
+            out[f"{n}_commands"] = measure(run, repeat)
+    finally:
+        render._console = saved
+    return out
+
+
+# ---- format ---------------------------------------------------------------
+
+def journal_output(lines: int, seed: int = 5) -> str:
+    rnd = random.Random(seed)
+    msgs = [
+        "nginx[{pid}]: 2026/01/01 10:00:{s:02d} [emerg] bind() to 0.0.0.0:80 failed (98: Address already in use)",
+        "systemd[1]: nginx.service: Control process exited, code=exited, status=1/FAILURE",
+        "kernel: [UFW BLOCK] IN=eth0 OUT= SRC=10.0.{a}.{b} DST=10.0.0.1 PROTO=TCP SPT={pid} DPT=22",
+        "sshd[{pid}]: Connection closed by 10.0.{a}.{b} port {pid} [preauth]",
+    ]
+    out = []
+    for i in range(lines):
+        msg = rnd.choice(msgs).format(pid=rnd.randint(1000, 65000), s=i % 60, a=rnd.randint(0, 255), b=rnd.randint(0, 255))
+        out.append(f"Jan 01 10:{i // 60 % 60:02d}:{i % 60:02d} host {msg}")
+    return "\n".join(out)
+
+
+def bench_format(line_counts: List[int], repeat: int) -> Dict[str, Any]:
+    from alex.service_diag import CmdResult, _format_results
+
+    out: Dict[str, Any] = {}
+    for n in line_counts:
+        journal = journal_output(n)
+        results = [
+            CmdResult("systemctl status nginx --no-pager", 3, journal[:4000], ""),
+            CmdResult("journalctl -u nginx -b --no-pager", 0, journal, ""),
+            CmdResult("ss -tlnp", 0, "\n".join(f"LISTEN 0 511 0.0.0.0:{p} users:((\"x\",pid={p}))" for p in range(n // 10)), ""),
+            CmdResult("cat /etc/nginx/nginx.conf", 0, "worker_processes auto;\n" * (n // 4), "cat: warning\n" * 50),
+        ]
+        res = measure(lambda: _format_results(results), repeat)
+        res["input_chars"] = sum(len(r.stdout) + len(r.stderr) for r in results)
+        res["output_chars"] = len(_format_results(results))
+        out[f"{n}_lines"] = res
+    return out
+
+
+# ---- driver ---------------------------------------------------------------
+
+def _git_rev() -> str:
+    try:
+        r = subprocess.run(["git", "-C", str(REPO), "rev-parse", "--short", "HEAD"],
+                           capture_output=True, text=True, timeout=5)
+        return r.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            flat.update(_flatten(v, key + "."))
+        elif key.endswith("median_ms"):
+            flat[key] = v
+    return flat
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    a, b = _flatten(old["results"]), _flatten(new["results"])
+    rows = []
+    for key in sorted(a.keys() & b.keys()):
+        ratio = b[key] / a[key] if a[key] else float("inf")
+        rows.append(f"{key:<62} {a[key]:>10.3f} -> {b[key]:>10.3f} ms  {ratio:5.2f}x")
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--log-sizes", type=float, nargs="+", default=[1, 100], metavar="MB")
+    ap.add_argument("--unit-counts", type=int, nargs="+", default=[500, 10000])
+    ap.add_argument("--commands", type=int, default=5000, help="safety corpus size")
+    ap.add_argument("--render-commands", type=int, nargs="+", default=[10, 200])
+    ap.add_argument("--output-lines", type=int, nargs="+", default=[1000, 50000])
+    ap.add_argument("--startup-runs", type=int, default=5)
+    ap.add_argument("--out", metavar="FILE", help="also write the JSON report to FILE")
+    ap.add_argument("--compare", metavar="FILE", help="compare medians with an earlier JSON report")
+    args = ap.parse_args()
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="alex-bench-") as td:
+        tmp = Path(td)
+        # indexes, unit postings and metrics go to a throwaway cache dir
+        os.environ["XDG_CACHE_HOME"] = str(tmp / "cache")
+        os.environ["XDG_CONFIG_HOME"] = str(tmp / "config")
+
+        runners = {
+            "errors": lambda: bench_errors(tmp, args.log_sizes, args.repeat),
+            "safety": lambda: bench_safety(args.commands, args.repeat),
+            "resolve": lambda: bench_resolve(args.unit_counts, args.repeat),
+            "render": lambda: bench_render(args.render_commands, args.repeat),
+            "format": lambda: bench_format(args.output_lines, args.repeat),
+            "startup": lambda: {sub: time_subcommand(sub, args.startup_runs, tmp) for sub in SUBCOMMANDS},
+        }
+        for group in GROUPS:
+            if group not in args.only:
+                continue
+            print(f"… {group}", file=sys.stderr)
+            results[group] = runners[group]()
+
+    report = {
+        "alex": _alex_version(),
+        "git": _git_rev(),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"{old.get('git') or '?'} -> {report['git'] or '?'} (median, new/old)")
+        for row in compare(old, report):
+            print(row)
+    else:
+        print(text)
+    return 0
+
+
+def _alex_version() -> str:
+    from alex import __version__
+
+    return __version__
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env bash
+# Overhead of the shell hook, in microseconds:
+#   per prompt   - PS0 expansion that stores the start time (paid on every command line)
+#   per failure  - writing one record (paid only when a command fails)
+# and the previous hook (date fork + three appends) for comparison.
+#
+#   bash scripts/bench_hook.sh [iterations]
+set -u
+N=${1:-5000}
+HOOK="$(cd "$(dirname "$0")" && pwd)/alex-shell-hook.sh"
+
+export XDG_RUNTIME_DIR=$(mktemp -d)
+trap 'rm -rf "$XDG_RUNTIME_DIR"' EXIT
+
+bench() {  # name, command...
+  local name=$1; shift
+  local t0=${EPOCHREALTIME//[!0-9]/} i
+  for (( i = 0; i < N; i++ )); do "$@"; done
+  local t1=${EPOCHREALTIME//[!0-9]/}
+  printf '%-28s %8.2f us\n' "$name" "$(( (t1 - t0) * 100 / N ))e-2"
+}
+
+PS1='$ '
+# shellcheck source=/dev/null
+source "$HOOK"
+trap - ERR
+set +o errtrace
+
+empty() { :; }
+prompt() { : "${PS0@P}"; }
+failure() { : "${PS0@P}"; false || __alex_log_error; }
+old_hook() {
+  local ts
+  ts=$(date "+%Y-%m-%d %H:%M:%S")
+  echo "---- $ts ----" >> "$XDG_RUNTIME_DIR/old.txt"
+  echo "Exit code: 1 | Command: false" >> "$XDG_RUNTIME_DIR/old.txt"
+  echo >> "$XDG_RUNTIME_DIR/old.txt"
+}
+
+bench "baseline (empty function)" empty
+bench "per prompt (PS0)" prompt
+bench "per failure (new hook)" failure
+N=$(( N / 10 )) bench "per failure (old hook)" old_hook
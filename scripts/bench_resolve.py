@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for fuzzy service name resolution.
+
+Builds synthetic unit catalogs (plain services plus lots of template
+instances, like on container hosts and build servers) and compares the
+plain difflib scan the resolvers used to do with the trigram UnitIndex.
+
+  python scripts/bench_resolve.py
+  python scripts/bench_resolve.py --sizes 1000 10000 50000 --json
+"""
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from alex.unit_index import UnitIndex  # noqa: E402
+
+WORDS = [
+    "nginx", "apache2", "ssh", "cron", "docker", "containerd", "postgresql", "mysql", "redis",
+    "rabbitmq", "kubelet", "haproxy", "stunnel4", "chrony", "rsyslog", "systemd-journald",
+    "networking", "NetworkManager", "bluetooth", "cups", "grafana", "prometheus", "node-exporter",
+    "gitlab-runner", "jenkins", "elasticsearch", "kibana", "fail2ban", "ufw", "snapd",
+]
+
+QUERIES = ["ngnix", "postgres", "stunnel", "dockr", "ssh", "node_exporter", "gitlab", "redis-server", "kubelt"]
+
+
+def synthetic_units(n: int, seed: int = 1) -> List[str]:
+    rnd = random.Random(seed)
+    units = {w + ".service" for w in WORDS}
+    units.update({"getty@.service", "user@.service", "container@.service", "systemd-fsck@.service"})
+    while len(units) < n:
+        kind = rnd.random()
+        if kind < 0.5:
+            units.add("container@" + "".join(rnd.choices("0123456789abcdef", k=12)) + ".service")
+        elif kind < 0.7:
+            units.add(f"user@{rnd.randint(1000, 99999)}.service")
+        elif kind < 0.8:
+            units.add("systemd-fsck@dev-disk-by\\x2duuid-" + "".join(rnd.choices("0123456789abcdef", k=8)) + ".service")
+        else:
+            w = rnd.choice(WORDS)
+            suffix = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(2, 6)))
+            units.add(f"{w}-{suffix}.service")
+    return sorted(units)
+
+
+def legacy_resolve(name: str, services: List[str]) -> List[str]:
+    # what resolve_service_name did before the index
+    wanted = name if name.endswith(".service") else name + ".service"
+    close = difflib.get_close_matches(wanted, services, n=5, cutoff=0.6)
+    if not close:
+        loose = services + [s.replace(".service", "") for s in services]
+        close = difflib.get_close_matches(name, loose, n=5, cutoff=0.6)
+    return close
+
+
+def indexed_resolve(name: str, idx: UnitIndex) -> List[str]:
+    wanted = name if name.endswith(".service") else name + ".service"
+    close = idx.close_matches(wanted, n=5, cutoff=0.6, forms=("full",))
+    if not close:
+        close = idx.close_matches(name, n=5, cutoff=0.6, forms=("full", "bare"))
+    return [u for u, _ in close]
+
+
+def bench(n: int, legacy: bool) -> Dict[str, float]:
+    units = synthetic_units(n)
+
+    t0 = time.perf_counter()
+    idx = UnitIndex(units, persist=True)
+    idx.close_matches("warmup", n=1)  # postings are built lazily on the first fuzzy lookup
+    build = time.perf_counter() - t0
+
+    # next process: postings come from the cache dir
+    t0 = time.perf_counter()
+    UnitIndex(units, persist=True).close_matches("warmup", n=1)
+    warm = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for q in QUERIES:
+        indexed_resolve(q, idx)
+    indexed = (time.perf_counter() - t0) / len(QUERIES)
+
+    out = {
+        "units": len(units),
+        "index_build_ms": build * 1000,
+        "index_warm_load_ms": warm * 1000,
+        "indexed_ms_per_query": indexed * 1000,
+    }
+    if legacy:
+        t0 = time.perf_counter()
+        for q in QUERIES:
+            legacy_resolve(q, units)
+        out["legacy_ms_per_query"] = (time.perf_counter() - t0) / len(QUERIES) * 1000
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in out.items()}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 10000, 30000])
+    ap.add_argument("--no-legacy", action="store_true", help="skip the (slow) legacy difflib scan")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    # persisted postings go to a throwaway cache dir
+    with tempfile.TemporaryDirectory(prefix="alex-bench-") as td:
+        os.environ["XDG_CACHE_HOME"] = td
+        results = [bench(n, legacy=not args.no_legacy) for n in args.sizes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    for r in results:
+        line = f"{r['units']:>7} units  build {r['index_build_ms']:8.1f} ms  warm load {r['index_warm_load_ms']:7.1f} ms  indexed {r['indexed_ms_per_query']:8.2f} ms/query"
+        if "legacy_ms_per_query" in r:
+            line += f"  legacy {r['legacy_ms_per_query']:9.2f} ms/query"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI Responses API (POST /v1/responses), stdlib only.
+
+Answers every request with a canned structured answer matching alex's
+schema, either as one JSON response or as a server-sent event stream
+(stream=true). It keeps response ids so previous_response_id chaining works.
+Use it to measure alex's own overhead, concurrency and caching offline:
+
+  python scripts/openai_standin.py --port 8765 --latency 0.5 --chunk-delay 0.01
+  OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=x alex run "is nginx running?"
+
+Record cassettes against it (or the real API) with ALEX_REPLAY=record, see
+alex/replay.py. Ctrl-C prints request count, peak concurrency and latency.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Sequence
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+STATS = {"requests": 0, "streamed": 0, "chained": 0, "refused": 0, "in_flight": 0, "peak": 0}
+LATENCIES: List[float] = []
+KNOWN_IDS = set()
+
+
+def _user_text(req: Dict[str, Any]) -> str:
+    inp = req.get("input")
+    if isinstance(inp, str):
+        return inp
+    parts = []
+    for m in inp or []:
+        c = m.get("content")
+        if m.get("role") == "user" and isinstance(c, str):
+            parts.append(c)
+    return "\n".join(parts)
+
+
+def answer(req: Dict[str, Any], unsure_models: Sequence[str] = ()) -> Dict[str, Any]:
+    """A schema-valid answer loosely shaped by the request (low confidence from unsure_models)."""
+    text = _user_text(req)
+    m = re.search(r"Intent:\s*(\w+)", text)
+    intent = m.group(1) if m and m.group(1) in ("general", "error_analysis") else "general"
+    unit = re.search(r"\b([\w@.-]+)\.service\b", text)
+    unit = unit.group(1) if unit else "nginx"
+    return {
+        "intent": intent,
+        "summary": f"Stand-in answer ({len(text)} chars of input). {unit} is probably misconfigured.",
+        "steps": [f"Check the state of {unit}", "Read the recent journal", "Validate the configuration"],
+        "commands": [
+            {"cmd": f"systemctl status {unit} --no-pager", "why": "Current unit state", "risk": "low"},
+            {"cmd": f"journalctl -u {unit} -b --no-pager -n 50", "why": "Recent log lines", "risk": "low"},
+            {"cmd": f"sudo systemctl restart {unit}", "why": "Apply the fix", "risk": "medium"},
+        ],
+        "checks": [f"systemctl is-active {unit}"],
+        "notes": ["Served by scripts/openai_standin.py"],
+        "confidence": "low" if req.get("model") in unsure_models else "high",
+    }
+
+
+def response_object(rid: str, req: Dict[str, Any], text: str, status: str = "completed") -> Dict[str, Any]:
+    in_tokens = len(json.dumps(req.get("input", ""))) // 4
+    out_tokens = len(text) // 4
+    return {
+        "id": rid,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": req.get("model", "stand-in"),
+        "status": status,
+        "previous_response_id": req.get("previous_response_id"),
+        "output": [] if status != "completed" else [{
+            "type": "message", "id": "msg_" + rid, "role": "assistant", "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": in_tokens,
+            "input_tokens_details": {"cached_tokens": in_tokens // 2 if req.get("previous_response_id") else 0},
+            "output_tokens": out_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": in_tokens + out_tokens,
+        },
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    opts: argparse.Namespace
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        if self.opts.verbose:
+            sys.stderr.write("standin: " + fmt % args + "\n")
+
+    def _json(self, status: int, obj: Dict[str, Any]) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str, param: Any = None) -> None:
+        self._json(status, {"error": {"message": message, "type": "invalid_request_error", "param": param, "code": None}})
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/models"):
+            self._json(200, {"object": "list", "data": [{"id": "stand-in", "object": "model", "owned_by": "local"}]})
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self) -> None:
+        n = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(n) or b"{}")
+        except ValueError:
+            return self._error(400, "Request body is not JSON")
+        if not self.path.rstrip("/").endswith("/responses"):
+            return self._error(404, f"Unknown path {self.path}")
+
+        t0 = time.monotonic()
+        with _lock:
+            STATS["requests"] += 1
+            STATS["in_flight"] += 1
+            STATS["peak"] = max(STATS["peak"], STATS["in_flight"])
+        try:
+            self._respond(req)
+        finally:
+            with _lock:
+                STATS["in_flight"] -= 1
+                LATENCIES.append(time.monotonic() - t0)
+
+    def _respond(self, req: Dict[str, Any]) -> None:
+        prev = req.get("previous_response_id")
+        if prev:
+            with _lock:
+                known = prev in KNOWN_IDS and not self.opts.refuse_chaining
+                STATS["chained" if known else "refused"] += 1
+            if not known:
+                return self._error(400, f"Previous response with id '{prev}' not found.", "previous_response_id")
+
+        if self.opts.fail_rate and random.random() < self.opts.fail_rate:
+            return self._json(500, {"error": {"message": "Injected failure", "type": "server_error", "param": None, "code": None}})
+
+        if self.opts.latency:
+            time.sleep(self.opts.latency)
+
+        rid = f"resp_standin_{next(_ids)}"
+        with _lock:
+            KNOWN_IDS.add(rid)
+        text = json.dumps(answer(req, self.opts.unsure_model))
+
+        if not req.get("stream"):
+            return self._json(200, response_object(rid, req, text))
+
+        with _lock:
+            STATS["streamed"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        seq = itertools.count()
+
+        def emit(etype: str, **data: Any) -> None:
+            payload = json.dumps({"type": etype, "sequence_number": next(seq), **data})
+            self.wfile.write(f"event: {etype}\ndata: {payload}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        emit("response.created", response=response_object(rid, req, "", status="in_progress"))
+        size = max(1, self.opts.chunk_chars)
+        for i in range(0, len(text), size):
+            if self.opts.chunk_delay:
+                time.sleep(self.opts.chunk_delay)
+            emit("response.output_text.delta", item_id="msg_" + rid, output_index=0, content_index=0,
+                 delta=text[i:i + size], logprobs=[])
+        emit("response.output_text.done", item_id="msg_" + rid, output_index=0, content_index=0, text=text, logprobs=[])
+        emit("response.completed", response=response_object(rid, req, text))
+
+
+def summary() -> str:
+    lat = sorted(LATENCIES)
+    p50 = lat[len(lat) // 2] if lat else 0.0
+    p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else 0.0
+    return (
+        f"{STATS['requests']} request(s), {STATS['streamed']} streamed, {STATS['chained']} chained, "
+        f"{STATS['refused']} chaining refused, peak concurrency {STATS['peak']}, "
+        f"latency p50 {p50 * 1000:.0f} ms p95 {p95 * 1000:.0f} ms"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds before the answer starts")
+    ap.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed deltas")
+    ap.add_argument("--chunk-chars", type=int, default=16, help="characters per streamed delta")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with HTTP 500")
+    ap.add_argument("--refuse-chaining", action="store_true", help="reject previous_response_id like a store=false org")
+    ap.add_argument("--unsure-model", action="append", default=[], metavar="MODEL",
+                    help="answer requests for this model with confidence=low (exercises escalation, repeatable)")
+    ap.add_argument("--verbose", "-v", action="store_true", help="log every request")
+    args = ap.parse_args()
+
+    Handler.opts = args
+    srv = ThreadingHTTPServer((args.host, args.port), Handler)
+    srv.daemon_threads = True
+    print(f"OpenAI stand-in on http://{args.host}:{srv.server_address[1]}/v1", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        print(summary(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the alex CLI.
+
+Runs each local-only subcommand in a fresh interpreter several times and
+reports wall time. Use --max-ms in CI to catch import regressions and
+--importtime to see which modules a subcommand pulls in.
+
+  python scripts/startup_bench.py
+  python scripts/startup_bench.py --runs 20 --json
+  python scripts/startup_bench.py --importtime "error --show"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO = Path(__file__).resolve().parent.parent
+
+# subcommands that never touch the network
+SUBCOMMANDS = [
+    "--help",
+    "error --show",
+    "error --clear",
+    "config --show",
+    "auth --show",
+    "cache",
+]
+
+LAUNCHER = "import sys; from alex.cli import main; sys.argv[0] = 'alex'; main()"
+
+
+def _env(tmp: Path) -> Dict[str, str]:
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(REPO) + os.pathsep + env.get("PYTHONPATH", "")
+    env["XDG_CONFIG_HOME"] = str(tmp / "config")
+    env["XDG_CACHE_HOME"] = str(tmp / "cache")
+    env["XDG_RUNTIME_DIR"] = str(tmp / "run")
+    env["COLUMNS"] = "100"
+    (tmp / "run").mkdir(exist_ok=True)
+    return env
+
+
+def _argv(sub: str, tmp: Path) -> List[str]:
+    args = shlex.split(sub)
+    if args and args[0] == "error":
+        # never touch the real error log
+        args += ["--fallback", str(tmp / "errors.log")]
+    return args
+
+
+def time_subcommand(sub: str, runs: int, tmp: Path) -> Dict[str, float]:
+    env = _env(tmp)
+    log = tmp / "errors.log"
+    samples = []
+    for _ in range(runs):
+        log.write_text("---- 2026-01-01 10:00:00 ----\nExit code: 1 | Command: false\n\n", encoding="utf-8")
+        t0 = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", LAUNCHER, *_argv(sub, tmp)],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "min_ms": round(samples[0], 1),
+        "median_ms": round(statistics.median(samples), 1),
+        "max_ms": round(samples[-1], 1),
+    }
+
+
+def importtime(sub: str, top: int, tmp: Path) -> List[str]:
+    r = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", LAUNCHER, *_argv(sub, tmp)],
+        env=_env(tmp),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    rows = []
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = [x.strip() for x in line.split(":", 1)[1].split("|", 2)]
+        rows.append((int(cum_us), int(self_us), name))
+    rows.sort(reverse=True)
+    return [f"{cum / 1000:8.1f} ms cumulative {self_us / 1000:7.1f} ms self  {name}" for cum, self_us, name in rows[:top]]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--json", action="store_true", help="emit results as JSON")
+    ap.add_argument("--max-ms", type=float, default=0, help="fail if any median exceeds this")
+    ap.add_argument("--importtime", metavar="SUBCOMMAND", help="show the slowest imports of one subcommand")
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("subcommands", nargs="*", default=SUBCOMMANDS)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="alex-bench-") as td:
+        tmp = Path(td)
+
+        if args.importtime:
+            for row in importtime(args.importtime, args.top, tmp):
+                print(row)
+            return 0
+
+        results = {sub: time_subcommand(sub, args.runs, tmp) for sub in args.subcommands}
+
+    if args.json:
+        print(json.dumps({"python": sys.version.split()[0], "runs": args.runs, "results": results}, indent=2))
+    else:
+        for sub, r in results.items():
+            print(f"alex {sub:<16} median {r['median_ms']:7.1f} ms  (min {r['min_ms']:.1f}, max {r['max_ms']:.1f})")
+
+    if args.max_ms and any(r["median_ms"] > args.max_ms for r in results.values()):
+        print(f"FAIL: median above {args.max_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import threading
+
+from alex import cache
+
+
+def test_record_does_not_lose_concurrent_updates(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    def lookups():
+        for i in range(50):
+            cache._record(hit=i % 2 == 0)
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cache.summary()["hits"] == 200
+    assert cache.summary()["misses"] == 200
+    assert not list((tmp_path / "alex").glob("*.tmp"))
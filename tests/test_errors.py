@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from alex import errors
+from alex.errors import filter_error_blocks, read_error_log_blocks, update_index
+
+
+def _block(ts, code=1, cmd="false", out="boom"):
+    return f"---- {ts} ----\nExit code: {code} | Command: {cmd}\nCwd: /root | Duration: 0.010s\n{out}\n\n"
+
+
+@pytest.fixture
+def log(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "errors.log"
+    path.write_text("".join(_block(f"2026-01-0{d} 10:00:00") for d in range(1, 5)))
+    return str(path)
+
+
+def _since(path, since):
+    return [b.splitlines()[0] for b in read_error_log_blocks(path, since=since)]
+
+
+def test_index_follows_appends(log):
+    assert _since(log, "2026-01-03") == ["---- 2026-01-03 10:00:00 ----", "---- 2026-01-04 10:00:00 ----"]
+    with open(log, "a") as f:
+        f.write(_block("2026-01-05 10:00:00") + _block("2026-01-06 10:00:00"))
+    assert _since(log, "2026-01-05")[0] == "---- 2026-01-05 10:00:00 ----"
+    # the index is extended in place, one entry per block
+    with open(update_index(log), "rb") as f:
+        assert errors._index_count(f) == 6
+        assert [errors._index_entry(f, i)[0] for i in range(6)] == [
+            i * len(_block("2026-01-01 10:00:00")) for i in range(6)]
+
+
+def test_index_rebuilt_after_rotation(log):
+    _since(log, "2026-01-01")
+    os.replace(log, log + ".1")
+    with open(log, "w") as f:
+        f.write(_block("2026-02-01 10:00:00", out="new"))
+    assert _since(log, "2026-02-01") == ["---- 2026-02-01 10:00:00 ----"]
+    # the rotated file is read too when it is needed
+    assert len(read_error_log_blocks(log)) == 5
+
+
+def test_tail_reads_last_blocks_across_chunks(log, monkeypatch):
+    monkeypatch.setattr(errors, "_TAIL_CHUNK", 16)
+    blocks = read_error_log_blocks(log, last=2)
+    assert [b.splitlines()[0] for b in blocks] == ["---- 2026-01-03 10:00:00 ----", "---- 2026-01-04 10:00:00 ----"]
+
+
+BLOCKS = [
+    _block("2026-01-01 10:00:00", code=1, cmd="make", out="error: missing header").strip(),
+    _block("2026-01-02 10:00:00", code=127, cmd="ngnix -t", out="command not found").strip(),
+    _block("2026-01-03 10:00:00", code=1, cmd="make install", out="Permission denied").strip(),
+    "---- 2026-01-04 ----\nold record without header\nPermission denied",
+]
+
+
+@pytest.mark.parametrize("kwargs, want", [
+    ({"since": "2026-01-02", "grep": None}, [1, 2, 3]),
+    ({"since": None, "grep": "permission"}, [2, 3]),
+    ({"since": None, "grep": ["permission", "install"]}, [2]),
+    ({"since": None, "grep": None, "regex": r"^error:"}, [0]),
+    ({"since": None, "grep": None, "exit_code": 127}, [1]),
+    ({"since": None, "grep": None, "command": "MAKE"}, [0, 2]),
+    ({"since": "2026-01-03", "grep": "denied", "exit_code": 1}, [2]),
+])
+def test_filter_error_blocks(kwargs, want):
+    assert filter_error_blocks(BLOCKS, **kwargs) == [BLOCKS[i] for i in want]
+
+
+def test_filter_rejects_bad_regex():
+    with pytest.raises(ValueError, match="--regex"):
+        filter_error_blocks(BLOCKS, None, None, regex="(")
@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from alex import openai_client
+from alex.jsonstream import parse_partial
+
+DOC = {
+    "intent": "general",
+    "summary": "nginx fails: port 80 is \"in use\" by apache2\nsee ss",
+    "steps": ["stop apache2", "start nginx"],
+    "commands": [{"cmd": "ss -tlnp", "why": "who listens", "risk": "low"}],
+    "notes": [],
+    "confidence": "high",
+}
+TEXT = json.dumps(DOC, ensure_ascii=False)
+
+
+def test_every_prefix_parses_to_a_growing_answer():
+    prev_summary = ""
+    for n in range(len(TEXT) + 1):
+        data = parse_partial(TEXT[:n])
+        if data is None:
+            continue
+        assert isinstance(data, dict)
+        summary = data.get("summary", "")
+        # a cut string is shown as far as it got, never garbled
+        assert DOC["summary"].startswith(summary)
+        assert len(summary) >= len(prev_summary)
+        prev_summary = summary
+        for step in data.get("steps", []):
+            assert any(s.startswith(step) for s in DOC["steps"])
+    assert parse_partial(TEXT) == DOC
+
+
+def _event(type_, **kw):
+    return SimpleNamespace(type=type_, **kw)
+
+
+def _client(events):
+    return SimpleNamespace(responses=SimpleNamespace(create=lambda stream, **request: iter(events)))
+
+
+def test_stream_output_text_feeds_partials(monkeypatch):
+    monkeypatch.setattr(openai_client, "PARTIAL_INTERVAL", 0.0)
+    final = SimpleNamespace(id="resp_1")
+    events = [_event("response.output_text.delta", delta=TEXT[i:i + 20]) for i in range(0, len(TEXT), 20)]
+    events.append(_event("response.completed", response=final))
+    partials = []
+
+    raw, resp = openai_client._stream_output_text(_client(events), {}, partials.append)
+
+    assert raw == TEXT and resp is final
+    assert partials and partials[-1] == DOC
+
+
+def test_stream_output_text_throttles_partials(monkeypatch):
+    monkeypatch.setattr(openai_client, "PARTIAL_INTERVAL", 3600.0)
+    events = [_event("response.output_text.delta", delta=c) for c in TEXT]
+    partials = []
+    raw, _ = openai_client._stream_output_text(_client(events), {}, partials.append)
+    assert raw == TEXT
+    assert len(partials) <= 1
+
+
+def test_stream_output_text_raises_on_failure():
+    events = [_event("response.output_text.delta", delta="{"), _event("error", message="overloaded")]
+    with pytest.raises(RuntimeError, match="overloaded"):
+        openai_client._stream_output_text(_client(events), {}, lambda data: None)
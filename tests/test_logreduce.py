@@ -0,0 +1,52 @@
+import pytest
+
+from alex.logreduce import maybe_reduce, reduce_journal, template_of
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Main process exited, code=exited, status=1/FAILURE pid 1234",
+     "Main process exited, code=exited, status=1/FAILURE pid 98765"),
+    ("connect to 10.0.0.1:5432 failed", "connect to 192.168.1.20:6432 failed"),
+    ("session 3f2a9c1e-1b2c-4d5e-8f90-a1b2c3d4e5f6 closed", "session 00000000-0000-4000-8000-000000000000 closed"),
+    ("bad pointer 0xdeadbeef", "bad pointer 0x1f"),
+    ("commit 9fceb02d0ae598e95dc970b74767f19372d61af8 applied", "commit 1a2b3c4d5e applied"),
+])
+def test_variable_tokens_share_a_template(a, b):
+    assert template_of(a) == template_of(b)
+
+
+def test_different_messages_keep_their_templates():
+    assert template_of("Failed to bind port 80") != template_of("Started nginx")
+
+
+def _line(sec, pid, msg):
+    return f"Jan 03 10:00:{sec:02d} web nginx[{pid}]: {msg}"
+
+
+def test_repeats_are_counted_and_unique_lines_kept_in_order():
+    lines = []
+    for i in range(30):
+        lines.append(_line(i, 1000 + i, f"worker {i} exited with status 1"))
+    lines.insert(10, _line(10, 999, "bind() to 0.0.0.0:80 failed (98: Address already in use)"))
+    lines.append("-- Boot 1f2e --")
+    text = "\n".join(lines)
+
+    out = reduce_journal(text).splitlines()
+
+    assert out[0].startswith("[journal condensed: 32 lines -> 3 distinct")
+    assert out[1] == f"[x30, Jan 03 10:00:00 .. Jan 03 10:00:29] {lines[0]}"
+    assert out[2] == lines[10]
+    assert out[3] == "-- Boot 1f2e --"
+
+
+def test_short_or_unique_journals_are_unchanged():
+    short = "\n".join(_line(i, i, "same") for i in range(5))
+    unique = "\n".join(_line(i % 60, i, f"message {chr(65 + i % 26)}{'x' * (i // 26)}") for i in range(40))
+    assert reduce_journal(short) == short
+    assert reduce_journal(unique) == unique
+
+
+def test_only_journalctl_output_is_reduced():
+    text = "\n".join(_line(i, i, "same again") for i in range(40))
+    assert maybe_reduce("cat /var/log/syslog", text) == text
+    assert maybe_reduce("journalctl -u nginx -n 200", text) != text
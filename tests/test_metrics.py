@@ -0,0 +1,47 @@
+from alex.metrics import prometheus_text
+
+RECORDS = [
+    {"kind": "model", "sub": "run", "latency": 1.0, "input": 10, "output": 5},
+    {"kind": "model", "sub": "run", "latency": 3.0, "input": 10, "output": 5},
+    {"kind": "exec", "sub": "run", "duration": 0.5, "exit": 1},
+]
+
+
+def test_prometheus_has_no_windowed_counters():
+    text = prometheus_text(RECORDS, window="7d")
+    types = [line.split()[3] for line in text.splitlines() if line.startswith("# TYPE")]
+    assert set(types) == {"gauge", "summary"}
+    assert 'alex_model_calls{subcommand="run",window="7d"} 2' in text
+
+
+def test_prometheus_summary_has_sum_and_count():
+    text = prometheus_text(RECORDS, window="7d")
+    assert 'alex_model_latency_seconds_sum{subcommand="run",window="7d"} 4.0' in text
+    assert 'alex_model_latency_seconds_count{subcommand="run",window="7d"} 2' in text
+    assert 'alex_command_duration_seconds_count{subcommand="run",window="7d"} 1' in text
+
+
+def test_rotation_keeps_one_generation_under_concurrent_writers(monkeypatch, tmp_path):
+    import threading
+
+    from alex import metrics
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(metrics, "_enabled", lambda: True)
+    monkeypatch.setattr(metrics, "METRICS_MAX_BYTES", 4000)
+
+    def write():
+        for _ in range(40):
+            metrics.record("exec", duration=0.1, exit=0, pad="x" * 40)
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    path = metrics.metrics_path()
+    rotated = path.with_name(path.name + ".1")
+    # one rotation per crossing: .1 holds a full generation, not a sliver
+    assert rotated.stat().st_size > 4000
+    assert path.stat().st_size <= 4000 + 8 * 100
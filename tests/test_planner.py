@@ -0,0 +1,92 @@
+import pytest
+
+from alex.planner import is_read_only, plan
+
+MUTATING = [
+    "date -s 2020-01-01",
+    "date 010112002020",
+    "sysctl vm.swappiness=10",
+    "sysctl -w vm.swappiness=10",
+    "awk 'BEGIN{system(\"reboot\")}'",
+    "awk '{print > \"/tmp/x\"}' f",
+    "curl --json {} http://x",
+    "curl -sSLo f http://x",
+    "curl -X POST http://x",
+    "openssl genrsa -out k",
+    "ss -K dst 10.0.0.1",
+    "git branch new",
+    "uniq a b",
+    "tree -o /etc/x",
+    "shutdown -h",
+    "mount -a",
+    "hostname foo",
+    "sort -uo out in",
+    "iptables -L -Z",
+    "timedatectl set-time 10:00",
+    "firewall-cmd --state --add-port=1/tcp",
+    "echo x > /tmp/f",
+    "sed -i.bak s/a/b/ f",
+]
+
+# never finish on their own (or need a terminal): a batch worker would sit until the timeout
+ENDLESS = [
+    "tail -f /var/log/syslog",
+    "tail -Fn 50 /var/log/syslog",
+    "tail --follow=name /var/log/syslog",
+    "journalctl -fu nginx",
+    "journalctl -u nginx --follow",
+    "ping 8.8.8.8",
+    "docker logs -f web",
+    "docker events",
+    "docker stats",
+    "kubectl logs --follow pod",
+    "kubectl get pods -w",
+    "mtr 8.8.8.8",
+    "vmstat 1",
+    "ip monitor",
+    "less /etc/hosts",
+    "sleep 5",
+]
+
+READ_ONLY = [
+    "date +%F",
+    "date -d yesterday +%s",
+    "sysctl vm.swappiness",
+    "awk '{print $1}' /etc/passwd",
+    "curl -fsS -m 5 https://example.org",
+    "openssl x509 -in c.pem -noout -text",
+    "ss -tlnp",
+    "git branch -a",
+    "uniq -c a",
+    "tree /etc",
+    "mount",
+    "swapon --show",
+    "iptables -L -n",
+    "hostnamectl status",
+    "systemctl is-active nginx",
+    "command -v nginx && nginx -V",
+    "tail -n 50 /var/log/syslog",
+    "journalctl -u nginx -n 50",
+    "ping -c 3 8.8.8.8",
+    "docker logs --tail 50 web",
+    "docker stats --no-stream",
+    "mtr -r -c 5 8.8.8.8",
+    "vmstat 1 5",
+]
+
+
+@pytest.mark.parametrize("cmd", MUTATING + ENDLESS)
+def test_mutating(cmd):
+    assert not is_read_only(cmd)
+
+
+@pytest.mark.parametrize("cmd", READ_ONLY)
+def test_read_only(cmd):
+    assert is_read_only(cmd)
+
+
+def test_plan_batches_only_consecutive_read_only():
+    cmds = [{"cmd": c, "risk": "low"} for c in ("ss -tlnp", "uname -r", "git branch new", "df -h")]
+    steps = plan(cmds, lambda cmd: None)
+    assert [[pc.cmd for pc in s.commands] for s in steps] == [
+        ["ss -tlnp", "uname -r"], ["git branch new"], ["df -h"]]
@@ -0,0 +1,14 @@
+from alex.render import _plain
+
+
+def test_plain_answer_keeps_cluster_title():
+    ev = {"type": "answer", "title": "Error 2/5 ×3: boom", "data": {"summary": "disk full"}}
+    assert _plain(ev).splitlines()[:2] == ["Error 2/5 ×3: boom", "disk full"]
+
+
+def test_plain_answer_skips_default_title():
+    assert _plain({"type": "answer", "title": "Alex", "data": {"summary": "ok"}}) == "ok\n"
+
+
+def test_plain_summary():
+    assert _plain({"type": "summary", "commands": 2, "wall": 1.5}) == "summary: commands=2 wall=1.5\n"
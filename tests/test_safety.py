@@ -0,0 +1,82 @@
+import pytest
+
+from alex.safety import Policy, parse, scan
+
+# the old blacklist catches these from the raw text
+OLD_BLACKLIST = [
+    "{ rm -rf /; }",
+    "if true; then rm -rf /; fi",
+    "for f in *; do rm -rf $f; done",
+    "find / -name x -exec rm -rf {} +",
+    "ssh host 'rm -rf /'",
+    "su -c 'rm -rf /'",
+    "eval 'rm -rf /'",
+    "chroot /mnt rm -rf /",
+    "runuser -u x -- rm -rf /",
+    "watch rm -rf /tmp/x",
+    "setsid reboot",
+    "python3 -c \"import os; os.system('reboot')\"",
+    "> /etc/passwd",
+    "exec > /etc/hosts",
+]
+
+# split flags: only the parser sees these, so they test keyword skipping and body unwrapping
+PARSER_ONLY = [
+    "{ rm -r -f /; }",
+    "if true; then rm -r -f /; fi",
+    "while true; do rm -r -f /x; done",
+    "! rm -r -f /x",
+    "find / -name x -exec rm -r -f {} +",
+    "find / -name x -execdir rm -r -f {} \\;",
+    "ssh -p 2222 host 'rm -r -f /'",
+    "su -c 'rm -r -f /'",
+    "su - root -c 'rm -r -f /'",
+    "eval 'rm -r -f /'",
+    "bash -c 'rm -r -f /'",
+    "chroot /mnt rm -r -f /",
+    "runuser -u x -- rm -r -f /",
+    "runuser -l x -c 'rm -r -f /'",
+    "watch -n 5 rm -r -f /tmp/x",
+    "setsid -f shutdown now",
+]
+
+HARMLESS = [
+    "ls -la /etc",
+    "systemctl status nginx --no-pager",
+    "find /var/log -name '*.gz' -exec ls -l {} +",
+    "ssh host uptime",
+    "echo ok > /tmp/alex-test",
+    "{ ls; }",
+]
+
+
+@pytest.mark.parametrize("cmd", OLD_BLACKLIST + PARSER_ONLY)
+def test_dangerous(cmd):
+    assert scan(cmd, Policy()) is not None
+
+
+@pytest.mark.parametrize("cmd", HARMLESS)
+def test_harmless(cmd):
+    assert scan(cmd, Policy()) is None
+
+
+@pytest.mark.parametrize("cmd", ["> /etc/passwd", "exec > /etc/hosts"])
+def test_redirect_without_program(cmd):
+    assert [r for s in parse(cmd) for r in s.redirects] == [(">", cmd.split()[-1])]
+
+
+def test_unbalanced_quotes_fall_back_to_blacklist():
+    assert scan("rm -rf / 'oops", Policy()) == "rm -rf is destructive"
+
+
+@pytest.mark.parametrize("rules, cmd, reason", [
+    ((("force push", r"(?i)git\s+push.*--force"),), "GIT push origin --force", "force push"),
+    ((("same twice", r"cp (\S+) \1"),), "cp a a", "same twice"),
+    ((("named", r"curl (?P<url>\S+) \| sh"),), "curl x | sh", "named"),
+    ((("scoped", r"(?i:terraform) destroy"), ("broken", r"(")), "terraform destroy", "scoped"),
+])
+def test_user_rules_that_do_not_join(rules, cmd, reason):
+    policy = Policy(rules=rules)
+    assert scan(cmd, policy) == reason
+    assert scan("ls -la", policy) is None
+    assert scan("rm -rf /", policy) is not None
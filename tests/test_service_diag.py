@@ -0,0 +1,68 @@
+import time
+
+from alex import service_diag
+from alex.service_diag import CmdResult, _run_approved
+
+
+def test_only_read_only_probes_run_concurrently(monkeypatch):
+    log = []
+    running = []
+
+    def fake_run_one(cmd):
+        running.append(cmd)
+        log.append(("start", cmd, len(running)))
+        time.sleep(0.05)
+        running.remove(cmd)
+        return CmdResult(cmd=cmd, returncode=0, stdout="", stderr="")
+
+    monkeypatch.setattr(service_diag, "_run_one", fake_run_one)
+    approved = [
+        ("systemctl status nginx", False),
+        ("journalctl -u nginx -n 50", False),
+        ("systemctl restart nginx", False),
+        ("ss -tlnp", False),
+        ("rm -rf /var/cache/nginx", True),
+    ]
+    results = _run_approved(approved)
+
+    assert [r.cmd for r in results] == [c for c, _ in approved]
+    starts = [cmd for _, cmd, _ in log]
+    # the restart starts after both earlier probes, the later ones after the restart
+    assert set(starts[:2]) == {"systemctl status nginx", "journalctl -u nginx -n 50"}
+    assert starts[2:] == ["systemctl restart nginx", "ss -tlnp", "rm -rf /var/cache/nginx"]
+    alone = {cmd: n for _, cmd, n in log}
+    assert alone["systemctl restart nginx"] == 1 and alone["rm -rf /var/cache/nginx"] == 1
+
+
+def _show_output(*units):
+    return "\n\n".join(f"Id={u}\nLoadState=loaded\nActiveState={state}\nSubState=x" for u, state in units)
+
+
+def test_show_many_matches_blocks_on_id(monkeypatch):
+    def fake_run_one(cmd):
+        # systemd prints the blocks in its own order
+        return CmdResult(cmd=cmd, returncode=0, stdout=_show_output(("b.service", "active"), ("a.service", "failed")),
+                         stderr="")
+
+    monkeypatch.setattr(service_diag, "_run_one", fake_run_one)
+    shown = service_diag._show_many(["a.service", "b"])
+    assert service_diag._unit_props(shown["a.service"])["ActiveState"] == "failed"
+    assert service_diag._unit_props(shown["b"])["ActiveState"] == "active"
+
+
+def test_show_many_shows_each_unit_when_one_is_missing(monkeypatch):
+    def fake_run_one(cmd):
+        if "nope.service" in cmd and "ok.service" in cmd:
+            return CmdResult(cmd=cmd, returncode=1, stdout=_show_output(("ok.service", "active")),
+                             stderr="Failed to get properties: Unit name nope.service is not valid.")
+        if "nope.service" in cmd:
+            return CmdResult(cmd=cmd, returncode=1, stdout="", stderr="Failed to get properties")
+        return CmdResult(cmd=cmd, returncode=0, stdout=_show_output(("ok.service", "active")), stderr="")
+
+    monkeypatch.setattr(service_diag, "_run_one", fake_run_one)
+    shown = service_diag._show_many(["ok.service", "nope.service"])
+    assert shown["ok.service"].returncode == 0
+    assert shown["nope.service"].returncode == 1
+    props = service_diag._unit_props(shown["nope.service"])
+    assert service_diag.severity(props) == 1
+    assert service_diag.severity(service_diag._unit_props(shown["ok.service"])) == 5
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from alex.executor import _BoundedCapture
+from alex.shell_session import ShellSession, _SentinelReader, needs_isolation
+
+
+@pytest.fixture
+def session():
+    s = ShellSession(dict(os.environ), interactive=False)
+    yield s
+    s.close(kill=True)
+
+
+def test_sentinel_split_across_reads():
+    reader = _SentinelReader(b"__MARK__", _BoundedCapture(100, 100))
+    for chunk in (b"out", b"put\n__MA", b"RK", b"__ 3", b"\n"):
+        reader.feed(chunk)
+    assert reader.done and reader.tail == b"3"
+    assert reader.cap.text() == "output"
+
+
+def test_output_without_newline_and_exit_codes(session):
+    r = session.run("printf abc; echo err >&2; exit 3", timeout=10, capture_chars=1000)
+    assert (r.returncode, r.stdout, r.stderr) == (3, "abc", "err\n")
+    r = session.run("true | false", timeout=10, capture_chars=1000)
+    assert r.returncode == 1
+    r = session.run("echo ok && echo done", timeout=10, capture_chars=1000)
+    assert (r.returncode, r.stdout) == (0, "ok\ndone\n")
+
+
+def test_commands_do_not_leak_into_the_next(session):
+    pid = session.proc.pid
+    session.run("cd /; export ALEX_T=1; set -e; false; exit 7", timeout=10, capture_chars=1000)
+    r = session.run('echo "$PWD ${ALEX_T:-unset}"', timeout=10, capture_chars=1000)
+    assert r.stdout == f"{os.getcwd()} unset\n"
+    assert session.alive and session.proc.pid == pid
+
+
+def test_timeout_kills_the_session(session):
+    r = session.run("echo started; sleep 30", timeout=0.3, capture_chars=1000)
+    assert r.timed_out and r.returncode == 124
+    assert r.stdout == "started\n"
+    assert not session.alive
+
+
+@pytest.mark.parametrize("cmd, isolate", [
+    ("sleep 5 &", True),
+    ("nginx -t && systemctl reload nginx", False),
+    ("ls >/dev/null 2>&1", False),
+    ("cmd &>/tmp/x", False),
+])
+def test_background_jobs_need_isolation(cmd, isolate):
+    assert needs_isolation(cmd, interactive=False) is isolate
@@ -0,0 +1,16 @@
+import os
+from types import SimpleNamespace
+
+from alex import system
+
+
+def test_hostname_is_not_cached_per_boot(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(system, "_facts", None)
+
+    monkeypatch.setattr(os, "uname", lambda: SimpleNamespace(nodename="old-name"))
+    assert "Hostname: old-name" in system.get_system_info()
+    assert "hostname" not in system.system_facts()
+
+    monkeypatch.setattr(os, "uname", lambda: SimpleNamespace(nodename="new-name"))
+    assert "Hostname: new-name" in system.get_system_info()
@@ -0,0 +1,17 @@
+from alex.unit_index import UnitIndex
+
+UNITS = ["cron.service", "nginx.service", "ssh.service", "systemd-journald.service"]
+
+
+def test_typo_with_suffix_matches_like_bare_typo():
+    idx = UnitIndex(UNITS)
+    with_suffix = idx.close_matches("nginxx.service", cutoff=0.72, forms=("bare",))
+    bare = idx.close_matches("nginxx", cutoff=0.72, forms=("bare",))
+    assert with_suffix == bare
+    assert with_suffix[0][0] == "nginx.service"
+
+
+def test_lookup_exact_with_and_without_suffix():
+    idx = UnitIndex(UNITS)
+    assert idx.lookup("ssh") == idx.lookup("SSH.service") == "ssh.service"
+    assert idx.lookup("sshd") is None